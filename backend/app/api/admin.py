@@ -4,16 +4,23 @@ Admin API endpoints for user activity monitoring.
 
 import logging
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from typing import Dict, List
 
+from ..core import cache
 from ..core.auth import get_admin_user
+from ..core.cache_metrics import cache_metrics
+from ..core.singleflight import get_singleflight_stats
 from ..models.schemas import (
     UserResponse,
     SessionResponse,
     SessionEventResponse,
-    UserWithActivityResponse
+    UserWithActivityResponse,
+    SingleFlightStatsResponse,
+    NightscoutHealthResponse,
+    CacheMetricsResponse
 )
 from ..services.activity_logging_service import activity_logging
+from ..services.nightscout_health import get_health_stats
 from ..services.user_service import UserService
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -81,3 +88,33 @@ async def get_session_events(session_id: str, user: UserResponse = Depends(get_a
     except Exception as e:
         logging.error(f"Error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/singleflight-stats", response_model=Dict[str, SingleFlightStatsResponse])
+async def get_singleflight_stats_endpoint(user: UserResponse = Depends(get_admin_user)):
+    """
+    Get request coalescing counters for Nightscout and cache lookups.
+    Admin only endpoint.
+    """
+    return get_singleflight_stats()
+
+
+@router.get("/nightscout-health", response_model=NightscoutHealthResponse)
+async def get_nightscout_health(user: UserResponse = Depends(get_admin_user)):
+    """
+    Get per-host Nightscout latency, circuit breaker state and retry budget.
+    Admin only endpoint.
+    """
+    return get_health_stats()
+
+
+@router.get("/cache-metrics", response_model=CacheMetricsResponse)
+async def get_cache_metrics(user: UserResponse = Depends(get_admin_user)):
+    """
+    Get cache hit ratios, miss reasons, latency histograms and bytes transferred per key family and tier.
+    Admin only endpoint.
+    """
+    return {
+        "families": cache_metrics.stats(),
+        "memory_tier": cache.memory_cache.stats() if cache.memory_cache else None,
+    }
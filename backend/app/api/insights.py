@@ -0,0 +1,95 @@
+"""
+Insights API endpoints.
+"""
+
+import json
+import logging
+from dataclasses import asdict
+from datetime import date
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..core.auth import get_active_user
+from ..models.schemas import GlucoseUnit, UserResponse
+from ..services.data_analysis_service import DailySummary, iter_day_summaries, merge_summaries
+from ..services.nightscout_service import parse_nightscout_url
+from ..services.user_service import UserService
+
+router = APIRouter()
+
+# Longest range one request may cover, in days
+MAX_RANGE_DAYS = 92
+
+
+def _insights_record(record_type: str, summary: Optional[DailySummary], use_mmol: bool, **fields) -> str:
+    entry_insights = summary.entry_insights(use_mmol=use_mmol) if summary else None
+    return json.dumps({
+        "type": record_type,
+        **fields,
+        "entries": asdict(entry_insights) if entry_insights else None,
+        "treatments": asdict(summary.treatment_insights()) if summary else None,
+    }) + "\n"
+
+
+async def stream_range_insights(
+    from_date: date,
+    to_date: date,
+    nightscout_url: str,
+    api_token: str,
+    user_id: str,
+    use_mmol: bool
+) -> AsyncIterator[str]:
+    """
+    Yield NDJSON insights records for a date range.
+
+    One {"type": "day"} record per day as soon as it is computed (days do
+    not arrive in date order), then one {"type": "summary"} record for the
+    whole range, or {"type": "error"} if loading failed.
+    """
+    summaries = []
+    try:
+        async for summary in iter_day_summaries(
+            from_date, to_date, nightscout_url=nightscout_url, api_token=api_token, user_id=user_id
+        ):
+            summaries.append(summary)
+            yield _insights_record("day", summary, use_mmol, date=summary.start.isoformat())
+
+        yield _insights_record(
+            "summary", merge_summaries(summaries), use_mmol,
+            from_date=from_date.isoformat(), to_date=to_date.isoformat(), days=len(summaries)
+        )
+    except Exception as e:
+        logging.error(f"Error streaming insights for {from_date} - {to_date}: {e}", exc_info=True)
+        yield json.dumps({"type": "error", "text": "An internal error occurred while computing insights."}) + "\n"
+
+
+@router.get("/range")
+async def get_range_insights(from_date: date, to_date: date, user: UserResponse = Depends(get_active_user)):
+    """
+    Stream per-day EntryInsights and TreatmentInsights for a date range as NDJSON.
+
+    Days are computed concurrently and each is sent as soon as it is done;
+    a final summary record covers the whole range. Glucose values use the
+    user's glucose unit.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="to_date must not be before from_date")
+    if (to_date - from_date).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Ranges are limited to {MAX_RANGE_DAYS} days")
+
+    settings = UserService.get_user_settings(user.uid)
+    if not settings.nightscout_url:
+        raise HTTPException(status_code=400, detail="No Nightscout URL configured in settings")
+    nightscout_url, api_token = parse_nightscout_url(settings.nightscout_url)
+    if not nightscout_url or not api_token:
+        raise HTTPException(status_code=400, detail="Invalid Nightscout URL in settings")
+
+    return StreamingResponse(
+        stream_range_insights(
+            from_date, to_date, nightscout_url, api_token, user.uid,
+            use_mmol=settings.glucose_unit == GlucoseUnit.MMOL
+        ),
+        media_type="application/x-ndjson"
+    )
@@ -33,7 +33,7 @@ async def test_nightscout(
     Test a Nightscout URL before saving it.
     Returns the current glucose reading and time since last reading.
     """
-    result = test_nightscout_connection(request.url)
+    result = await test_nightscout_connection(request.url)
     return NightscoutTestResponse(**result)
 
 
@@ -53,5 +53,5 @@ async def test_saved_nightscout(
             error="No Nightscout URL configured in settings"
         )
     
-    result = test_nightscout_connection(settings.nightscout_url)
+    result = await test_nightscout_connection(settings.nightscout_url)
     return NightscoutTestResponse(**result)
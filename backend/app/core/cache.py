@@ -1,58 +1,343 @@
-from datetime import datetime
-from google.cloud import firestore
+import hashlib
+import logging
+import struct
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from .cache_backends import create_backend
+from .cache_metrics import BACKEND_TIER, MEMORY_TIER, cache_metrics
 from .config import settings
+from .memory_cache import ABSENT, MemoryCache
+from .payload_codec import CODEC_VERSION, decode_records, encode_records
 
-PREFIX = "ns_insight_cache"
+# Storage backend selected by CACHE_BACKEND (see cache_backends)
+backend = create_backend(settings.CACHE_BACKEND) if settings.CACHE_ENABLED else None
 
-db = None
-if settings.CACHE_ENABLED and settings.GCP_PROJECT_ID:
-    db = firestore.Client(project=settings.GCP_PROJECT_ID)
+# Memory tier in front of the backend: reads go through it, writes go to both.
+# A memory backend needs no second in-process copy.
+memory_cache = None
+if backend is not None and backend.name != "memory" and settings.MEMORY_CACHE_ENABLED:
+    memory_cache = MemoryCache(settings.MEMORY_CACHE_MAX_BYTES, settings.MEMORY_CACHE_TTL)
 
-def get_cache(key: str, user_id: str = None):
+def _memory_lookup(keys: List[str], user_id: str = None) -> Tuple[Dict[str, any], Dict[str, str]]:
+    """Return ({key: memory tier value or None}, {missed key: miss reason})."""
+    values = {key: None for key in keys}
+    if not memory_cache:
+        return values, {key: ABSENT for key in values}
+    reasons = {}
+    sizes = {}
+    started = time.perf_counter()
+    for key in values:
+        value, reason, size = memory_cache.lookup(key, user_id=user_id)
+        if value is not None:
+            values[key] = value
+            sizes[key] = size
+        else:
+            reasons[key] = reason
+    cache_metrics.record_read(MEMORY_TIER, values, time.perf_counter() - started, reasons, sizes)
+    return values, reasons
+
+def _from_backend(
+    values: Dict[str, any],
+    seconds: float,
+    reasons: Dict[str, str],
+    user_id: str = None,
+    sizes: Optional[Dict[str, int]] = None
+) -> Dict[str, any]:
+    """
+    Record a backend read (`sizes` being the payload bytes per key), update
+    the miss reasons and copy hits into the memory tier.
+    """
+    for key, value in values.items():
+        if value is None:
+            reasons[key] = ABSENT
+        else:
+            reasons.pop(key, None)
+    cache_metrics.record_read(BACKEND_TIER, values, seconds, sizes=sizes)
+    _memory_store({key: value for key, value in values.items() if value is not None}, user_id)
+    return values
+
+def _memory_store(values: Dict[str, any], user_id: str = None, ttl: float = None):
+    """Write values to the memory tier, if there is one."""
+    if not memory_cache or not values:
+        return
+    started = time.perf_counter()
+    sizes = {key: memory_cache.set(key, value, user_id=user_id, ttl=ttl) for key, value in values.items()}
+    cache_metrics.record_write(MEMORY_TIER, values, time.perf_counter() - started, sizes)
+
+# --- Cache API ---
+#
+# Backend I/O is awaited (natively on Firestore's AsyncClient) instead of
+# blocking the event loop or a threadpool worker.
+
+async def aget_cache(key: str, user_id: str = None):
     """Hämtar ett värde från cachen.
     
+    The memory tier is checked first; backend hits are copied into it.
+    Values served from memory are shared and must not be modified.
+    
     Args:
         key: The cache key.
         user_id: Optional user ID to scope the cache to a specific user.
                  If provided, the cache is stored in a user-specific subcollection.
     """
-    if not db:
-        return None
-    
-    if user_id:
-        # User-specific cache: ns_insight_cache/{user_id}/cache/{key}
-        doc_ref = db.collection(PREFIX).document(user_id).collection("cache").document(key)
-    else:
-        # Global cache: ns_insight_cache/{key}
-        doc_ref = db.collection(PREFIX).document(key)
-    
-    doc = doc_ref.get()
-    if doc.exists:
-        return doc.to_dict().get("value")
-    return None
+    return (await aget_many([key], user_id=user_id))[key]
 
-def set_cache(key: str, value: any, user_id: str = None):
+async def aset_cache(key: str, value: any, user_id: str = None, ttl: float = None):
     """Sparar ett värde i cachen.
     
+    The value is written to the memory tier and to the backend. Values larger
+    than CACHE_CHUNK_SIZE are split over several documents by the Firestore
+    backend transparently.
+    
     Args:
         key: The cache key.
         value: The value to cache.
         user_id: Optional user ID to scope the cache to a specific user.
                  If provided, the cache is stored in a user-specific subcollection.
+        ttl: Optional memory tier lifetime in seconds (defaults to MEMORY_CACHE_TTL).
     """
-    # Add cached_at timestamp to the value if it's a list of dictionaries
-    if isinstance(value, list) and all(isinstance(item, dict) for item in value):
-        for item in value:
-            item['cached_at'] = datetime.now().isoformat()
+    await aset_many({key: value}, user_id=user_id, ttl=ttl)
 
-    if not db:
-        return
+async def aget_many(keys: List[str], user_id: str = None) -> Dict[str, any]:
+    """Hämtar flera värden från cachen.
     
-    if user_id:
-        # User-specific cache: ns_insight_cache/{user_id}/cache/{key}
-        doc_ref = db.collection(PREFIX).document(user_id).collection("cache").document(key)
-    else:
-        # Global cache: ns_insight_cache/{key}
-        doc_ref = db.collection(PREFIX).document(key)
+    Keys served by the memory tier cost nothing; the rest are read from the
+    backend in one batch (one Firestore get_all per 300 keys).
     
-    doc_ref.set({"value": value})
\ No newline at end of file
+    Args:
+        keys: The cache keys.
+        user_id: Optional user ID to scope the cache to a specific user.
+    
+    Returns:
+        Mapping of every key to its value, or None for keys not in the cache.
+    """
+    values, reasons = _memory_lookup(keys, user_id)
+    if backend and reasons:
+        sizes = {}
+        started = time.perf_counter()
+        fetched = await backend.aget_many(list(reasons), user_id=user_id, sizes=sizes)
+        values.update(_from_backend(fetched, time.perf_counter() - started, reasons, user_id, sizes))
+    cache_metrics.record_lookups(values, reasons)
+    return values
+
+async def aset_many(values: Dict[str, any], user_id: str = None, ttl: float = None):
+    """Sparar flera värden i cachen.
+    
+    Values are written to the memory tier and to the backend in batches
+    (Firestore batched writes of at most 500 documents).
+    
+    Args:
+        values: Mapping of cache key to value.
+        user_id: Optional user ID to scope the cache to a specific user.
+        ttl: Optional memory tier lifetime in seconds (defaults to MEMORY_CACHE_TTL).
+    """
+    _memory_store(values, user_id, ttl)
+
+    if backend:
+        sizes = {}
+        started = time.perf_counter()
+        await backend.aset_many(values, user_id=user_id, sizes=sizes)
+        cache_metrics.record_write(BACKEND_TIER, values, time.perf_counter() - started, sizes)
+
+def invalidate_cache(key: str, user_id: str = None):
+    """Drop a key from the memory tier, e.g. after it was changed elsewhere."""
+    if memory_cache:
+        memory_cache.invalidate(key, user_id=user_id)
+
+def invalidate_user_cache(user_id: str):
+    """Drop all of a user's keys from the memory tier."""
+    if memory_cache:
+        memory_cache.invalidate_user(user_id)
+
+# --- Day buckets ---
+#
+# Time-series data (entries, treatments) is cached in canonical per-day
+# buckets instead of per-request ranges, so overlapping or sliding ranges
+# share the days they have in common. Buckets are UTC calendar days stored
+# under a "{family}_day_{date}_{site}" key as {"items": [...], "complete": bool},
+# where "site" (see site_scope) ties them to the Nightscout site they were
+# fetched from, so a user who switches sites never reads the old site's days.
+# Buckets for days that have not elapsed yet are open (complete=False) and
+# carry a sync "watermark" ({"date": ms, "srvModified": ms | None}) marking
+# how far their items are known to be up to date, plus the time they were
+# last synced ("synced_at", epoch seconds). The "schema" version records
+# which model shape the items were validated against.
+#
+# Items are stored as a compact binary "payload" (see payload_codec) tagged
+# with its "codec" version; aget_day_buckets decodes it back into "items".
+# Buckets written before the codec existed store "items" directly and are
+# read as-is; buckets with an unknown codec version are treated as missing.
+#
+# Freshness: buckets of elapsed days are immutable and never refetched. Open
+# buckets are fresh for CACHE_OPEN_DAY_TTL seconds after their last sync,
+# then stale (served as-is while a background refresh runs) for up to
+# CACHE_OPEN_DAY_MAX_STALE seconds more, and expired (synced before use)
+# after that.
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+def site_scope(nightscout_url: str) -> str:
+    """Return a short, stable tag of a Nightscout site for cache keys, e.g. "3f2a9c81d0"."""
+    return hashlib.sha1(nightscout_url.rstrip("/").lower().encode()).hexdigest()[:10]
+
+
+def day_bucket_key(family: str, day: date, site: Optional[str] = None) -> str:
+    """Return the cache key of a day bucket, e.g. "entries_day_2026-01-29_3f2a9c81d0"."""
+    key = f"{family}_day_{day.isoformat()}"
+    return f"{key}_{site}" if site else key
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Return the [start, end) UTC datetimes of a day bucket."""
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def days_in_range(start: datetime, end: datetime) -> List[date]:
+    """Return the UTC days whose buckets overlap the range [start, end]."""
+    first = start.astimezone(timezone.utc).date()
+    last = end.astimezone(timezone.utc).date()
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def is_day_closed(day: date, now: Optional[datetime] = None) -> bool:
+    """Whether a day bucket has fully elapsed, so its contents can no longer change."""
+    return freshness_for_day(day, now=now) is None
+
+
+def freshness_for_day(day: date, tz: str = "UTC", now: Optional[datetime] = None) -> Optional[float]:
+    """
+    Return how many seconds cached data for a calendar day stays fresh.
+
+    Args:
+        day: The calendar day in timezone `tz`.
+        tz: IANA timezone name, e.g. the user's "Europe/Stockholm". Day
+            buckets are UTC days; pass the user's timezone for local-day data.
+        now: Optional current time (aware), for testing.
+
+    Returns:
+        None once the day has fully elapsed in `tz` (the data is immutable),
+        otherwise CACHE_OPEN_DAY_TTL.
+    """
+    now = now or datetime.now(timezone.utc)
+    end = datetime(day.year, day.month, day.day, tzinfo=ZoneInfo(tz)) + timedelta(days=1)
+    if end <= now:
+        return None
+    return settings.CACHE_OPEN_DAY_TTL
+
+
+def bucket_freshness(day: date, bucket: dict, now: Optional[float] = None) -> str:
+    """
+    Classify a cached day bucket as FRESH, STALE or EXPIRED.
+
+    Complete buckets are always fresh. Open buckets whose day has elapsed
+    since they were stored are expired, since they still need a final sync.
+    """
+    if bucket.get("complete", True):
+        return FRESH
+    if is_day_closed(day):
+        return EXPIRED
+    synced_at = bucket.get("synced_at")
+    if synced_at is None:
+        return EXPIRED
+    age = (now or time.time()) - synced_at
+    if age <= settings.CACHE_OPEN_DAY_TTL:
+        return FRESH
+    if age <= settings.CACHE_OPEN_DAY_TTL + settings.CACHE_OPEN_DAY_MAX_STALE:
+        return STALE
+    return EXPIRED
+
+
+def _decode_bucket(bucket: Optional[dict], key: Optional[str] = None) -> Optional[dict]:
+    """
+    Return a copy of a stored bucket with its payload decoded into "items".
+
+    Buckets that cannot be decoded are treated as missing and, when their
+    cache key is given, counted as decode errors in the cache metrics.
+    """
+    if bucket is None or "payload" not in bucket:
+        return bucket
+    try:
+        if bucket.get("codec") != CODEC_VERSION:
+            raise ValueError(f"Unsupported cache codec {bucket.get('codec')}")
+        items = decode_records(bucket["payload"])
+    except (ValueError, KeyError, IndexError, TypeError, struct.error, zlib.error) as e:
+        logging.warning(f"Discarding undecodable cache bucket {key}: {e}")
+        if key is not None:
+            cache_metrics.record_decode_error(key)
+        return None
+    decoded = {k: v for k, v in bucket.items() if k != "payload"}
+    decoded["items"] = items
+    return decoded
+
+
+async def aget_day_buckets(
+    family: str,
+    days: List[date],
+    user_id: str = None,
+    site: Optional[str] = None
+) -> Dict[date, Optional[dict]]:
+    """Load the cached day buckets with one batched read, or None for days not in the cache."""
+    keys = {day: day_bucket_key(family, day, site) for day in days}
+    values = await aget_many(list(keys.values()), user_id=user_id)
+    return {day: _decode_bucket(values[key], key) for day, key in keys.items()}
+
+
+async def aget_day_bucket_states(
+    family: str,
+    days: List[date],
+    user_id: str = None,
+    site: Optional[str] = None
+) -> Dict[date, Optional[bool]]:
+    """
+    Return whether each cached day bucket is complete, without decoding its
+    items, or None for days not in the cache.
+    """
+    keys = {day: day_bucket_key(family, day, site) for day in days}
+    values = await aget_many(list(keys.values()), user_id=user_id)
+    return {
+        day: values[key].get("complete", True) if values[key] is not None else None
+        for day, key in keys.items()
+    }
+
+
+def _day_bucket_value(items: List[dict], watermark: Optional[dict], schema: Optional[int]) -> dict:
+    value = {"payload": encode_records(items), "codec": CODEC_VERSION, "complete": watermark is None}
+    if watermark is not None:
+        value["watermark"] = watermark
+        value["synced_at"] = time.time()
+    if schema is not None:
+        value["schema"] = schema
+    return value
+
+
+async def aset_day_buckets(
+    family: str,
+    buckets: Dict[date, Tuple[List[dict], Optional[dict]]],
+    user_id: str = None,
+    schema: Optional[int] = None,
+    site: Optional[str] = None
+):
+    """
+    Store several day buckets with batched writes.
+
+    Args:
+        family: The data family, e.g. "entries" or "treatments".
+        buckets: Mapping of UTC day to (items, watermark). Buckets stored
+                 without a watermark are complete and never synced again.
+        user_id: Optional user ID to scope the buckets to a specific user.
+        schema: Version of the model schema the items were validated against.
+        site: site_scope() of the Nightscout site the items came from.
+    """
+    await aset_many(
+        {
+            day_bucket_key(family, day, site): _day_bucket_value(items, watermark, schema)
+            for day, (items, watermark) in buckets.items()
+        },
+        user_id=user_id
+    )
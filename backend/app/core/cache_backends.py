@@ -0,0 +1,578 @@
+"""
+Storage backends for the cache.
+
+`app/core/cache.py` talks to one CacheBackend, selected with
+Settings.CACHE_BACKEND:
+
+- "firestore": Firestore documents (the production backend),
+- "sqlite": a local SQLite file, for single-node deployments and benchmarks,
+- "memory": a process-local dict, for local runs and tests,
+- "none": caching disabled.
+
+All backends store JSON-like values (plus bytes) under (user_id, key) and
+return fresh copies, so callers may modify what they read. Every operation
+has an async counterpart (aget, aset, ...) for use from request handlers:
+Firestore uses its native AsyncClient, SQLite runs in a worker thread and
+the memory backend completes immediately.
+
+The batch operations fill an optional `sizes` dict with the payload bytes
+read or written per key: the serialized JSON held by the memory backend,
+the compressed rows of SQLite, and the Firestore storage size of inline
+documents (see document_size) or the compressed chunks of chunked ones.
+"""
+
+import asyncio
+import base64
+import json
+import sqlite3
+import threading
+import uuid
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from google.cloud import firestore
+
+from .config import settings
+
+PREFIX = "ns_insight_cache"
+
+# Firestore limits: operations per batched write, documents per get_all we issue
+BATCH_WRITE_LIMIT = 500
+BATCH_READ_LIMIT = 300
+# Payload bytes per batched write, below Firestore's 10 MiB request limit
+BATCH_BYTES_LIMIT = 8 * 1024 * 1024
+# Fields of a document that tell whether it is a chunk manifest
+MANIFEST_FIELDS = ["chunked", "generation", "chunks"]
+
+
+class CacheBackend(Protocol):
+    """Key-value storage scoped by an optional user ID."""
+
+    name: str
+
+    def get(self, key: str, user_id: Optional[str] = None) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any, user_id: Optional[str] = None) -> None: ...
+
+    def get_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]: ...
+
+    def set_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None: ...
+
+    async def aget(self, key: str, user_id: Optional[str] = None) -> Optional[Any]: ...
+
+    async def aset(self, key: str, value: Any, user_id: Optional[str] = None) -> None: ...
+
+    async def aget_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]: ...
+
+    async def aset_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None: ...
+
+
+def _json_default(value):
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Cannot serialize cache value of type {type(value).__name__}")
+
+
+def _json_object_hook(value: dict):
+    if len(value) == 1 and "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    return value
+
+
+def dumps_value(value: Any) -> bytes:
+    """Serialize a JSON-like value (bytes allowed) to UTF-8 JSON."""
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+
+
+def loads_value(data: bytes) -> Any:
+    """Inverse of dumps_value."""
+    return json.loads(data, object_hook=_json_object_hook)
+
+
+def document_size(value: Any) -> int:
+    """
+    Return the storage size of a value by Firestore's size rules: strings
+    take their UTF-8 length plus one byte, numbers eight, bytes their length
+    and map fields their name (plus one byte) on top of their value.
+    """
+    if isinstance(value, str):
+        return len(value.encode()) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, dict):
+        return sum(len(name.encode()) + 1 + document_size(item) for name, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(document_size(item) for item in value)
+    return 8
+
+
+class MemoryBackend:
+    """Process-local dict storage. Values are serialized in and out like a remote store."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._values: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, user_id: Optional[str] = None) -> Optional[Any]:
+        return self.get_many([key], user_id=user_id)[key]
+
+    def set(self, key: str, value: Any, user_id: Optional[str] = None) -> None:
+        self.set_many({key: value}, user_id=user_id)
+
+    def get_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]:
+        values: Dict[str, Optional[Any]] = {}
+        for key in keys:
+            with self._lock:
+                data = self._values.get((user_id, key))
+            values[key] = None if data is None else loads_value(data)
+            if data is not None and sizes is not None:
+                sizes[key] = len(data)
+        return values
+
+    def set_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        for key, value in values.items():
+            data = dumps_value(value)
+            with self._lock:
+                self._values[(user_id, key)] = data
+            if sizes is not None:
+                sizes[key] = len(data)
+
+    async def aget(self, key: str, user_id: Optional[str] = None) -> Optional[Any]:
+        return self.get(key, user_id=user_id)
+
+    async def aset(self, key: str, value: Any, user_id: Optional[str] = None) -> None:
+        self.set(key, value, user_id=user_id)
+
+    async def aget_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]:
+        return self.get_many(keys, user_id=user_id, sizes=sizes)
+
+    async def aset_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        self.set_many(values, user_id=user_id, sizes=sizes)
+
+
+class SQLiteBackend:
+    """Single-file SQLite storage for single-node deployments and offline benchmarks."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " user_id TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, cached_at TEXT NOT NULL,"
+            " PRIMARY KEY (user_id, key))"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str, user_id: Optional[str] = None) -> Optional[Any]:
+        return self.get_many([key], user_id=user_id)[key]
+
+    def set(self, key: str, value: Any, user_id: Optional[str] = None) -> None:
+        self.set_many({key: value}, user_id=user_id)
+
+    def get_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]:
+        values: Dict[str, Optional[Any]] = {key: None for key in keys}
+        unique = list(values)
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for first in range(0, len(unique), 500):
+                chunk = unique[first:first + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM cache WHERE user_id = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [user_id or "", *chunk]
+                ).fetchall()
+                for key, data in rows:
+                    values[key] = loads_value(zlib.decompress(data))
+                    if sizes is not None:
+                        sizes[key] = len(data)
+        return values
+
+    def set_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        cached_at = datetime.now().isoformat()
+        rows = [
+            (user_id or "", key, zlib.compress(dumps_value(value)), cached_at)
+            for key, value in values.items()
+        ]
+        if sizes is not None:
+            sizes.update({key: len(data) for _, key, data, _ in rows})
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    async def aget(self, key: str, user_id: Optional[str] = None) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key, user_id)
+
+    async def aset(self, key: str, value: Any, user_id: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, user_id)
+
+    async def aget_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]:
+        return await asyncio.to_thread(self.get_many, keys, user_id, sizes)
+
+    async def aset_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        await asyncio.to_thread(self.set_many, values, user_id, sizes)
+
+
+class FirestoreBackend:
+    """
+    Firestore storage: ns_insight_cache/{user_id}/cache/{key} for user-scoped
+    keys and ns_insight_cache/{key} for global ones.
+
+    Values whose storage size (see document_size) is larger than
+    CACHE_CHUNK_SIZE (kept below Firestore's 1 MiB document limit) are
+    stored as zlib-compressed JSON
+    split over one or more chunk documents in a "chunks" subcollection of
+    the key's document, which becomes a manifest:
+    {"chunked": True, "generation": str, "chunks": n}. A write stores the new
+    generation's chunks first, then swaps the manifest (a single-document,
+    atomic write) and finally deletes the previous generation, so readers
+    always see either the old or the new value in full. A small value that
+    replaces a chunked one deletes the old chunks in the same batch.
+
+    The async methods use a firestore.AsyncClient from `async_client_factory`,
+    created per event loop since its channel cannot be shared across loops.
+    """
+
+    name = "firestore"
+
+    def __init__(self, client, async_client_factory: Optional[Callable[[], Any]] = None):
+        self.db = client
+        self._async_client_factory = async_client_factory
+        self._async_db = None
+        self._async_db_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        if self._async_db is None or self._async_db_loop is not loop:
+            self._async_db = self._async_client_factory()
+            self._async_db_loop = loop
+        return self._async_db
+
+    def _doc_ref(self, key: str, user_id: Optional[str] = None, client=None):
+        client = client or self.db
+        if user_id:
+            # User-specific cache: ns_insight_cache/{user_id}/cache/{key}
+            return client.collection(PREFIX).document(user_id).collection("cache").document(key)
+        # Global cache: ns_insight_cache/{key}
+        return client.collection(PREFIX).document(key)
+
+    @staticmethod
+    def _split(value: Any) -> Tuple[int, Optional[List[bytes]]]:
+        """
+        Return (stored size, chunk payloads) for a value.
+
+        Chunks are None when the value is stored inline; the size is then its
+        document_size, otherwise the compressed length.
+        """
+        size = document_size(value)
+        if size <= settings.CACHE_CHUNK_SIZE:
+            return size, None
+        data = zlib.compress(dumps_value(value))
+        chunk_size = settings.CACHE_CHUNK_SIZE
+        return len(data), [data[offset:offset + chunk_size] for offset in range(0, len(data), chunk_size)]
+
+    @staticmethod
+    def _chunks_per_batch() -> int:
+        # Batches are bounded by request size as well as operation count
+        return max(1, BATCH_BYTES_LIMIT // settings.CACHE_CHUNK_SIZE)
+
+    @staticmethod
+    def _manifest(generation: str, chunk_count: int) -> dict:
+        return {
+            "chunked": True,
+            "generation": generation,
+            "chunks": chunk_count,
+            "cached_at": datetime.now().isoformat(),
+        }
+
+    @staticmethod
+    def _chunk_ref(doc_ref, generation: str, index: int):
+        return doc_ref.collection("chunks").document(f"{generation}-{index:05d}")
+
+    def _chunk_refs(self, doc_ref, manifest: dict) -> list:
+        return [self._chunk_ref(doc_ref, manifest["generation"], index) for index in range(manifest["chunks"])]
+
+    def _write_chunked(self, doc_ref, chunks: List[bytes]) -> None:
+        """Store chunks plus manifest, replacing any previous chunked value."""
+        previous = doc_ref.get()
+        previous = previous.to_dict() if previous.exists else {}
+        generation = uuid.uuid4().hex
+        per_batch = self._chunks_per_batch()
+        for first in range(0, len(chunks), per_batch):
+            batch = self.db.batch()
+            for index in range(first, min(first + per_batch, len(chunks))):
+                batch.set(self._chunk_ref(doc_ref, generation, index), {"data": chunks[index]})
+            batch.commit()
+
+        doc_ref.set(self._manifest(generation, len(chunks)))
+        if previous.get("chunked"):
+            self._delete_chunks(doc_ref, previous)
+
+    def _delete_chunks(self, doc_ref, manifest: dict):
+        refs = self._chunk_refs(doc_ref, manifest)
+        for first in range(0, len(refs), BATCH_WRITE_LIMIT):
+            batch = self.db.batch()
+            for ref in refs[first:first + BATCH_WRITE_LIMIT]:
+                batch.delete(ref)
+            batch.commit()
+
+    @staticmethod
+    def _join_chunks(refs: list, chunks: Dict[str, bytes]) -> Tuple[Optional[Any], int]:
+        """Return (value, payload size) of a chunked value, or (None, 0) if a chunk is gone."""
+        if len(chunks) != len(refs):
+            # Replaced (and cleaned up) by a concurrent write
+            return None, 0
+        data = b"".join(chunks[ref.id] for ref in refs)
+        return loads_value(zlib.decompress(data)), len(data)
+
+    def _read_document(self, doc_ref, data: dict) -> Tuple[Optional[Any], int]:
+        """Return (value, payload size) of a stored document, reading its chunks with one batched read."""
+        if not data.get("chunked"):
+            return data.get("value"), document_size(data.get("value"))
+        refs = self._chunk_refs(doc_ref, data)
+        chunks = {}
+        for snapshot in self.db.get_all(refs):
+            if snapshot.exists:
+                chunks[snapshot.id] = snapshot.to_dict()["data"]
+        return self._join_chunks(refs, chunks)
+
+    def get(self, key: str, user_id: Optional[str] = None) -> Optional[Any]:
+        doc_ref = self._doc_ref(key, user_id)
+        doc = doc_ref.get()
+        if doc.exists:
+            return self._read_document(doc_ref, doc.to_dict())[0]
+        return None
+
+    def set(self, key: str, value: Any, user_id: Optional[str] = None) -> None:
+        self.set_many({key: value}, user_id)
+
+    def get_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]:
+        values: Dict[str, Optional[Any]] = {key: None for key in keys}
+        unique = list(values)
+        for first in range(0, len(unique), BATCH_READ_LIMIT):
+            refs = {key: self._doc_ref(key, user_id) for key in unique[first:first + BATCH_READ_LIMIT]}
+            keys_by_id = {ref.id: key for key, ref in refs.items()}
+            for snapshot in self.db.get_all(list(refs.values())):
+                if snapshot.exists:
+                    key = keys_by_id[snapshot.id]
+                    values[key], size = self._read_document(refs[key], snapshot.to_dict())
+                    if sizes is not None and values[key] is not None:
+                        sizes[key] = size
+        return values
+
+    def _chunked_manifests(self, refs: list) -> Dict[str, dict]:
+        """Return the manifests stored under the given refs, by document id, for those holding a chunked value."""
+        manifests = {}
+        for first in range(0, len(refs), BATCH_READ_LIMIT):
+            for snapshot in self.db.get_all(refs[first:first + BATCH_READ_LIMIT], field_paths=MANIFEST_FIELDS):
+                if snapshot.exists and snapshot.to_dict().get("chunked"):
+                    manifests[snapshot.id] = snapshot.to_dict()
+        return manifests
+
+    def _inline_batches(self, inline: List[Tuple[Any, Any, int]], manifests: Dict[str, dict]) -> List[list]:
+        """
+        Group inline writes, as (doc_ref, value, chunk refs to delete), into
+        batches within BATCH_WRITE_LIMIT operations and BATCH_BYTES_LIMIT bytes.
+
+        The chunks of a chunked value being replaced are deleted in the same
+        batch as the write that replaces its manifest.
+        """
+        batches: List[list] = [[]]
+        operations = 0
+        payload = 0
+        for doc_ref, value, size in inline:
+            manifest = manifests.get(doc_ref.id)
+            stale = self._chunk_refs(doc_ref, manifest) if manifest else []
+            if batches[-1] and (
+                operations + 1 + len(stale) > BATCH_WRITE_LIMIT or payload + size > BATCH_BYTES_LIMIT
+            ):
+                batches.append([])
+                operations = 0
+                payload = 0
+            batches[-1].append((doc_ref, value, stale))
+            operations += 1 + len(stale)
+            payload += size
+        return [writes for writes in batches if writes]
+
+    def set_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        inline = []
+        for key, value in values.items():
+            doc_ref = self._doc_ref(key, user_id)
+            size, chunks = self._split(value)
+            if sizes is not None:
+                sizes[key] = size
+            if chunks:
+                self._write_chunked(doc_ref, chunks)
+            else:
+                inline.append((doc_ref, value, size))
+        if not inline:
+            return
+        cached_at = datetime.now().isoformat()
+        manifests = self._chunked_manifests([doc_ref for doc_ref, _, _ in inline])
+        for writes in self._inline_batches(inline, manifests):
+            batch = self.db.batch()
+            for doc_ref, value, stale in writes:
+                batch.set(doc_ref, {"value": value, "cached_at": cached_at})
+                for ref in stale:
+                    batch.delete(ref)
+            batch.commit()
+
+
+    # --- Async API (firestore.AsyncClient) ---
+
+    async def _awrite_chunked(self, db, doc_ref, chunks: List[bytes]) -> None:
+        snapshot = await doc_ref.get()
+        previous = snapshot.to_dict() if snapshot.exists else {}
+        generation = uuid.uuid4().hex
+        per_batch = self._chunks_per_batch()
+        for first in range(0, len(chunks), per_batch):
+            batch = db.batch()
+            for index in range(first, min(first + per_batch, len(chunks))):
+                batch.set(self._chunk_ref(doc_ref, generation, index), {"data": chunks[index]})
+            await batch.commit()
+
+        await doc_ref.set(self._manifest(generation, len(chunks)))
+        if previous.get("chunked"):
+            refs = self._chunk_refs(doc_ref, previous)
+            for first in range(0, len(refs), BATCH_WRITE_LIMIT):
+                batch = db.batch()
+                for ref in refs[first:first + BATCH_WRITE_LIMIT]:
+                    batch.delete(ref)
+                await batch.commit()
+
+    async def _aread_document(self, db, doc_ref, data: dict) -> Tuple[Optional[Any], int]:
+        if not data.get("chunked"):
+            return data.get("value"), document_size(data.get("value"))
+        refs = self._chunk_refs(doc_ref, data)
+        chunks = {}
+        async for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                chunks[snapshot.id] = snapshot.to_dict()["data"]
+        return self._join_chunks(refs, chunks)
+
+    async def aget(self, key: str, user_id: Optional[str] = None) -> Optional[Any]:
+        if self._async_client_factory is None:
+            return await asyncio.to_thread(self.get, key, user_id)
+        db = self._async_client()
+        doc_ref = self._doc_ref(key, user_id, client=db)
+        doc = await doc_ref.get()
+        if doc.exists:
+            return (await self._aread_document(db, doc_ref, doc.to_dict()))[0]
+        return None
+
+    async def aset(self, key: str, value: Any, user_id: Optional[str] = None) -> None:
+        await self.aset_many({key: value}, user_id)
+
+    async def aget_many(
+        self, keys: List[str], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Optional[Any]]:
+        if self._async_client_factory is None:
+            return await asyncio.to_thread(self.get_many, keys, user_id, sizes)
+        db = self._async_client()
+        values: Dict[str, Optional[Any]] = {key: None for key in keys}
+        unique = list(values)
+        for first in range(0, len(unique), BATCH_READ_LIMIT):
+            refs = {key: self._doc_ref(key, user_id, client=db) for key in unique[first:first + BATCH_READ_LIMIT]}
+            keys_by_id = {ref.id: key for key, ref in refs.items()}
+            async for snapshot in db.get_all(list(refs.values())):
+                if snapshot.exists:
+                    key = keys_by_id[snapshot.id]
+                    values[key], size = await self._aread_document(db, refs[key], snapshot.to_dict())
+                    if sizes is not None and values[key] is not None:
+                        sizes[key] = size
+        return values
+
+    async def aset_many(
+        self, values: Dict[str, Any], user_id: Optional[str] = None, sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        if self._async_client_factory is None:
+            return await asyncio.to_thread(self.set_many, values, user_id, sizes)
+        db = self._async_client()
+        inline = []
+        for key, value in values.items():
+            doc_ref = self._doc_ref(key, user_id, client=db)
+            size, chunks = self._split(value)
+            if sizes is not None:
+                sizes[key] = size
+            if chunks:
+                await self._awrite_chunked(db, doc_ref, chunks)
+            else:
+                inline.append((doc_ref, value, size))
+        if not inline:
+            return
+        cached_at = datetime.now().isoformat()
+        refs = [doc_ref for doc_ref, _, _ in inline]
+        manifests = {}
+        for first in range(0, len(refs), BATCH_READ_LIMIT):
+            async for snapshot in db.get_all(refs[first:first + BATCH_READ_LIMIT], field_paths=MANIFEST_FIELDS):
+                if snapshot.exists and snapshot.to_dict().get("chunked"):
+                    manifests[snapshot.id] = snapshot.to_dict()
+        for writes in self._inline_batches(inline, manifests):
+            batch = db.batch()
+            for doc_ref, value, stale in writes:
+                batch.set(doc_ref, {"value": value, "cached_at": cached_at})
+                for ref in stale:
+                    batch.delete(ref)
+            await batch.commit()
+
+
+def create_backend(name: str) -> Optional[CacheBackend]:
+    """
+    Create the backend selected by name.
+
+    Raises:
+        ValueError: For an unknown backend name, or "firestore" without GCP_PROJECT_ID.
+    """
+    if name == "none":
+        return None
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(settings.CACHE_SQLITE_PATH)
+    if name == "firestore":
+        if not settings.GCP_PROJECT_ID:
+            raise ValueError("The firestore cache backend requires GCP_PROJECT_ID")
+        return FirestoreBackend(
+            firestore.Client(project=settings.GCP_PROJECT_ID),
+            async_client_factory=lambda: firestore.AsyncClient(project=settings.GCP_PROJECT_ID)
+        )
+    raise ValueError(f"Unknown cache backend: {name}")
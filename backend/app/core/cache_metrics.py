@@ -0,0 +1,226 @@
+"""
+Cache metrics per key family and tier.
+
+`app/core/cache.py` reports every lookup and write here. Keys are grouped
+into families by their prefix ("entries_day_2026-01-29" -> "entries"), and
+each family tracks:
+
+- lookups answered from any tier (hits) or not at all (misses by reason:
+  "absent", "expired" in the memory tier, or "decode_error" for stored
+  values that could not be decoded),
+- per tier ("memory", "backend"): hits, misses by reason, read and write
+  latency histograms and the size of the values read and written. The
+  backend tier counts the payload bytes each backend actually read or
+  wrote ("bytes_read", "bytes_written"; see cache_backends). The memory
+  tier holds Python objects rather than bytes, so it counts the estimated
+  size it accounts its entries with instead ("estimated_size_read",
+  "estimated_size_written"; see memory_cache.estimate_size).
+
+A lookup's miss reason is the one of the last tier consulted, so "expired"
+only shows at family level when no backend sits behind the memory tier.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from .memory_cache import ABSENT, EXPIRED
+
+DECODE_ERROR = "decode_error"
+
+MEMORY_TIER = "memory"
+BACKEND_TIER = "backend"
+
+# Upper bounds (ms) of the latency histogram buckets; slower calls go to "inf"
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def key_family(key: str) -> str:
+    """Return the family of a cache key, e.g. "entries" for "entries_day_2026-01-29"."""
+    return key.split("_", 1)[0]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (non-cumulative counts per bucket)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.count += 1
+        self.total_ms += ms
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        labels = [str(bound) for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class TierMetrics:
+    """Counters of one tier for one key family."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses: Dict[str, int] = {ABSENT: 0, EXPIRED: 0}
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.estimated_size_read = 0
+        self.estimated_size_written = 0
+        self.read_latency = LatencyHistogram()
+        self.write_latency = LatencyHistogram()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + sum(self.misses.values())
+        return {
+            "hits": self.hits,
+            "misses": dict(self.misses),
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "writes": self.writes,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "estimated_size_read": self.estimated_size_read,
+            "estimated_size_written": self.estimated_size_written,
+            "read_latency": self.read_latency.stats(),
+            "write_latency": self.write_latency.stats(),
+        }
+
+
+class FamilyMetrics:
+    """Lookup outcomes and per-tier counters of one key family."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses: Dict[str, int] = {ABSENT: 0, EXPIRED: 0, DECODE_ERROR: 0}
+        self.tiers: Dict[str, TierMetrics] = {}
+
+    def tier(self, name: str) -> TierMetrics:
+        metrics = self.tiers.get(name)
+        if metrics is None:
+            metrics = self.tiers[name] = TierMetrics()
+        return metrics
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + sum(self.misses.values())
+        return {
+            "hits": self.hits,
+            "misses": dict(self.misses),
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "tiers": {name: tier.stats() for name, tier in self.tiers.items()},
+        }
+
+
+class CacheMetrics:
+    """Thread-safe registry of FamilyMetrics."""
+
+    def __init__(self):
+        self._families: Dict[str, FamilyMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _family(self, key: str) -> FamilyMetrics:
+        family = key_family(key)
+        metrics = self._families.get(family)
+        if metrics is None:
+            metrics = self._families[family] = FamilyMetrics()
+        return metrics
+
+    def record_read(
+        self,
+        tier: str,
+        values: Dict[str, Optional[Any]],
+        seconds: float,
+        reasons: Optional[Dict[str, str]] = None,
+        sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        """
+        Record one read call of a tier.
+
+        Args:
+            tier: MEMORY_TIER or BACKEND_TIER.
+            values: The keys read and their values (None for misses).
+            seconds: Duration of the call; observed once per family involved.
+            reasons: Miss reason per key, ABSENT for keys not listed.
+            sizes: Size per key: payload bytes for the backend tier, the
+                   estimated size for the memory tier.
+        """
+        reasons = reasons or {}
+        sizes = sizes or {}
+        with self._lock:
+            families = set()
+            for key, value in values.items():
+                family = self._family(key)
+                metrics = family.tier(tier)
+                if value is None:
+                    metrics.misses[reasons.get(key, ABSENT)] += 1
+                elif tier == BACKEND_TIER:
+                    metrics.hits += 1
+                    metrics.bytes_read += sizes.get(key, 0)
+                else:
+                    metrics.hits += 1
+                    metrics.estimated_size_read += sizes.get(key, 0)
+                if family not in families:
+                    families.add(family)
+                    metrics.read_latency.observe(seconds)
+
+    def record_write(
+        self,
+        tier: str,
+        values: Dict[str, Any],
+        seconds: float,
+        sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Record one write call of a tier; `sizes` as in record_read."""
+        sizes = sizes or {}
+        with self._lock:
+            families = set()
+            for key, value in values.items():
+                family = self._family(key)
+                metrics = family.tier(tier)
+                metrics.writes += 1
+                if tier == BACKEND_TIER:
+                    metrics.bytes_written += sizes.get(key, 0)
+                else:
+                    metrics.estimated_size_written += sizes.get(key, 0)
+                if family not in families:
+                    families.add(family)
+                    metrics.write_latency.observe(seconds)
+
+    def record_lookups(self, values: Dict[str, Optional[Any]], reasons: Optional[Dict[str, str]] = None) -> None:
+        """Record the final outcome of lookups: a hit from any tier, or a miss and its reason."""
+        reasons = reasons or {}
+        with self._lock:
+            for key, value in values.items():
+                family = self._family(key)
+                if value is None:
+                    family.misses[reasons.get(key, ABSENT)] += 1
+                else:
+                    family.hits += 1
+
+    def record_decode_error(self, key: str) -> None:
+        """Turn a lookup hit into a miss because the stored value could not be decoded."""
+        with self._lock:
+            family = self._family(key)
+            family.hits -= 1
+            family.misses[DECODE_ERROR] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the metrics of every key family seen so far."""
+        with self._lock:
+            return {name: self._families[name].stats() for name in sorted(self._families)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._families.clear()
+
+
+cache_metrics = CacheMetrics()
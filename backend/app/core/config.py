@@ -7,7 +7,56 @@ class Settings:
     ENABLE_CLOUD_LOGGING: bool = os.getenv("ENABLE_CLOUD_LOGGING", "True").lower() == "true"
     GCP_PROJECT_ID: str = os.getenv("GCP_PROJECT_ID", "")
     CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+    # Cache storage: "firestore", "sqlite", "memory" or "none" (see app/core/cache_backends.py)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "firestore" if os.getenv("GCP_PROJECT_ID") else "memory").lower()
+    CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH", "ns_cache.sqlite3")
+    # Values larger than this many bytes are split over several Firestore documents
+    CACHE_CHUNK_SIZE: int = int(os.getenv("CACHE_CHUNK_SIZE", str(900 * 1024)))
+    # In-process memory tier in front of Firestore (TTL in seconds)
+    MEMORY_CACHE_ENABLED: bool = os.getenv("MEMORY_CACHE_ENABLED", "True").lower() == "true"
+    MEMORY_CACHE_MAX_BYTES: int = int(os.getenv("MEMORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    MEMORY_CACHE_TTL: float = float(os.getenv("MEMORY_CACHE_TTL", "300"))
+    # Cached data for days that have not elapsed yet: fresh for CACHE_OPEN_DAY_TTL
+    # seconds, then served stale (while refreshing) for up to CACHE_OPEN_DAY_MAX_STALE more
+    CACHE_OPEN_DAY_TTL: float = float(os.getenv("CACHE_OPEN_DAY_TTL", "60"))
+    CACHE_OPEN_DAY_MAX_STALE: float = float(os.getenv("CACHE_OPEN_DAY_MAX_STALE", "900"))
+    # Background warmer that loads active users' yesterday and today into the cache
+    # during off-peak UTC hours (comma separated), at most once per CACHE_WARMER_INTERVAL seconds
+    CACHE_WARMER_ENABLED: bool = os.getenv("CACHE_WARMER_ENABLED", "True" if os.getenv("GCP_PROJECT_ID") else "False").lower() == "true"
+    CACHE_WARMER_HOURS: str = os.getenv("CACHE_WARMER_HOURS", "3,4,5")
+    CACHE_WARMER_INTERVAL: float = float(os.getenv("CACHE_WARMER_INTERVAL", "1800"))
+    # Users who logged in or had session activity within this many days are warmed
+    CACHE_WARMER_ACTIVE_DAYS: int = int(os.getenv("CACHE_WARMER_ACTIVE_DAYS", "14"))
+    # Users warmed at once (users on the same Nightscout host are warmed one at a time)
+    CACHE_WARMER_CONCURRENCY: int = int(os.getenv("CACHE_WARMER_CONCURRENCY", "4"))
+    # Pause in seconds between two users on the same Nightscout host
+    CACHE_WARMER_HOST_DELAY: float = float(os.getenv("CACHE_WARMER_HOST_DELAY", "2"))
     NIGHTSCOUT_URL: str = os.getenv("NIGHTSCOUT_SITE", "")
     NIGHTSCOUT_API_TOKEN: str = os.getenv("NIGHTSCOUT_TOKEN", "")
 
+    # Nightscout HTTP client (timeouts in seconds)
+    NIGHTSCOUT_CONNECT_TIMEOUT: float = float(os.getenv("NIGHTSCOUT_CONNECT_TIMEOUT", "5"))
+    NIGHTSCOUT_READ_TIMEOUT: float = float(os.getenv("NIGHTSCOUT_READ_TIMEOUT", "20"))
+    NIGHTSCOUT_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("NIGHTSCOUT_MAX_CONNECTIONS_PER_HOST", "10"))
+    NIGHTSCOUT_KEEPALIVE_EXPIRY: float = float(os.getenv("NIGHTSCOUT_KEEPALIVE_EXPIRY", "30"))
+    # Days loaded in parallel against one Nightscout host by multi-day loaders
+    NIGHTSCOUT_MAX_CONCURRENT_LOADS_PER_HOST: int = int(os.getenv("NIGHTSCOUT_MAX_CONCURRENT_LOADS_PER_HOST", "4"))
+    # Nightscout host health: adaptive timeouts, retries and circuit breaker
+    NIGHTSCOUT_LATENCY_WINDOW: int = int(os.getenv("NIGHTSCOUT_LATENCY_WINDOW", "100"))
+    NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN: float = float(os.getenv("NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN", "2"))
+    NIGHTSCOUT_ADAPTIVE_TIMEOUT_MULTIPLIER: float = float(os.getenv("NIGHTSCOUT_ADAPTIVE_TIMEOUT_MULTIPLIER", "4"))
+    NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN_SAMPLES: int = int(os.getenv("NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN_SAMPLES", "20"))
+    NIGHTSCOUT_MAX_RETRIES: int = int(os.getenv("NIGHTSCOUT_MAX_RETRIES", "2"))
+    NIGHTSCOUT_RETRY_BACKOFF_BASE: float = float(os.getenv("NIGHTSCOUT_RETRY_BACKOFF_BASE", "0.2"))
+    NIGHTSCOUT_RETRY_BACKOFF_MAX: float = float(os.getenv("NIGHTSCOUT_RETRY_BACKOFF_MAX", "2"))
+    NIGHTSCOUT_RETRY_BUDGET_RATIO: float = float(os.getenv("NIGHTSCOUT_RETRY_BUDGET_RATIO", "0.1"))
+    NIGHTSCOUT_RETRY_BUDGET_MAX: float = float(os.getenv("NIGHTSCOUT_RETRY_BUDGET_MAX", "20"))
+    NIGHTSCOUT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("NIGHTSCOUT_BREAKER_FAILURE_THRESHOLD", "5"))
+    NIGHTSCOUT_BREAKER_COOLDOWN: float = float(os.getenv("NIGHTSCOUT_BREAKER_COOLDOWN", "30"))
+    # Nightscout API version: "auto" (detect per host), "v1" or "v3"
+    NIGHTSCOUT_API_VERSION: str = os.getenv("NIGHTSCOUT_API_VERSION", "auto").lower()
+    NIGHTSCOUT_API_DETECT_TTL: int = int(os.getenv("NIGHTSCOUT_API_DETECT_TTL", "3600"))
+    # Maximum number of entries requested per page when paging through long ranges
+    NIGHTSCOUT_PAGE_SIZE: int = int(os.getenv("NIGHTSCOUT_PAGE_SIZE", "1000"))
+
 settings = Settings()
@@ -0,0 +1,113 @@
+"""
+In-process memory tier for the cache.
+
+A byte-bounded LRU with per-entry TTL that sits in front of Firestore in
+`app/core/cache.py`. Entries are keyed by (user_id, key), mirroring the
+per-user Firestore subcollections, so a user's entries can be dropped at once.
+
+Cached values are shared between readers and must be treated as read-only.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Miss reasons reported by MemoryCache.lookup
+ABSENT = "absent"
+EXPIRED = "expired"
+
+CacheKey = Tuple[Optional[str], str]
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a JSON-like value (dicts, lists, scalars) in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class MemoryCache:
+    """Thread-safe LRU cache bounded by the estimated size of its values."""
+
+    def __init__(self, max_bytes: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (user_id, key) -> (value, size, expires_at)
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, user_id: Optional[str] = None) -> Optional[Any]:
+        """Return a cached value, or None if it is missing or expired."""
+        return self.lookup(key, user_id=user_id)[0]
+
+    def lookup(self, key: str, user_id: Optional[str] = None) -> Tuple[Optional[Any], Optional[str], int]:
+        """Return (value, None, estimated size) for a hit, or (None, ABSENT / EXPIRED, 0) for a miss."""
+        cache_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None, ABSENT, 0
+            if entry[2] <= time.monotonic():
+                self._remove(cache_key)
+                self.misses += 1
+                return None, EXPIRED, 0
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return entry[0], None, entry[1]
+
+    def set(self, key: str, value: Any, user_id: Optional[str] = None, ttl: Optional[float] = None) -> int:
+        """Store a value, evicting least recently used entries beyond max_bytes; returns its estimated size."""
+        size = estimate_size(value)
+        cache_key = (user_id, key)
+        with self._lock:
+            self._remove(cache_key)
+            if size > self.max_bytes:
+                return size
+            expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+            self._entries[cache_key] = (value, size, expires_at)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return size
+
+    def invalidate(self, key: str, user_id: Optional[str] = None) -> None:
+        """Drop one entry."""
+        with self._lock:
+            self._remove((user_id, key))
+
+    def invalidate_user(self, user_id: Optional[str]) -> None:
+        """Drop every entry of one user (or of the global scope for None)."""
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == user_id]:
+                self._remove(cache_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, cache_key: Hashable) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
@@ -0,0 +1,187 @@
+"""
+Compact binary encoding for cached lists of Nightscout records.
+
+Records (flat dicts such as entries or treatments) are stored column by
+column instead of as a list of JSON objects:
+
+- integer columns (date, sgv, srvModified, ...) are delta-encoded int64,
+- float columns are packed float64,
+- string columns are dictionary-encoded, and dateString-like strings equal
+  to the canonical ISO form of the record's `date` are not stored at all,
+- anything else falls back to JSON.
+
+Each column also stores a state byte per record (absent / None / present) so
+decoding reproduces the original dicts exactly. The result is zlib-compressed
+into a single bytes value prefixed with a version byte.
+"""
+
+import json
+import struct
+import zlib
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.glucose_series import canonical_date_string, is_canonical_date_string
+
+CODEC_VERSION = 1
+
+_ABSENT = 0
+_NONE = 1
+_PRESENT = 2
+
+# String column code for "canonical ISO string of the record's date"
+_DERIVED = -1
+
+_INT64_MAX = 2 ** 63 - 1
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def _column_kind(values: List[Any]) -> str:
+    """Pick the narrowest encoding that reproduces every present value exactly."""
+    kinds = {type(value) for value in values}
+    if not kinds:
+        return "json"
+    if kinds == {bool}:
+        return "bool"
+    if kinds == {int}:
+        return "int" if all(-_INT64_MAX // 2 < value < _INT64_MAX // 2 for value in values) else "json"
+    if kinds == {float}:
+        return "float"
+    if kinds == {str}:
+        return "str"
+    return "json"
+
+
+def encode_records(records: List[dict]) -> bytes:
+    """Encode a list of flat dicts into a compact, compressed payload."""
+    names: Dict[str, None] = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+
+    dates = [record.get("date") for record in records]
+    columns = []
+    buffers = []
+    for name in names:
+        states = bytearray(len(records))
+        values = []
+        for index, record in enumerate(records):
+            if name not in record:
+                continue
+            value = record[name]
+            if value is None:
+                states[index] = _NONE
+            else:
+                states[index] = _PRESENT
+                values.append(value)
+
+        kind = _column_kind(values)
+        column: Dict[str, Any] = {"name": name, "kind": kind}
+        if kind == "int":
+            deltas = array("q")
+            previous = 0
+            for value in values:
+                deltas.append(value - previous)
+                previous = value
+            data = deltas.tobytes()
+        elif kind == "bool":
+            data = bytes(values)
+        elif kind == "float":
+            data = array("d", values).tobytes()
+        elif kind == "str":
+            table: Dict[str, int] = {}
+            codes = array("i")
+            present = (index for index, state in enumerate(states) if state == _PRESENT)
+            for index, value in zip(present, values):
+                date_ms = dates[index]
+                if isinstance(date_ms, int) and is_canonical_date_string(value, date_ms):
+                    codes.append(_DERIVED)
+                else:
+                    codes.append(table.setdefault(value, len(table)))
+            column["table"] = list(table)
+            data = codes.tobytes()
+        else:
+            data = json.dumps(values, separators=(",", ":")).encode()
+
+        column["size"] = len(data)
+        columns.append(column)
+        buffers.append(bytes(states))
+        buffers.append(data)
+
+    header = json.dumps({"n": len(records), "columns": columns}, separators=(",", ":")).encode()
+    body = _HEADER_LENGTH.pack(len(header)) + header + b"".join(buffers)
+    return bytes([CODEC_VERSION]) + zlib.compress(body)
+
+
+def _decode_columns(payload: bytes) -> Tuple[int, List[Tuple[str, bytes, List[Any], Optional[array]]]]:
+    """
+    Decode a payload into (record count, [(name, states, present values, string codes)]).
+
+    String values are resolved through their table, with _DERIVED codes left
+    as None placeholders (see the returned codes) for the caller to fill in.
+    """
+    if payload[0] != CODEC_VERSION:
+        raise ValueError(f"Unsupported cache payload version {payload[0]}")
+    body = zlib.decompress(payload[1:])
+    (header_length,) = _HEADER_LENGTH.unpack_from(body)
+    offset = _HEADER_LENGTH.size
+    header = json.loads(body[offset:offset + header_length])
+    offset += header_length
+    count = header["n"]
+
+    columns = []
+    for column in header["columns"]:
+        states = body[offset:offset + count]
+        offset += count
+        data = body[offset:offset + column["size"]]
+        offset += column["size"]
+
+        kind = column["kind"]
+        if kind == "int":
+            deltas = array("q")
+            deltas.frombytes(data)
+            values = list(accumulate(deltas))
+        elif kind == "bool":
+            values = [bool(value) for value in data]
+        elif kind == "float":
+            floats = array("d")
+            floats.frombytes(data)
+            values = floats.tolist()
+        elif kind == "str":
+            codes = array("i")
+            codes.frombytes(data)
+            table = column["table"]
+            values = [None if code == _DERIVED else table[code] for code in codes]
+            columns.append((column["name"], states, values, codes))
+            continue
+        else:
+            values = json.loads(data)
+        columns.append((column["name"], states, values, None))
+    return count, columns
+
+
+def decode_records(payload: bytes) -> List[dict]:
+    """Decode a payload back into the list of dicts it was built from."""
+    count, columns = _decode_columns(payload)
+    records: List[dict] = [{} for _ in range(count)]
+    derived = []
+    for name, states, values, codes in columns:
+        if len(values) == count:
+            # Present in every record: no state checks needed
+            for record, value in zip(records, values):
+                record[name] = value
+        else:
+            present = iter(values)
+            for index, state in enumerate(states):
+                if state == _PRESENT:
+                    records[index][name] = next(present)
+                elif state == _NONE:
+                    records[index][name] = None
+        if codes is not None:
+            present_rows = (index for index, state in enumerate(states) if state == _PRESENT)
+            derived.extend((index, name) for index, code in zip(present_rows, codes) if code == _DERIVED)
+
+    # Derived strings need the record's date, which may be in a later column
+    for index, name in derived:
+        records[index][name] = canonical_date_string(records[index]["date"])
+    return records
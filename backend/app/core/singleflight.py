@@ -0,0 +1,65 @@
+"""
+In-process request coalescing ("single-flight").
+
+Concurrent callers that ask for the same key while a call for it is already
+in flight await that call's result instead of issuing a duplicate one.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, TypeVar
+
+T = TypeVar("T")
+
+# All SingleFlight groups, for metrics reporting
+_groups: List["SingleFlight"] = []
+
+
+class SingleFlight:
+    """A named group of coalesced calls with hit counters."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        _groups.append(self)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn` for `key`, or wait for the call already in flight for it.
+
+        The result (or exception) of the leading call is shared with every
+        caller that joined it, so results must be treated as read-only.
+        The call runs in its own task: cancelling any caller, the first one
+        included, does not cancel it for the others.
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Avoid "exception was never retrieved" warnings when every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters for this group."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the counters of every SingleFlight group, keyed by name."""
+    return {group.name: group.stats() for group in _groups}
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import traceback
+from contextlib import asynccontextmanager
 
 import firebase_admin
 from fastapi import FastAPI, Request
@@ -10,9 +12,12 @@ from .api.routes import router
 from .api.users import router as users_router
 from .api.admin import router as admin_router
 from .api.nightscout import router as nightscout_router
+from .api.insights import router as insights_router
 from .core.config import settings
 from .core.logging import setup_logging
 from .services.activity_logging_service import activity_logging
+from .services.cache_warmer import run_cache_warmer
+from .services.nightscout_client import close_clients
 
 # Setup logging
 setup_logging()
@@ -24,11 +29,22 @@ except ValueError:
     firebase_admin.initialize_app()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmer = asyncio.create_task(run_cache_warmer()) if settings.CACHE_WARMER_ENABLED else None
+    yield
+    if warmer:
+        warmer.cancel()
+    # Close pooled Nightscout connections on shutdown
+    await close_clients()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.DESCRIPTION,
-    version=settings.VERSION
+    version=settings.VERSION,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -45,6 +61,7 @@ app.include_router(router)
 app.include_router(users_router, prefix="/users", tags=["users"])
 app.include_router(admin_router, tags=["admin"])
 app.include_router(nightscout_router, prefix="/nightscout", tags=["nightscout"])
+app.include_router(insights_router, prefix="/insights", tags=["insights"])
 
 
 @app.exception_handler(Exception)
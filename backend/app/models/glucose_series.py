@@ -0,0 +1,259 @@
+"""
+Columnar, array-backed container for Nightscout glucose entries.
+
+A day of CGM data is ~288 entries; as Pydantic `Entry` objects each one
+carries several strings plus a per-object dict. GlucoseSeries stores the same
+data as typed columns (int64 epoch-ms timestamps, int16 sgv, int8 trend,
+interned direction codes) and only materializes `Entry` objects when a caller
+indexes or iterates the series.
+"""
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union, overload
+
+from .entry import Entry
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; columns are plain arrays without it
+    np = None
+
+# Sentinels for missing values in the typed columns
+SGV_MISSING = -1
+TREND_MISSING = -128
+
+# Code of a string beyond the 255 a dictionary-encoded column can intern;
+# the series keeps such values in its overflow_values instead
+OTHER_CODE = 255
+
+# Process-wide interned direction strings; code 0 means "no direction"
+DIRECTIONS: List[Optional[str]] = [
+    None, "NONE", "DoubleUp", "SingleUp", "FortyFiveUp", "Flat",
+    "FortyFiveDown", "SingleDown", "DoubleDown", "NOT COMPUTABLE", "RATE OUT OF RANGE",
+]
+_DIRECTION_CODES: Dict[Optional[str], int] = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+
+def direction_code(direction: Optional[str]) -> int:
+    """Return the interned code of a direction string, registering new ones, or OTHER_CODE once the table is full."""
+    code = _DIRECTION_CODES.get(direction)
+    if code is None:
+        if len(DIRECTIONS) >= OTHER_CODE:
+            return OTHER_CODE
+        code = len(DIRECTIONS)
+        DIRECTIONS.append(direction)
+        _DIRECTION_CODES[direction] = code
+    return code
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MS = timedelta(milliseconds=1)
+
+
+def canonical_date_string(date_ms: int) -> str:
+    """Return the ISO string Nightscout derives from an epoch-ms date, e.g. "2026-01-29T10:00:00.000Z"."""
+    moment = datetime.fromtimestamp(date_ms / 1000, tz=timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def is_canonical_date_string(value: Optional[str], date_ms: int) -> bool:
+    """Whether `value` equals canonical_date_string(date_ms), checked without formatting."""
+    if not value or len(value) != 24 or value[10] != "T" or value[19] != "." or value[23] != "Z":
+        return False
+    try:
+        return (datetime.fromisoformat(value) - _EPOCH) // _ONE_MS == date_ms
+    except ValueError:
+        return False
+
+
+class GlucoseSeries(Sequence[Entry]):
+    """
+    Compact column store for glucose entries.
+
+    Indexing or iterating yields `Entry` objects built on demand; bulk consumers
+    should use the columns (`dates`, `sgv`, ...) or `sgv_values()` directly.
+    """
+
+    __slots__ = (
+        "ids", "dates", "sgv", "trend", "direction_codes", "utc_offsets",
+        "type_codes", "types", "device_codes", "devices",
+        "string_overrides", "overflow_values", "cached_at",
+    )
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.dates = array("q")
+        self.sgv = array("h")
+        self.trend = array("b")
+        self.direction_codes = array("B")
+        self.utc_offsets = array("h")
+        # Per-series dictionary encoding of low-cardinality strings
+        self.type_codes = array("B")
+        self.types: List[str] = []
+        self.device_codes = array("B")
+        self.devices: List[str] = []
+        # dateString/sysTime for the few entries that differ from canonical_date_string
+        self.string_overrides: Dict[int, tuple] = {}
+        # direction/type/device values of the entries coded OTHER_CODE
+        self.overflow_values: Dict[int, Dict[str, Optional[str]]] = {}
+        self.cached_at: Optional[str] = None
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Entry]) -> "GlucoseSeries":
+        """Build a series from validated Entry objects."""
+        series = cls()
+        for entry in entries:
+            series.append(entry)
+        return series
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "GlucoseSeries":
+        """
+        Build a series from raw entry dicts without Pydantic validation.
+
+        Only use this for records that were validated before, e.g. cached data.
+        """
+        series = cls()
+        for record in records:
+            series.append_record(record)
+        return series
+
+    @staticmethod
+    def _encode(value: str, table: List[str]) -> int:
+        try:
+            return table.index(value)
+        except ValueError:
+            if len(table) >= OTHER_CODE:
+                return OTHER_CODE
+            table.append(value)
+            return len(table) - 1
+
+    def _append_code(self, codes: array, index: int, field: str, code: int, value: Optional[str]) -> None:
+        codes.append(code)
+        if code == OTHER_CODE:
+            self.overflow_values.setdefault(index, {})[field] = value
+
+    def _decode(self, index: int, field: str, code: int, table: List[Optional[str]]) -> Optional[str]:
+        if code == OTHER_CODE:
+            return self.overflow_values[index][field]
+        return table[code]
+
+    def append_record(self, record: dict) -> None:
+        """Append one raw entry dict (Nightscout JSON field names)."""
+        date_ms = int(record["date"])
+        sgv = record.get("sgv")
+        trend = record.get("trend")
+
+        index = len(self.ids)
+        self.ids.append(record["_id"])
+        self.dates.append(date_ms)
+        self.sgv.append(SGV_MISSING if sgv is None else int(sgv))
+        self.trend.append(TREND_MISSING if trend is None else int(trend))
+        direction = record.get("direction")
+        self._append_code(self.direction_codes, index, "direction", direction_code(direction), direction)
+        self.utc_offsets.append(int(record.get("utcOffset", 0)))
+        self._append_code(self.type_codes, index, "type", self._encode(record["type"], self.types), record["type"])
+        self._append_code(
+            self.device_codes, index, "device", self._encode(record["device"], self.devices), record["device"]
+        )
+
+        date_string = record.get("dateString")
+        sys_time = record.get("sysTime")
+        if sys_time != date_string or not is_canonical_date_string(date_string, date_ms):
+            self.string_overrides[index] = (date_string, sys_time)
+
+        if self.cached_at is None:
+            self.cached_at = record.get("cached_at")
+
+    def append(self, entry: Entry) -> None:
+        """Append one Entry."""
+        self.append_record({
+            "_id": entry.id,
+            "type": entry.type,
+            "date": entry.date,
+            "dateString": entry.dateString,
+            "cached_at": entry.cached_at,
+            "sgv": entry.sgv,
+            "trend": entry.trend,
+            "direction": entry.direction,
+            "device": entry.device,
+            "utcOffset": entry.utcOffset,
+            "sysTime": entry.sysTime,
+        })
+
+    def extend(self, entries: Iterable[Entry]) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def record(self, index: int) -> dict:
+        """Return entry `index` as a raw dict (Nightscout JSON field names)."""
+        date_ms = self.dates[index]
+        sgv = self.sgv[index]
+        trend = self.trend[index]
+        canonical = canonical_date_string(date_ms)
+        date_string, sys_time = self.string_overrides.get(index, (canonical, canonical))
+        return {
+            "_id": self.ids[index],
+            "type": self._decode(index, "type", self.type_codes[index], self.types),
+            "date": date_ms,
+            "dateString": date_string,
+            "cached_at": self.cached_at or "",
+            "sgv": None if sgv == SGV_MISSING else sgv,
+            "trend": None if trend == TREND_MISSING else trend,
+            "direction": self._decode(index, "direction", self.direction_codes[index], DIRECTIONS),
+            "device": self._decode(index, "device", self.device_codes[index], self.devices),
+            "utcOffset": self.utc_offsets[index],
+            "sysTime": sys_time,
+        }
+
+    def to_records(self) -> List[dict]:
+        """Return all entries as raw dicts, e.g. for caching."""
+        return [self.record(index) for index in range(len(self))]
+
+    @overload
+    def __getitem__(self, index: int) -> Entry: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Entry]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Entry, List[Entry]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("GlucoseSeries index out of range")
+        # Columns hold already-validated data, so skip validation
+        return Entry.model_construct(**self.record(index))
+
+    def __iter__(self) -> Iterator[Entry]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def sgv_values(self) -> List[int]:
+        """Return all valid sgv (glucose) values."""
+        return [value for value in self.sgv if value != SGV_MISSING]
+
+    def sgv_array(self):
+        """Return valid sgv values as a NumPy int16 array (requires NumPy)."""
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        values = np.frombuffer(self.sgv, dtype=np.int16)
+        return values[values != SGV_MISSING]
+
+    def dates_array(self):
+        """Return the epoch-ms timestamps as a zero-copy NumPy int64 array (requires NumPy)."""
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        return np.frombuffer(self.dates, dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the typed columns, excluding ids."""
+        columns = (self.dates, self.sgv, self.trend, self.direction_codes, self.utc_offsets,
+                   self.type_codes, self.device_codes)
+        return sum(column.itemsize * len(column) for column in columns)
@@ -1,6 +1,6 @@
 
 from enum import Enum
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
@@ -91,3 +91,72 @@ class UserWithActivityResponse(BaseModel):
     total_errors: int = 0
     last_activity: Optional[str] = None  # ISO format string
 
+
+class SingleFlightStatsResponse(BaseModel):
+    calls: int = 0
+    coalesced: int = 0
+    coalesced_ratio: float = 0.0
+    in_flight: int = 0
+
+
+class LatencyHistogramResponse(BaseModel):
+    count: int = 0
+    mean_ms: Optional[float] = None
+    buckets: Dict[str, int]
+
+
+class CacheTierMetricsResponse(BaseModel):
+    hits: int = 0
+    misses: Dict[str, int]
+    hit_ratio: Optional[float] = None
+    writes: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    estimated_size_read: int = 0
+    estimated_size_written: int = 0
+    read_latency: LatencyHistogramResponse
+    write_latency: LatencyHistogramResponse
+
+
+class CacheFamilyMetricsResponse(BaseModel):
+    hits: int = 0
+    misses: Dict[str, int]
+    hit_ratio: Optional[float] = None
+    tiers: Dict[str, CacheTierMetricsResponse]
+
+
+class MemoryCacheStatsResponse(BaseModel):
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class CacheMetricsResponse(BaseModel):
+    families: Dict[str, CacheFamilyMetricsResponse]
+    memory_tier: Optional[MemoryCacheStatsResponse] = None
+
+
+class HostHealthResponse(BaseModel):
+    state: str
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    read_timeout_ms: Optional[float] = None
+    consecutive_failures: int = 0
+    total_requests: int = 0
+    total_failures: int = 0
+    rejected_requests: int = 0
+
+
+class RetryBudgetResponse(BaseModel):
+    tokens: float
+    retries: int = 0
+    exhausted: int = 0
+
+
+class NightscoutHealthResponse(BaseModel):
+    hosts: Dict[str, HostHealthResponse]
+    retry_budget: RetryBudgetResponse
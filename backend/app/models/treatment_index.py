@@ -0,0 +1,158 @@
+"""
+Indexed container for Nightscout treatments.
+
+TreatmentIndex keeps the treatments in their original order and, as they are
+added, maintains a per-eventType index sorted by time plus running carbs and
+insulin totals. Counters and totals are then O(1) lookups and time-window
+queries ("all boluses between t1 and t2") are binary searches.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+from .treatment import Treatment
+
+# Event types that deliver a bolus
+BOLUS_EVENT_TYPES = ("Bolus", "Correction Bolus", "Meal Bolus", "Snack Bolus", "Combo Bolus", "SMB")
+
+TimeBound = Union[datetime, int]
+
+
+def treatment_epoch_ms(treatment: Treatment) -> Optional[int]:
+    """Return a treatment's time in epoch ms, preferring created_at over date."""
+    if treatment.created_at:
+        try:
+            parsed = datetime.fromisoformat(treatment.created_at)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return int(parsed.timestamp() * 1000)
+        except ValueError:
+            pass
+    return treatment.date
+
+
+def _to_ms(bound: TimeBound) -> int:
+    if isinstance(bound, datetime):
+        if bound.tzinfo is None:
+            bound = bound.replace(tzinfo=timezone.utc)
+        return int(bound.timestamp() * 1000)
+    return bound
+
+
+class TreatmentIndex(Sequence[Treatment]):
+    """
+    Treatments with a per-eventType time index and running totals.
+
+    Behaves like a read-only list of treatments in insertion order; use
+    `append`/`extend` to add treatments so the index stays current.
+    """
+
+    __slots__ = ("_treatments", "_by_type", "_untimed", "total_carbs", "total_insulin")
+
+    def __init__(self, treatments: Iterable[Treatment] = ()):
+        self._treatments: List[Treatment] = []
+        # eventType -> (sorted epoch ms, treatments in the same order)
+        self._by_type: Dict[str, Tuple[List[int], List[Treatment]]] = {}
+        # eventType -> number of treatments without a usable timestamp
+        self._untimed: Dict[str, int] = {}
+        self.total_carbs = 0
+        self.total_insulin = 0
+        self.extend(treatments)
+
+    def _add(self, treatment: Treatment) -> Optional[int]:
+        """Record a treatment and its totals; return its time if it has to be indexed."""
+        self._treatments.append(treatment)
+        if treatment.carbs is not None:
+            self.total_carbs += treatment.carbs
+        if treatment.insulin is not None:
+            self.total_insulin += treatment.insulin
+
+        ms = treatment_epoch_ms(treatment)
+        if ms is None:
+            self._untimed[treatment.eventType] = self._untimed.get(treatment.eventType, 0) + 1
+        return ms
+
+    def append(self, treatment: Treatment) -> None:
+        """Add one treatment and update the index and totals."""
+        ms = self._add(treatment)
+        if ms is None:
+            return
+        times, items = self._by_type.setdefault(treatment.eventType, ([], []))
+        # bisect_right keeps insertion order among treatments sharing a timestamp
+        position = bisect_right(times, ms)
+        times.insert(position, ms)
+        items.insert(position, treatment)
+
+    def extend(self, treatments: Iterable[Treatment]) -> None:
+        """Add many treatments, re-sorting each touched eventType once."""
+        touched: Dict[str, List[Tuple[int, Treatment]]] = {}
+        for treatment in treatments:
+            ms = self._add(treatment)
+            if ms is not None:
+                touched.setdefault(treatment.eventType, []).append((ms, treatment))
+
+        for event_type, added in touched.items():
+            times, items = self._by_type.setdefault(event_type, ([], []))
+            # Stable sort keeps insertion order among treatments sharing a timestamp
+            merged = sorted([*zip(times, items), *added], key=lambda pair: pair[0])
+            times[:] = [ms for ms, _ in merged]
+            items[:] = [treatment for _, treatment in merged]
+
+    def event_count(self, event_type: str) -> int:
+        """Number of treatments with the given eventType."""
+        indexed = self._by_type.get(event_type)
+        return (len(indexed[0]) if indexed else 0) + self._untimed.get(event_type, 0)
+
+    def event_types(self) -> List[str]:
+        """All eventTypes present."""
+        return sorted(set(self._by_type) | set(self._untimed))
+
+    def between(
+        self,
+        start: TimeBound,
+        end: TimeBound,
+        event_types: Optional[Iterable[str]] = None
+    ) -> List[Treatment]:
+        """
+        Return the treatments with start <= time < end, oldest first.
+
+        Args:
+            start: Window start as a datetime (naive means UTC) or epoch ms.
+            end: Window end (exclusive), same forms as start.
+            event_types: Optional eventTypes to restrict the query to.
+        """
+        start_ms = _to_ms(start)
+        end_ms = _to_ms(end)
+        types = list(self._by_type if event_types is None else event_types)
+        matches: List[Tuple[int, Treatment]] = []
+        for event_type in types:
+            indexed = self._by_type.get(event_type)
+            if not indexed:
+                continue
+            times, items = indexed
+            low = bisect_left(times, start_ms)
+            high = bisect_left(times, end_ms, low)
+            matches.extend(zip(times[low:high], items[low:high]))
+        if len(types) > 1:
+            matches.sort(key=lambda match: match[0])
+        return [treatment for _, treatment in matches]
+
+    def boluses_between(self, start: TimeBound, end: TimeBound) -> List[Treatment]:
+        """Return the bolus treatments with start <= time < end, oldest first."""
+        return self.between(start, end, BOLUS_EVENT_TYPES)
+
+    def __len__(self) -> int:
+        return len(self._treatments)
+
+    @overload
+    def __getitem__(self, index: int) -> Treatment: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Treatment]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Treatment, List[Treatment]]:
+        return self._treatments[index]
+
+    def __iter__(self) -> Iterator[Treatment]:
+        return iter(self._treatments)
@@ -8,7 +8,7 @@ import logging
 import traceback
 import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
 from firebase_admin import firestore
 
 db = firestore.client()
@@ -218,6 +218,19 @@ class ActivityLoggingService:
             logging.error(traceback.format_exc())
             return []
 
+    @staticmethod
+    def get_recently_active_uids(since: datetime) -> Set[str]:
+        """
+        Gets the uids of users with session activity since the given time.
+        """
+        try:
+            query = db.collection(SESSIONS_COLLECTION).where("last_activity", ">=", since)
+            return {doc.to_dict().get("uid") for doc in query.stream()} - {None}
+        except Exception as e:
+            logging.error(f"Failed to get recently active users: {e}")
+            logging.error(traceback.format_exc())
+            return set()
+
     @staticmethod
     def log_login(session_id: str, uid: str, email: str, user_agent: str = None, ip: str = None) -> Optional[str]:
         """Convenience method to log a login event."""
@@ -0,0 +1,282 @@
+"""
+Ambulatory Glucose Profile (AGP).
+
+The AGP shows the 5th, 25th, 50th, 75th and 95th glucose percentiles by
+time of day over a period of (typically 14 or more) days. Readings are
+binned into AGP_SLOT_MINUTES slots of the user's local day.
+
+Each local day is reduced to an AgpDaySketch: sparse counts per
+(time-of-day slot, 1 mg/dL glucose bin) cell, at most one cell per reading.
+Sketches of elapsed days never change, so they are cached and a long
+period is recomputed by merging one small sketch per day instead of
+re-reading every entry. Percentiles are read from the merged counts with
+the same linear interpolation as `numpy.percentile`.
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the AGP falls back to pure Python without it
+    np = None
+
+from ..core.cache import aget_many, aset_many, day_bucket_key, freshness_for_day, site_scope
+from ..core.config import settings
+from ..models.glucose_series import SGV_MISSING, GlucoseSeries
+from .data_analysis_service import HISTOGRAM_MAX_MGDL, MGDL_TO_MMOL
+from .nightscout_service import get_nightscout_entry_series, nightscout_kwargs
+
+AGP_SLOT_MINUTES = 15
+AGP_SLOTS = 24 * 60 // AGP_SLOT_MINUTES
+AGP_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Glucose bins per slot: one per mg/dL, readings above HISTOGRAM_MAX_MGDL share the last
+GLUCOSE_BINS = HISTOGRAM_MAX_MGDL + 1
+
+_MS_PER_MINUTE = 60 * 1000
+
+
+@dataclass
+class AgpDaySketch:
+    """Reading counts of one local day per (slot, glucose bin) cell, cell = slot * GLUCOSE_BINS + mg/dL."""
+    day: date
+    cells: List[int] = field(default_factory=list)
+    counts: List[int] = field(default_factory=list)
+
+    def to_cache(self) -> dict:
+        return {"cells": self.cells, "counts": self.counts, "slot_minutes": AGP_SLOT_MINUTES}
+
+    @classmethod
+    def from_cache(cls, day: date, value: Optional[dict]) -> Optional["AgpDaySketch"]:
+        """Return the cached sketch, or None if it is missing or was built with other slots."""
+        if not value or value.get("slot_minutes") != AGP_SLOT_MINUTES:
+            return None
+        return cls(day, list(value["cells"]), list(value["counts"]))
+
+
+@dataclass
+class AgpProfile:
+    """Glucose percentiles per time-of-day slot; slots without readings have None."""
+    unit: str
+    slot_minutes: int
+    days: int
+    counts: List[int]
+    percentiles: Dict[int, List[Optional[float]]]
+
+
+def _local_day_bounds(day: date, tz: str) -> Tuple[datetime, datetime]:
+    """Return the aware [start, end) of a calendar day in timezone `tz`."""
+    zone = ZoneInfo(tz)
+    next_day = day + timedelta(days=1)
+    return (
+        datetime(day.year, day.month, day.day, tzinfo=zone),
+        datetime(next_day.year, next_day.month, next_day.day, tzinfo=zone),
+    )
+
+
+def _offset_ms(moment: datetime) -> int:
+    return int(moment.utcoffset().total_seconds() * 1000)
+
+
+def sketch_day(series: GlucoseSeries, day: date, tz: str = "UTC") -> AgpDaySketch:
+    """
+    Build the sketch of one local day from a series that covers it.
+
+    Readings outside the day, and readings without sgv, are ignored.
+    """
+    start, end = _local_day_bounds(day, tz)
+    start_ms = int(start.timestamp() * 1000)
+    end_ms = int(end.timestamp() * 1000)
+    # One UTC offset for the whole day, unless a DST change falls inside it
+    offset = _offset_ms(start) if _offset_ms(start) == _offset_ms(end - timedelta(microseconds=1)) else None
+    zone = ZoneInfo(tz)
+
+    if np is not None:
+        dates = series.dates_array()
+        sgv = np.frombuffer(series.sgv, dtype=np.int16)
+        keep = (sgv != SGV_MISSING) & (dates >= start_ms) & (dates < end_ms)
+        dates = dates[keep]
+        if offset is not None:
+            local_ms = dates + offset
+        else:
+            local_ms = dates + np.array(
+                [_offset_ms(datetime.fromtimestamp(ms / 1000, zone)) for ms in dates.tolist()], dtype=np.int64
+            )
+        slots = (local_ms // _MS_PER_MINUTE) % (24 * 60) // AGP_SLOT_MINUTES
+        cells, counts = np.unique(slots * GLUCOSE_BINS + np.clip(sgv[keep], 0, HISTOGRAM_MAX_MGDL), return_counts=True)
+        return AgpDaySketch(day, cells.tolist(), counts.tolist())
+
+    grid: Dict[int, int] = {}
+    for ms, value in zip(series.dates, series.sgv):
+        if value == SGV_MISSING or not start_ms <= ms < end_ms:
+            continue
+        local_offset = offset if offset is not None else _offset_ms(datetime.fromtimestamp(ms / 1000, zone))
+        slot = ((ms + local_offset) // _MS_PER_MINUTE) % (24 * 60) // AGP_SLOT_MINUTES
+        cell = slot * GLUCOSE_BINS + min(max(value, 0), HISTOGRAM_MAX_MGDL)
+        grid[cell] = grid.get(cell, 0) + 1
+    cells = sorted(grid)
+    return AgpDaySketch(day, cells, [grid[cell] for cell in cells])
+
+
+def _interpolate(lower: float, upper: float, fraction: float) -> float:
+    return lower + (upper - lower) * fraction
+
+
+def _profile_numpy(sketches: List[AgpDaySketch], percentiles: Iterable[int]) -> Tuple[List[int], Dict[int, List[Optional[float]]]]:
+    cells = np.concatenate([np.asarray(sketch.cells, dtype=np.int64) for sketch in sketches])
+    weights = np.concatenate([np.asarray(sketch.counts, dtype=np.int64) for sketch in sketches])
+    grid = np.bincount(cells, weights=weights, minlength=AGP_SLOTS * GLUCOSE_BINS).astype(np.int64)
+    cumulative = grid.reshape(AGP_SLOTS, GLUCOSE_BINS).cumsum(axis=1)
+    counts = cumulative[:, -1]
+    empty = counts == 0
+
+    def order_statistic(ranks):
+        # Smallest glucose value whose cumulative count exceeds the 0-based rank, per slot
+        return (cumulative > ranks[:, None]).argmax(axis=1)
+
+    result = {}
+    for percentile in percentiles:
+        position = np.maximum(counts - 1, 0) * (percentile / 100)
+        lower_rank = np.floor(position).astype(np.int64)
+        lower = order_statistic(lower_rank)
+        upper = order_statistic(np.minimum(lower_rank + 1, np.maximum(counts - 1, 0)))
+        values = _interpolate(lower, upper, position - lower_rank)
+        result[percentile] = [None if missing else float(value) for value, missing in zip(values.tolist(), empty.tolist())]
+    return counts.tolist(), result
+
+
+def _profile_python(sketches: List[AgpDaySketch], percentiles: Iterable[int]) -> Tuple[List[int], Dict[int, List[Optional[float]]]]:
+    slot_bins: List[Dict[int, int]] = [{} for _ in range(AGP_SLOTS)]
+    for sketch in sketches:
+        for cell, count in zip(sketch.cells, sketch.counts):
+            bins = slot_bins[cell // GLUCOSE_BINS]
+            value = cell % GLUCOSE_BINS
+            bins[value] = bins.get(value, 0) + count
+
+    counts = [sum(bins.values()) for bins in slot_bins]
+    result = {percentile: [] for percentile in percentiles}
+    for bins, count in zip(slot_bins, counts):
+        ordered = sorted(bins.items())
+
+        def order_statistic(rank: int) -> int:
+            seen = 0
+            for value, value_count in ordered:
+                seen += value_count
+                if seen > rank:
+                    return value
+            raise IndexError(rank)
+
+        for percentile in result:
+            if not count:
+                result[percentile].append(None)
+                continue
+            position = (count - 1) * (percentile / 100)
+            lower_rank = math.floor(position)
+            lower = order_statistic(lower_rank)
+            upper = order_statistic(min(lower_rank + 1, count - 1))
+            result[percentile].append(float(_interpolate(lower, upper, position - lower_rank)))
+    return counts, result
+
+
+def agp_profile(
+    sketches: Iterable[AgpDaySketch],
+    percentiles: Iterable[int] = AGP_PERCENTILES,
+    use_mmol: bool = False
+) -> Optional[AgpProfile]:
+    """
+    Merge day sketches into an AGP.
+
+    Args:
+        sketches: One sketch per local day of the period.
+        percentiles: Percentiles (0-100) to compute per slot.
+        use_mmol: If True, return values in mmol/L; otherwise mg/dL.
+
+    Returns:
+        The AGP, or None if there are no sketches.
+    """
+    sketches = list(sketches)
+    if not sketches:
+        return None
+    percentiles = list(percentiles)
+    if np is not None and any(sketch.cells for sketch in sketches):
+        counts, values = _profile_numpy(sketches, percentiles)
+    else:
+        counts, values = _profile_python(sketches, percentiles)
+
+    if use_mmol:
+        values = {
+            percentile: [None if value is None else round(value / MGDL_TO_MMOL, 2) for value in slot_values]
+            for percentile, slot_values in values.items()
+        }
+    return AgpProfile(
+        unit="mmol/L" if use_mmol else "mg/dL",
+        slot_minutes=AGP_SLOT_MINUTES,
+        days=len(sketches),
+        counts=counts,
+        percentiles=values
+    )
+
+
+def agp_cache_key(day: date, tz: str, site: Optional[str] = None) -> str:
+    """Return the cache key of a day sketch, e.g. "agp_day_2026-01-29_3f2a9c81d0_Europe-Stockholm"."""
+    return f"{day_bucket_key('agp', day, site)}_{tz.replace('/', '-')}"
+
+
+async def get_agp(
+    start_date: date,
+    end_date: date,
+    tz: str = "UTC",
+    nightscout_url: Optional[str] = None,
+    api_token: Optional[str] = None,
+    user_id: Optional[str] = None,
+    use_mmol: bool = False
+) -> Optional[AgpProfile]:
+    """
+    Compute the AGP of the local days from start_date to end_date (inclusive).
+
+    Sketches of elapsed days are read from the cache in one batch; the
+    remaining days are loaded with one entry fetch, sketched, and cached
+    once they have elapsed in `tz`.
+
+    Args:
+        start_date: The first local day.
+        end_date: The last local day.
+        tz: IANA timezone of the user, e.g. "Europe/Stockholm".
+        nightscout_url: Optional Nightscout URL (uses settings if not provided).
+        api_token: Optional API token (uses settings if not provided).
+        user_id: Optional user ID for user-specific caching.
+        use_mmol: If True, return values in mmol/L; otherwise mg/dL.
+
+    Returns:
+        The AGP, or None if no day could be loaded.
+    """
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    site = site_scope(nightscout_url or settings.NIGHTSCOUT_URL)
+    keys = {day: agp_cache_key(day, tz, site) for day in days}
+    cached = await aget_many(list(keys.values()), user_id=user_id)
+    sketches = {day: AgpDaySketch.from_cache(day, cached[key]) for day, key in keys.items()}
+    missing = [day for day, sketch in sketches.items() if sketch is None]
+
+    if missing:
+        range_start = _local_day_bounds(missing[0], tz)[0]
+        range_end = _local_day_bounds(missing[-1], tz)[1]
+        series = await get_nightscout_entry_series(
+            from_date=range_start.astimezone(timezone.utc).isoformat(),
+            to_date=range_end.astimezone(timezone.utc).isoformat(),
+            count=0,
+            **nightscout_kwargs(nightscout_url, api_token, user_id)
+        )
+        if series is not None:
+            closed = {}
+            for day in missing:
+                sketches[day] = sketch_day(series, day, tz)
+                if freshness_for_day(day, tz) is None:
+                    closed[keys[day]] = sketches[day].to_cache()
+            if closed:
+                await aset_many(closed, user_id=user_id)
+
+    return agp_profile((sketch for sketch in sketches.values() if sketch is not None), use_mmol=use_mmol)
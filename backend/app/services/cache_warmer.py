@@ -0,0 +1,194 @@
+"""
+Background cache warmer.
+
+During off-peak hours (CACHE_WARMER_HOURS, UTC) the warmer loads yesterday
+and today of every active user through get_period_summary, so their day
+buckets are cached, and yesterday's summary is stored, before the first
+Insights view of the day instead of during it.
+Active users are approved users who logged in, or had session activity,
+within CACHE_WARMER_ACTIVE_DAYS and have a Nightscout URL saved.
+
+To stay polite to Nightscout sites, at most CACHE_WARMER_CONCURRENCY users
+are warmed at once, users on the same host are warmed one at a time with
+CACHE_WARMER_HOST_DELAY seconds in between, and hosts whose circuit breaker
+is open are skipped for the rest of the run.
+
+Every app instance runs the warmer, so before warming a user an instance
+takes a lease on them in the shared cache backend ("warmerlease_{uid}",
+valid for CACHE_WARMER_INTERVAL seconds); users leased by another instance
+are left to it.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ..core import cache
+from ..core.config import settings
+from ..models.schemas import UserRole
+from .activity_logging_service import activity_logging
+from .data_analysis_service import get_period_summary
+from .nightscout_client import get_host_key
+from .nightscout_health import OPEN, get_host_health
+from .nightscout_service import parse_nightscout_url
+from .user_service import UserService
+
+# Seconds between checks whether a warm-up run is due
+CHECK_INTERVAL = 60
+
+# Identifies this app instance in warm-up leases
+INSTANCE_ID = uuid.uuid4().hex
+
+
+@dataclass
+class WarmTarget:
+    """A user whose recent days should be warmed."""
+    uid: str
+    nightscout_url: str
+    api_token: str
+    timezone: str = "UTC"
+
+
+def parse_hours(value: str) -> Set[int]:
+    """Parse a comma separated list of hours, e.g. "3,4,5"."""
+    return {int(hour) for hour in value.split(",") if hour.strip()}
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def get_warm_targets(now: Optional[datetime] = None) -> List[WarmTarget]:
+    """
+    Return the active users with a usable Nightscout URL.
+
+    Blocking (reads users and sessions from Firestore); run it in a thread
+    from async code.
+    """
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(days=settings.CACHE_WARMER_ACTIVE_DAYS)
+    recently_active = activity_logging.get_recently_active_uids(since)
+
+    targets = []
+    for user in UserService.list_users():
+        if user.role == UserRole.PENDING:
+            continue
+        logged_in = user.last_login is not None and _as_utc(user.last_login) >= since
+        if not logged_in and user.uid not in recently_active:
+            continue
+        if not user.settings or not user.settings.nightscout_url:
+            continue
+        base_url, token = parse_nightscout_url(user.settings.nightscout_url)
+        if not base_url or not token:
+            continue
+        targets.append(WarmTarget(user.uid, base_url, token, user.settings.timezone))
+    return targets
+
+
+def _local_today(target: WarmTarget, now: datetime) -> date:
+    try:
+        return now.astimezone(ZoneInfo(target.timezone)).date()
+    except (ZoneInfoNotFoundError, ValueError):
+        return now.date()
+
+
+def lease_key(uid: str) -> str:
+    """Return the cache key of a user's warm-up lease."""
+    return f"warmerlease_{uid}"
+
+
+async def acquire_lease(uid: str) -> bool:
+    """
+    Claim a user for warming across app instances.
+
+    The lease goes straight to the shared backend, bypassing this instance's
+    memory tier. Backends offer no compare-and-set, so the lease is written
+    and read back: of two instances claiming a user at the same moment only
+    the one whose write landed last goes ahead (both only if their reads and
+    writes interleave exactly).
+    """
+    if cache.backend is None:
+        return True
+    key = lease_key(uid)
+    now = time.time()
+    current = await cache.backend.aget(key)
+    if current and current.get("owner") != INSTANCE_ID and current.get("expires_at", 0) > now:
+        return False
+    await cache.backend.aset(key, {"owner": INSTANCE_ID, "expires_at": now + settings.CACHE_WARMER_INTERVAL})
+    confirmed = await cache.backend.aget(key)
+    return bool(confirmed) and confirmed.get("owner") == INSTANCE_ID
+
+
+async def warm_user(target: WarmTarget, now: Optional[datetime] = None) -> int:
+    """Load a user's yesterday and today into the cache; returns the number of days summarized."""
+    today = _local_today(target, now or datetime.now(timezone.utc))
+    summary = await get_period_summary(
+        today - timedelta(days=1),
+        today,
+        nightscout_url=target.nightscout_url,
+        api_token=target.api_token,
+        user_id=target.uid
+    )
+    return summary.days if summary else 0
+
+
+async def warm_caches(now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Warm the recent days of every active user once.
+
+    Returns:
+        Counts of "users" found, and of users "warmed", "failed",
+        "skipped" because their host's circuit breaker was open, or
+        "leased" by another instance.
+    """
+    now = now or datetime.now(timezone.utc)
+    targets = await asyncio.to_thread(get_warm_targets, now)
+
+    by_host: Dict[str, List[WarmTarget]] = {}
+    for target in targets:
+        by_host.setdefault(get_host_key(target.nightscout_url), []).append(target)
+
+    stats = {"users": len(targets), "warmed": 0, "failed": 0, "skipped": 0, "leased": 0}
+    semaphore = asyncio.Semaphore(settings.CACHE_WARMER_CONCURRENCY)
+
+    async def warm_host(host: str, host_targets: List[WarmTarget]):
+        for index, target in enumerate(host_targets):
+            if index:
+                await asyncio.sleep(settings.CACHE_WARMER_HOST_DELAY)
+            if get_host_health(host).state == OPEN:
+                stats["skipped"] += len(host_targets) - index
+                return
+            async with semaphore:
+                try:
+                    if not await acquire_lease(target.uid):
+                        stats["leased"] += 1
+                        continue
+                    await warm_user(target, now)
+                    stats["warmed"] += 1
+                except Exception as e:
+                    logging.warning(f"Warming cache for user {target.uid} failed: {e}")
+                    stats["failed"] += 1
+
+    await asyncio.gather(*(warm_host(host, host_targets) for host, host_targets in by_host.items()))
+    logging.info(f"Cache warmer run finished: {stats}")
+    return stats
+
+
+async def run_cache_warmer():
+    """Run warm_caches during off-peak hours, at most once per CACHE_WARMER_INTERVAL, until cancelled."""
+    hours = parse_hours(settings.CACHE_WARMER_HOURS)
+    last_run: Optional[float] = None
+    while True:
+        now = datetime.now(timezone.utc)
+        if now.hour in hours and (last_run is None or time.monotonic() - last_run >= settings.CACHE_WARMER_INTERVAL):
+            last_run = time.monotonic()
+            try:
+                await warm_caches(now)
+            except Exception as e:
+                logging.error(f"Cache warmer run failed: {e}", exc_info=True)
+        await asyncio.sleep(CHECK_INTERVAL)
@@ -5,14 +5,32 @@ This module provides the DayData class for storing and analyzing
 a full day of Nightscout data including entries and treatments.
 """
 
+from contextlib import aclosing
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Optional, List, Literal
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, List, Literal, Tuple, Union
+import asyncio
+import logging
+import math
 import statistics
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; insights fall back to pure Python without it
+    np = None
+
 from ..models.entry import Entry
+from ..models.glucose_series import GlucoseSeries
 from ..models.treatment import Treatment
-from .nightscout_service import get_nightscout_entries, get_nightscout_treatments
+from ..models.treatment_index import TreatmentIndex
+from ..core.cache import is_day_closed, site_scope
+from ..core.config import settings
+from .nightscout_client import get_host_semaphore
+from .nightscout_service import (
+    get_nightscout_entry_series, get_nightscout_treatments, get_synced_ranges, nightscout_kwargs,
+    prefetch_nightscout_range
+)
+from .summary_store import load_daily_summaries, store_daily_summaries
 
 # Conversion factor: mg/dL to mmol/L
 MGDL_TO_MMOL = 18.0
@@ -83,18 +101,141 @@ class TreatmentInsights:
     total_treatment_count: int  # Total number of all treatments
 
 
+@dataclass
+class SgvSummary:
+    """
+    Statistics of the sgv values of a GlucoseSeries, in mg/dL.
+
+    Values have the same types and exact values as the `statistics` module
+    gives (e.g. an int mean when the mean is a whole number), so insights
+    are identical whichever engine computed them.
+    """
+    count: int
+    total: int
+    total_of_squares: int
+    mean: Union[int, float]
+    median: Union[int, float]
+    std_dev: float
+    min_glucose: int
+    max_glucose: int
+    tir_count: int
+    tbr_count: int
+    tar_count: int
+    titr_count: int
+
+
+def _exact_mean(total: int, count: int) -> Union[int, float]:
+    """Mean of integers as statistics.mean returns it: an int if exact, else the correctly rounded float."""
+    return total // count if total % count == 0 else total / count
+
+
+def _integer_sqrt_of_frac_rto(numerator: int, denominator: int) -> int:
+    """Square root of numerator/denominator rounded to an integer using round-to-odd."""
+    root = math.isqrt(numerator // denominator)
+    return root | (root * root * denominator != numerator)
+
+
+def _float_sqrt_of_frac(numerator: int, denominator: int) -> float:
+    """Correctly rounded square root of numerator/denominator, as statistics.stdev computes it."""
+    # Keep 2 * 53 + 3 significant bits before the final rounding to float
+    shift = (numerator.bit_length() - denominator.bit_length() - 109) // 2
+    if shift >= 0:
+        return (_integer_sqrt_of_frac_rto(numerator, denominator << 2 * shift) << shift) / 1
+    return _integer_sqrt_of_frac_rto(numerator << -2 * shift, denominator) / (1 << -shift)
+
+
+def _sample_stdev(count: int, total: int, total_of_squares: int) -> float:
+    """Sample standard deviation from the count, sum and sum of squares of integers."""
+    if count < 2:
+        return 0.0
+    # Exact variance: (n * sum(x^2) - sum(x)^2) / (n * (n - 1))
+    return _float_sqrt_of_frac(count * total_of_squares - total * total, count * (count - 1))
+
+
+def _summarize_sgv_numpy(values, low: int, high: int, tight_high: int) -> SgvSummary:
+    """Vectorized SgvSummary over a NumPy array of sgv values."""
+    count = len(values)
+    values = values.astype(np.int64)
+    total = int(values.sum())
+    middle = np.partition(values, [(count - 1) // 2, count // 2])
+    if count % 2:
+        median = int(middle[count // 2])
+    else:
+        median = (int(middle[count // 2 - 1]) + int(middle[count // 2])) / 2
+    total_of_squares = int(np.dot(values, values))
+    tbr_count = int(np.count_nonzero(values < low))
+    tar_count = int(np.count_nonzero(values > high))
+    return SgvSummary(
+        count=count,
+        total=total,
+        total_of_squares=total_of_squares,
+        mean=_exact_mean(total, count),
+        median=median,
+        std_dev=_sample_stdev(count, total, total_of_squares),
+        min_glucose=int(values.min()),
+        max_glucose=int(values.max()),
+        tir_count=count - tbr_count - tar_count,
+        tbr_count=tbr_count,
+        tar_count=tar_count,
+        titr_count=int(np.count_nonzero((values >= low) & (values <= tight_high))),
+    )
+
+
+def _summarize_sgv_python(values: List[int], low: int, high: int, tight_high: int) -> SgvSummary:
+    """Pure Python SgvSummary, used when NumPy is not installed."""
+    count = len(values)
+    total = total_of_squares = 0
+    tbr_count = tar_count = titr_count = 0
+    for value in values:
+        total += value
+        total_of_squares += value * value
+        if value < low:
+            tbr_count += 1
+        elif value > high:
+            tar_count += 1
+        elif value <= tight_high:
+            titr_count += 1
+    return SgvSummary(
+        count=count,
+        total=total,
+        total_of_squares=total_of_squares,
+        mean=_exact_mean(total, count),
+        median=statistics.median(values),
+        std_dev=_sample_stdev(count, total, total_of_squares),
+        min_glucose=min(values),
+        max_glucose=max(values),
+        tir_count=count - tbr_count - tar_count,
+        tbr_count=tbr_count,
+        tar_count=tar_count,
+        titr_count=titr_count,
+    )
+
+
+def _summarize_sgv(series: GlucoseSeries, low: int, high: int, tight_high: int) -> Optional[SgvSummary]:
+    """Summarize the valid sgv values of a series, or None if it has none."""
+    if np is not None:
+        values = series.sgv_array()
+        return _summarize_sgv_numpy(values, low, high, tight_high) if len(values) else None
+    values = series.sgv_values()
+    return _summarize_sgv_python(values, low, high, tight_high) if values else None
+
+
 @dataclass
 class DayData:
     """
     Container for a full day of Nightscout data with analysis capabilities.
     
     This class stores raw entries and treatments for a specific date and
-    provides methods to extract various insights from the data.
+    provides methods to extract various insights from the data. Entries are
+    held in a columnar GlucoseSeries and treatments in a TreatmentIndex; plain
+    lists are converted on construction. `complete` is False when entries
+    or treatments could not be fetched and the day only holds the rest.
     """
     
     date: datetime
-    entries: List[Entry] = field(default_factory=list)
-    treatments: List[Treatment] = field(default_factory=list)
+    entries: Union[GlucoseSeries, Iterable[Entry]] = field(default_factory=GlucoseSeries)
+    treatments: Union[TreatmentIndex, Iterable[Treatment]] = field(default_factory=TreatmentIndex)
+    complete: bool = True
     
     # Standard range values in mg/dL
     LOW_THRESHOLD: int = 70  # 3.9 mmol/L
@@ -104,9 +245,15 @@ class DayData:
     # Reading interval (CGM readings typically every 5 minutes)
     READING_INTERVAL_MINUTES: int = 5
     
+    def __post_init__(self):
+        if not isinstance(self.entries, GlucoseSeries):
+            self.entries = GlucoseSeries.from_entries(self.entries)
+        if not isinstance(self.treatments, TreatmentIndex):
+            self.treatments = TreatmentIndex(self.treatments)
+    
     def get_glucose_values(self) -> List[int]:
         """Extract all valid sgv (glucose) values from entries."""
-        return [entry.sgv for entry in self.entries if entry.sgv is not None]
+        return self.entries.sgv_values()
     
     def calculate_entry_insights(self, use_mmol: bool = False) -> Optional[EntryInsights]:
         """
@@ -118,42 +265,46 @@ class DayData:
         Returns:
             EntryInsights object with all calculated metrics, or None if no valid data.
         """
-        glucose_values = self.get_glucose_values()
+        summary = _summarize_sgv(self.entries, self.LOW_THRESHOLD, self.HIGH_THRESHOLD, self.TIGHT_HIGH_THRESHOLD)
+        return self.entry_insights_from_summary(summary, use_mmol=use_mmol)
+    
+    @classmethod
+    def entry_insights_from_summary(cls, summary: Optional[SgvSummary], use_mmol: bool = False) -> Optional[EntryInsights]:
+        """
+        Build EntryInsights from the sgv statistics of one or more days.
         
-        if not glucose_values:
+        Args:
+            summary: Statistics in mg/dL, computed with this class's thresholds.
+            use_mmol: If True, return values in mmol/L; otherwise mg/dL.
+        
+        Returns:
+            EntryInsights object with all calculated metrics, or None if no valid data.
+        """
+        if summary is None:
             return None
         
-        total_readings = len(glucose_values)
+        total_readings = summary.count
         
         # Core statistics (calculated in mg/dL first)
-        mean_glucose = statistics.mean(glucose_values)
-        median_glucose = statistics.median(glucose_values)
-        
-        # Standard deviation (need at least 2 values)
-        if total_readings >= 2:
-            std_dev = statistics.stdev(glucose_values)
-        else:
-            std_dev = 0.0
+        mean_glucose = summary.mean
+        median_glucose = summary.median
+        std_dev = summary.std_dev
         
         # Coefficient of Variation (CV) = (StdDev / Mean) * 100
         # CV is unitless percentage, same regardless of unit
         cv = (std_dev / mean_glucose * 100) if mean_glucose > 0 else 0.0
         
-        # Time in Range calculations (always use mg/dL thresholds for calculation)
-        tir_count = sum(1 for v in glucose_values 
-                        if self.LOW_THRESHOLD <= v <= self.HIGH_THRESHOLD)
-        tbr_count = sum(1 for v in glucose_values 
-                        if v < self.LOW_THRESHOLD)
-        tar_count = sum(1 for v in glucose_values 
-                        if v > self.HIGH_THRESHOLD)
-        titr_count = sum(1 for v in glucose_values 
-                         if self.LOW_THRESHOLD <= v <= self.TIGHT_HIGH_THRESHOLD)
+        # Time in Range counts (always use mg/dL thresholds for calculation)
+        tir_count = summary.tir_count
+        tbr_count = summary.tbr_count
+        tar_count = summary.tar_count
+        titr_count = summary.titr_count
         
         # Convert counts to minutes (assuming 5-minute intervals)
-        tir_minutes = tir_count * self.READING_INTERVAL_MINUTES
-        tbr_minutes = tbr_count * self.READING_INTERVAL_MINUTES
-        tar_minutes = tar_count * self.READING_INTERVAL_MINUTES
-        titr_minutes = titr_count * self.READING_INTERVAL_MINUTES
+        tir_minutes = tir_count * cls.READING_INTERVAL_MINUTES
+        tbr_minutes = tbr_count * cls.READING_INTERVAL_MINUTES
+        tar_minutes = tar_count * cls.READING_INTERVAL_MINUTES
+        titr_minutes = titr_count * cls.READING_INTERVAL_MINUTES
         
         # Calculate percentages
         tir_percentage = (tir_count / total_readings * 100) if total_readings > 0 else 0.0
@@ -167,8 +318,8 @@ class DayData:
         estimated_hba1c = (mean_glucose + 46.7) / 28.7
         
         # Min/Max
-        min_glucose_val = min(glucose_values)
-        max_glucose_val = max(glucose_values)
+        min_glucose_val = summary.min_glucose
+        max_glucose_val = summary.max_glucose
         
         # Convert to mmol/L if requested
         if use_mmol:
@@ -178,14 +329,14 @@ class DayData:
             std_dev = std_dev / MGDL_TO_MMOL
             min_glucose_val = min_glucose_val / MGDL_TO_MMOL
             max_glucose_val = max_glucose_val / MGDL_TO_MMOL
-            low_threshold = self.LOW_THRESHOLD / MGDL_TO_MMOL
-            high_threshold = self.HIGH_THRESHOLD / MGDL_TO_MMOL
-            tight_high_threshold = self.TIGHT_HIGH_THRESHOLD / MGDL_TO_MMOL
+            low_threshold = cls.LOW_THRESHOLD / MGDL_TO_MMOL
+            high_threshold = cls.HIGH_THRESHOLD / MGDL_TO_MMOL
+            tight_high_threshold = cls.TIGHT_HIGH_THRESHOLD / MGDL_TO_MMOL
         else:
             unit = "mg/dL"
-            low_threshold = float(self.LOW_THRESHOLD)
-            high_threshold = float(self.HIGH_THRESHOLD)
-            tight_high_threshold = float(self.TIGHT_HIGH_THRESHOLD)
+            low_threshold = float(cls.LOW_THRESHOLD)
+            high_threshold = float(cls.HIGH_THRESHOLD)
+            tight_high_threshold = float(cls.TIGHT_HIGH_THRESHOLD)
         
         return EntryInsights(
             unit=unit,
@@ -215,39 +366,252 @@ class DayData:
         """
         Calculate all insights from the treatments.
         
+        Counters and totals come from the TreatmentIndex, which maintains them
+        as treatments are added, so no pass over the treatments is needed.
+        
         Returns:
             TreatmentInsights object with all calculated metrics.
         """
-        # Count treatments by event type
-        carb_corrections = [t for t in self.treatments if t.eventType == "Carb Correction"]
-        correction_boluses = [t for t in self.treatments if t.eventType == "Correction Bolus"]
-        site_changes = [t for t in self.treatments if t.eventType == "Site Change"]
-        insulin_changes = [t for t in self.treatments if t.eventType == "Insulin Change"]
-        battery_changes = [t for t in self.treatments if t.eventType == "Pump Battery Change"]
-        temp_basals = [t for t in self.treatments if t.eventType == "Temp Basal"]
-        temp_overrides = [t for t in self.treatments if t.eventType == "Temporary Override"]
-        
-        # Calculate total carbs from all treatments with carbs
-        total_carbs = sum(t.carbs for t in self.treatments if t.carbs is not None)
-        
-        # Calculate total insulin from all treatments with insulin
-        total_insulin = sum(t.insulin for t in self.treatments if t.insulin is not None)
+        treatments = self.treatments
+        return _treatment_insights(
+            treatments.total_carbs, treatments.total_insulin, treatments.event_count, len(treatments)
+        )
+    
+    def summarize(self) -> "DailySummary":
+        """
+        Summarize the day into a DailySummary.
         
-        return TreatmentInsights(
-            total_carbs=round(total_carbs, 1),
-            carb_correction_count=len(carb_corrections),
-            total_insulin=round(total_insulin, 2),
-            correction_bolus_count=len(correction_boluses),
-            site_change_count=len(site_changes),
-            insulin_change_count=len(insulin_changes),
-            pump_battery_change_count=len(battery_changes),
-            temp_basal_count=len(temp_basals),
-            temporary_override_count=len(temp_overrides),
-            total_treatment_count=len(self.treatments)
+        Summaries of several days merge (see merge_summaries) into the
+        insights of the whole period without re-reading their entries.
+        """
+        day = self.date.date() if isinstance(self.date, datetime) else self.date
+        sgv = _summarize_sgv(self.entries, self.LOW_THRESHOLD, self.HIGH_THRESHOLD, self.TIGHT_HIGH_THRESHOLD)
+        treatments = self.treatments
+        summary = DailySummary(
+            start=day,
+            end=day,
+            total_carbs=treatments.total_carbs,
+            total_insulin=treatments.total_insulin,
+            treatment_count=len(treatments),
+            event_counts={event_type: treatments.event_count(event_type) for event_type in treatments.event_types()}
         )
+        if sgv is not None:
+            summary.count = sgv.count
+            summary.total = sgv.total
+            summary.total_of_squares = sgv.total_of_squares
+            summary.min_glucose = sgv.min_glucose
+            summary.max_glucose = sgv.max_glucose
+            summary.tbr_count = sgv.tbr_count
+            summary.tar_count = sgv.tar_count
+            summary.titr_count = sgv.titr_count
+            summary.histogram = _sgv_histogram(self.entries)
+        return summary
+
+
+# TreatmentInsights counters and the eventType each one counts
+TREATMENT_EVENT_COUNTERS = {
+    "carb_correction_count": "Carb Correction",
+    "correction_bolus_count": "Correction Bolus",
+    "site_change_count": "Site Change",
+    "insulin_change_count": "Insulin Change",
+    "pump_battery_change_count": "Pump Battery Change",
+    "temp_basal_count": "Temp Basal",
+    "temporary_override_count": "Temporary Override",
+}
+
+
+def _treatment_insights(
+    total_carbs: float,
+    total_insulin: float,
+    event_count: Callable[[str], int],
+    total_treatments: int
+) -> TreatmentInsights:
+    counters = {name: event_count(event_type) for name, event_type in TREATMENT_EVENT_COUNTERS.items()}
+    return TreatmentInsights(
+        total_carbs=round(total_carbs, 1),
+        total_insulin=round(total_insulin, 2),
+        total_treatment_count=total_treatments,
+        **counters
+    )
+
 
+# Glucose histogram of DailySummary: one bin per mg/dL, readings of
+# HISTOGRAM_MAX_MGDL and above share the last bin. CGM values are integers
+# within 39-401 mg/dL, so quantiles read from it are exact in practice.
+HISTOGRAM_MAX_MGDL = 600
+HISTOGRAM_BINS = HISTOGRAM_MAX_MGDL + 1
 
-def get_day_data(
+
+def _sgv_histogram(series: GlucoseSeries) -> List[int]:
+    """Return the fixed-bin histogram of the valid sgv values of a series."""
+    if np is not None:
+        values = np.clip(series.sgv_array(), 0, HISTOGRAM_MAX_MGDL)
+        return np.bincount(values, minlength=HISTOGRAM_BINS).tolist()
+    histogram = [0] * HISTOGRAM_BINS
+    for value in series.sgv_values():
+        histogram[min(max(value, 0), HISTOGRAM_MAX_MGDL)] += 1
+    return histogram
+
+
+@dataclass
+class DailySummary:
+    """
+    Mergeable summary of the readings and treatments of one or more days.
+    
+    Holds exact sums rather than derived statistics, so merging the
+    summaries of a period gives the same mean, standard deviation, range
+    percentages and treatment totals as analysing all of its readings at
+    once; the median and other quantiles come from the glucose histogram.
+    All glucose values are in mg/dL.
+    """
+    
+    start: date
+    end: date
+    days: int = 1
+    count: int = 0
+    total: int = 0
+    total_of_squares: int = 0
+    min_glucose: Optional[int] = None
+    max_glucose: Optional[int] = None
+    tbr_count: int = 0
+    tar_count: int = 0
+    titr_count: int = 0
+    histogram: List[int] = field(default_factory=lambda: [0] * HISTOGRAM_BINS)
+    total_carbs: float = 0.0
+    total_insulin: float = 0.0
+    treatment_count: int = 0
+    event_counts: Dict[str, int] = field(default_factory=dict)
+    
+    @property
+    def tir_count(self) -> int:
+        return self.count - self.tbr_count - self.tar_count
+    
+    def merge(self, other: "DailySummary") -> "DailySummary":
+        """Return the summary of this and another, non-overlapping, period."""
+        return merge_summaries([self, other])
+    
+    def value_at(self, rank: int) -> int:
+        """Return the glucose value of the given 0-based rank in sorted order."""
+        seen = 0
+        for value, count in enumerate(self.histogram):
+            seen += count
+            if seen > rank:
+                return value
+        raise IndexError(f"Rank {rank} out of range for {self.count} readings")
+    
+    def quantile(self, fraction: float) -> Optional[int]:
+        """Return the nearest-rank quantile (0 <= fraction <= 1) of the glucose values, or None without readings."""
+        if not self.count:
+            return None
+        return self.value_at(max(0, math.ceil(fraction * self.count) - 1))
+    
+    def sgv_summary(self) -> Optional[SgvSummary]:
+        """Return the sgv statistics of the period, or None without readings."""
+        count = self.count
+        if not count:
+            return None
+        if count % 2:
+            median = self.value_at(count // 2)
+        else:
+            median = (self.value_at(count // 2 - 1) + self.value_at(count // 2)) / 2
+        return SgvSummary(
+            count=count,
+            total=self.total,
+            total_of_squares=self.total_of_squares,
+            mean=_exact_mean(self.total, count),
+            median=median,
+            std_dev=_sample_stdev(count, self.total, self.total_of_squares),
+            min_glucose=self.min_glucose,
+            max_glucose=self.max_glucose,
+            tir_count=self.tir_count,
+            tbr_count=self.tbr_count,
+            tar_count=self.tar_count,
+            titr_count=self.titr_count,
+        )
+    
+    def entry_insights(self, use_mmol: bool = False) -> Optional[EntryInsights]:
+        """EntryInsights of the whole period, or None without readings."""
+        return DayData.entry_insights_from_summary(self.sgv_summary(), use_mmol=use_mmol)
+    
+    def treatment_insights(self) -> TreatmentInsights:
+        """TreatmentInsights of the whole period."""
+        return _treatment_insights(
+            self.total_carbs, self.total_insulin, lambda event_type: self.event_counts.get(event_type, 0),
+            self.treatment_count
+        )
+    
+    def to_dict(self) -> dict:
+        """Serialize a one-day summary for the summary store, with a sparse histogram."""
+        nonzero = [(value, count) for value, count in enumerate(self.histogram) if count]
+        return {
+            "count": self.count,
+            "total": self.total,
+            "total_of_squares": self.total_of_squares,
+            "min_glucose": self.min_glucose,
+            "max_glucose": self.max_glucose,
+            "tbr_count": self.tbr_count,
+            "tar_count": self.tar_count,
+            "titr_count": self.titr_count,
+            "histogram_values": [value for value, _ in nonzero],
+            "histogram_counts": [count for _, count in nonzero],
+            "total_carbs": self.total_carbs,
+            "total_insulin": self.total_insulin,
+            "treatment_count": self.treatment_count,
+            "event_counts": dict(self.event_counts),
+        }
+    
+    @classmethod
+    def from_dict(cls, day: date, data: dict) -> "DailySummary":
+        """Rebuild the summary of a day from to_dict() output."""
+        histogram = [0] * HISTOGRAM_BINS
+        for value, count in zip(data["histogram_values"], data["histogram_counts"]):
+            histogram[value] = count
+        fields = {
+            name: value for name, value in data.items() if name not in ("histogram_values", "histogram_counts")
+        }
+        return cls(start=day, end=day, histogram=histogram, **fields)
+
+
+def merge_summaries(summaries: Iterable[DailySummary]) -> Optional[DailySummary]:
+    """
+    Merge the summaries of non-overlapping periods, in O(len(summaries)).
+    
+    Returns:
+        The summary of the combined period, or None if there are none.
+    """
+    summaries = list(summaries)
+    if not summaries:
+        return None
+    with_readings = [summary for summary in summaries if summary.count]
+    if np is not None:
+        histogram = np.sum([summary.histogram for summary in summaries], axis=0).tolist()
+    else:
+        histogram = [sum(counts) for counts in zip(*(summary.histogram for summary in summaries))]
+    event_counts: Dict[str, int] = {}
+    for summary in summaries:
+        for event_type, count in summary.event_counts.items():
+            event_counts[event_type] = event_counts.get(event_type, 0) + count
+    return DailySummary(
+        start=min(summary.start for summary in summaries),
+        end=max(summary.end for summary in summaries),
+        days=sum(summary.days for summary in summaries),
+        count=sum(summary.count for summary in summaries),
+        total=sum(summary.total for summary in summaries),
+        total_of_squares=sum(summary.total_of_squares for summary in summaries),
+        min_glucose=min((summary.min_glucose for summary in with_readings), default=None),
+        max_glucose=max((summary.max_glucose for summary in with_readings), default=None),
+        tbr_count=sum(summary.tbr_count for summary in summaries),
+        tar_count=sum(summary.tar_count for summary in summaries),
+        titr_count=sum(summary.titr_count for summary in summaries),
+        histogram=histogram,
+        total_carbs=sum(summary.total_carbs for summary in summaries),
+        total_insulin=sum(summary.total_insulin for summary in summaries),
+        treatment_count=sum(summary.treatment_count for summary in summaries),
+        event_counts=event_counts,
+    )
+
+
+async def get_day_data(
     date: datetime,
     nightscout_url: Optional[str] = None,
     api_token: Optional[str] = None,
@@ -264,6 +628,8 @@ def get_day_data(
     
     Returns:
         DayData object populated with entries and treatments, or None on error.
+        If only one of them could be fetched, the DayData holds that one and
+        is marked incomplete.
     """
     # Create date range for the full day
     start_of_day = datetime(date.year, date.month, date.day, 0, 0, 0)
@@ -271,28 +637,22 @@ def get_day_data(
     
     from_date_str = start_of_day.isoformat()
     to_date_str = end_of_day.isoformat()
+    kwargs = nightscout_kwargs(nightscout_url, api_token, user_id)
     
-    # Fetch entries
-    kwargs = {}
-    if nightscout_url:
-        kwargs['nightscout_url'] = nightscout_url
-    if api_token:
-        kwargs['api_token'] = api_token
-    if user_id:
-        kwargs['user_id'] = user_id
-    
-    entries = get_nightscout_entries(
-        from_date=from_date_str,
-        to_date=to_date_str,
-        count=0,  # Get all entries
-        **kwargs
-    )
-    
-    treatments = get_nightscout_treatments(
-        from_date=from_date_str,
-        to_date=to_date_str,
-        count=0,  # Get all treatments
-        **kwargs
+    # Fetch entries and treatments concurrently
+    entries, treatments = await asyncio.gather(
+        get_nightscout_entry_series(
+            from_date=from_date_str,
+            to_date=to_date_str,
+            count=0,  # Get all entries
+            **kwargs
+        ),
+        get_nightscout_treatments(
+            from_date=from_date_str,
+            to_date=to_date_str,
+            count=0,  # Get all treatments
+            **kwargs
+        )
     )
     
     if entries is None and treatments is None:
@@ -300,11 +660,209 @@ def get_day_data(
     
     return DayData(
         date=start_of_day,
-        entries=entries or [],
-        treatments=treatments or []
+        entries=entries if entries is not None else GlucoseSeries(),
+        treatments=treatments or [],
+        complete=entries is not None and treatments is not None
+    )
+
+
+def _day_runs(days: List[date]) -> List[List[date]]:
+    """Split sorted days into runs of consecutive days."""
+    runs: List[List[date]] = []
+    for day in days:
+        if runs and runs[-1][-1] == day - timedelta(days=1):
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+async def _iter_days_data(
+    days: List[date],
+    nightscout_url: Optional[str] = None,
+    api_token: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> AsyncIterator[Tuple[date, DayData]]:
+    """
+    Load the given days concurrently and yield (day, DayData) in the order they finish.
+    
+    Each run of consecutive days is prefetched first, so the cache is read
+    and written in batches rather than once per day. Prefetches and day
+    loads are both bounded by the per-host concurrency limit of the
+    Nightscout site, and each day fetches its entries and treatments
+    concurrently. Days that fail to load are logged and left out; loads
+    still running are cancelled if the consumer stops early.
+    """
+    kwargs = nightscout_kwargs(nightscout_url, api_token, user_id)
+    host_semaphore = get_host_semaphore(nightscout_url or settings.NIGHTSCOUT_URL)
+    
+    async def prefetch_run(run: List[date]):
+        # Same range convention as get_day_data
+        async with host_semaphore:
+            await prefetch_nightscout_range(
+                from_date=datetime(run[0].year, run[0].month, run[0].day).isoformat(),
+                to_date=(datetime(run[-1].year, run[-1].month, run[-1].day) + timedelta(days=1)).isoformat(),
+                **kwargs
+            )
+    
+    await asyncio.gather(*(prefetch_run(run) for run in _day_runs(sorted(days))))
+    
+    async def load_day(day: date) -> Tuple[date, Optional[DayData]]:
+        async with host_semaphore:
+            try:
+                return day, await get_day_data(datetime(day.year, day.month, day.day), **kwargs)
+            except Exception as e:
+                logging.error(f"Failed to load day data for {day}: {e}", exc_info=True)
+                return day, None
+    
+    tasks = [asyncio.ensure_future(load_day(day)) for day in days]
+    try:
+        for next_day in asyncio.as_completed(tasks):
+            day, day_data = await next_day
+            if day_data is None:
+                logging.warning(f"No day data available for {day}")
+                continue
+            yield day, day_data
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def get_days_data(
+    start_date: datetime,
+    end_date: datetime,
+    nightscout_url: Optional[str] = None,
+    api_token: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> Dict[date, DayData]:
+    """
+    Fetch every day from start_date to end_date (inclusive) concurrently.
+    
+    The whole range is prefetched first, so the cache is read and written in
+    batches rather than once per day. Days are then loaded in parallel, bounded
+    by the per-host concurrency limit of the Nightscout site, and each day
+    fetches its entries and treatments concurrently. Days that fail to load
+    are logged and left out, so callers get partial results instead of an
+    error.
+    
+    Args:
+        start_date: The first date to fetch (time component is ignored).
+        end_date: The last date to fetch (time component is ignored).
+        nightscout_url: Optional Nightscout URL (uses settings if not provided).
+        api_token: Optional API token (uses settings if not provided).
+        user_id: Optional user ID for user-specific caching.
+    
+    Returns:
+        Mapping of date to DayData for every day that loaded successfully.
+    """
+    first_day = start_date.date() if isinstance(start_date, datetime) else start_date
+    last_day = end_date.date() if isinstance(end_date, datetime) else end_date
+    days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+    
+    loaded = {day: day_data async for day, day_data in _iter_days_data(days, nightscout_url, api_token, user_id)}
+    return {day: loaded[day] for day in days if day in loaded}
+
+
+async def iter_day_summaries(
+    start_date: datetime,
+    end_date: datetime,
+    nightscout_url: Optional[str] = None,
+    api_token: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> AsyncIterator[DailySummary]:
+    """
+    Yield the DailySummary of every day from start_date to end_date (inclusive) as it becomes available.
+    
+    Summaries of elapsed days come from the summary store, read one month
+    document at a time, and are yielded first. The days that are still open
+    or not stored yet are then loaded concurrently like get_days_data and
+    yielded in the order they finish; the elapsed ones among them are
+    stored once all have loaded, so each day is analysed from raw readings
+    once. Days that fail to load are logged and left out, and days whose
+    entries or treatments failed, or that were served from cached data
+    whose final sync failed (see get_synced_ranges), are yielded but not
+    stored.
+    
+    Args:
+        start_date: The first date to summarize (time component is ignored).
+        end_date: The last date to summarize (time component is ignored).
+        nightscout_url: Optional Nightscout URL (uses settings if not provided).
+        api_token: Optional API token (uses settings if not provided).
+        user_id: Optional user ID for user-specific caching.
+    """
+    first_day = start_date.date() if isinstance(start_date, datetime) else start_date
+    last_day = end_date.date() if isinstance(end_date, datetime) else end_date
+    days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+    
+    site = site_scope(nightscout_url or settings.NIGHTSCOUT_URL)
+    stored = await load_daily_summaries(days, user_id=user_id, site=site)
+    for day in days:
+        if day in stored:
+            yield DailySummary.from_dict(day, stored[day])
+    missing = [day for day in days if day not in stored]
+    if not missing:
+        return
+    
+    closed = {}
+    # aclosing: stop the remaining loads as soon as the consumer goes away
+    async with aclosing(_iter_days_data(missing, nightscout_url, api_token, user_id)) as days_data:
+        async for day, day_data in days_data:
+            summary = day_data.summarize()
+            # Only store what cannot change any more, and only if nothing failed to load
+            if is_day_closed(day) and day_data.complete:
+                closed[day] = summary.to_dict()
+            yield summary
+    if not closed:
+        return
+    
+    # Days served from buckets whose final sync failed are summarized again next time
+    synced = await get_synced_ranges(
+        [
+            (datetime(day.year, day.month, day.day).isoformat(),
+             (datetime(day.year, day.month, day.day) + timedelta(days=1)).isoformat())
+            for day in closed
+        ],
+        **nightscout_kwargs(nightscout_url=nightscout_url, user_id=user_id)
+    )
+    await store_daily_summaries(
+        {day: summary for (day, summary), final in zip(closed.items(), synced) if final}, user_id=user_id, site=site
     )
 
 
+async def get_period_summary(
+    start_date: datetime,
+    end_date: datetime,
+    nightscout_url: Optional[str] = None,
+    api_token: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> Optional[DailySummary]:
+    """
+    Merge the daily summaries of every day from start_date to end_date (inclusive).
+    
+    Days are summarized by iter_day_summaries, so elapsed days come from the
+    summary store and only open or unstored days are read from raw entries.
+    Weekly, monthly and quarterly insights are the `entry_insights()` and
+    `treatment_insights()` of the result.
+    
+    Args:
+        start_date: The first date to summarize (time component is ignored).
+        end_date: The last date to summarize (time component is ignored).
+        nightscout_url: Optional Nightscout URL (uses settings if not provided).
+        api_token: Optional API token (uses settings if not provided).
+        user_id: Optional user ID for user-specific caching.
+    
+    Returns:
+        The merged summary of the days that are stored or loaded, or None if there are none.
+    """
+    summaries = [
+        summary
+        async for summary in iter_day_summaries(
+            start_date, end_date, nightscout_url=nightscout_url, api_token=api_token, user_id=user_id
+        )
+    ]
+    return merge_summaries(summaries)
+
+
 def print_insights(insights: EntryInsights) -> None:
     """Helper function to print entry insights."""
     unit = insights.unit
@@ -347,7 +905,7 @@ if __name__ == "__main__":
     test_date = datetime(2026, 1, 29)
     
     print(f"Fetching data for {test_date.date()}...")
-    day_data = get_day_data(test_date)
+    day_data = asyncio.run(get_day_data(test_date))
     
     if day_data:
         print(f"Fetched {len(day_data.entries)} entries and {len(day_data.treatments)} treatments")
@@ -0,0 +1,187 @@
+"""
+Async HTTP client for Nightscout.
+
+This module keeps one pooled httpx.AsyncClient per Nightscout host so that
+requests from many users reuse keep-alive connections (and HTTP/2 where the
+`h2` package is installed), with explicit connect/read timeouts so that a slow
+Nightscout site only ever delays the requests that target it.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlparse
+
+import httpx
+
+from ..core.config import settings
+from .nightscout_health import backoff_delay, get_host_health, is_retryable, retry_budget
+
+# HTTP/2 is only negotiated when the optional `h2` dependency is available
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Pooled clients keyed by "scheme://host[:port]"
+_clients: Dict[str, httpx.AsyncClient] = {}
+# Per-host limits on concurrent loads, keyed like _clients
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Event loop the pooled clients belong to (connections cannot be shared across loops)
+_clients_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_host_key(url: str) -> str:
+    """Return the normalized "scheme://host[:port]" key for a Nightscout URL."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+def _build_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=settings.NIGHTSCOUT_CONNECT_TIMEOUT,
+        read=settings.NIGHTSCOUT_READ_TIMEOUT,
+        write=settings.NIGHTSCOUT_CONNECT_TIMEOUT,
+        pool=settings.NIGHTSCOUT_CONNECT_TIMEOUT,
+    )
+
+
+def _bind_to_running_loop() -> None:
+    global _clients_loop
+
+    loop = asyncio.get_running_loop()
+    if _clients_loop is not loop:
+        # Clients and semaphores from a previous (closed) event loop cannot be reused
+        _clients.clear()
+        _host_semaphores.clear()
+        _clients_loop = loop
+
+
+def get_host_semaphore(url: str) -> asyncio.Semaphore:
+    """
+    Get the semaphore bounding concurrent loads against the host of `url`.
+
+    Multi-day loaders acquire it per day so that one user's long range cannot
+    flood a single Nightscout site.
+    """
+    _bind_to_running_loop()
+    key = get_host_key(url)
+    semaphore = _host_semaphores.get(key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.NIGHTSCOUT_MAX_CONCURRENT_LOADS_PER_HOST)
+        _host_semaphores[key] = semaphore
+    return semaphore
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """
+    Get the pooled client for the host of `url`, creating it on first use.
+
+    Args:
+        url: Any URL on the Nightscout host.
+
+    Returns:
+        The shared httpx.AsyncClient for that host.
+    """
+    _bind_to_running_loop()
+
+    key = get_host_key(url)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=_build_timeout(),
+            limits=httpx.Limits(
+                max_connections=settings.NIGHTSCOUT_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=settings.NIGHTSCOUT_MAX_CONNECTIONS_PER_HOST,
+                keepalive_expiry=settings.NIGHTSCOUT_KEEPALIVE_EXPIRY,
+            ),
+            headers={"Accept": "application/json"},
+        )
+        _clients[key] = client
+    return client
+
+
+async def get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: Optional[Union[float, httpx.Timeout]] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> httpx.Response:
+    """
+    Issue a GET request through the pooled client for the URL's host.
+
+    Args:
+        url: The full request URL.
+        params: Optional query parameters.
+        timeout: Optional timeout (seconds or httpx.Timeout) overriding the defaults.
+        headers: Optional extra request headers (e.g. Authorization).
+
+    Returns:
+        The httpx.Response (status is not checked).
+    """
+    client = get_client(url)
+    if timeout is None:
+        return await client.get(url, params=params, headers=headers)
+    return await client.get(url, params=params, headers=headers, timeout=timeout)
+
+
+async def get_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Any:
+    """
+    Issue a GET request and return the decoded JSON body.
+
+    Requests go through the host's health record: the read timeout adapts to
+    the host's observed latency, retryable failures are retried with capped
+    exponential backoff while the shared retry budget allows it, and the
+    circuit breaker rejects requests outright while the host keeps failing.
+
+    Raises:
+        NightscoutUnavailableError: If the host's circuit breaker is open.
+        httpx.HTTPError: On transport errors, non-2xx responses or bodies that
+            are not JSON (httpx.DecodingError).
+    """
+    health = get_host_health(get_host_key(url))
+    attempt = 0
+    while True:
+        health.acquire()
+        retry_budget.deposit()
+        started = time.monotonic()
+        try:
+            response = await get(url, params=params, timeout=health.timeout(), headers=headers)
+            response.raise_for_status()
+            try:
+                data = response.json()
+            except ValueError as e:
+                # E.g. a proxy's HTML error page; keep to the httpx.HTTPError contract
+                raise httpx.DecodingError(f"Invalid JSON from {health.host}: {e}", request=response.request) from e
+        except httpx.HTTPError as e:
+            if isinstance(e, httpx.HTTPStatusError) and not is_retryable(e):
+                # The host answered; a client error says nothing about its health
+                health.record_success(time.monotonic() - started)
+                raise
+            health.record_failure()
+            if not is_retryable(e) or attempt >= settings.NIGHTSCOUT_MAX_RETRIES or not retry_budget.try_withdraw():
+                raise
+            delay = backoff_delay(attempt)
+            logging.warning(f"Retrying Nightscout request to {health.host} in {delay:.2f}s after: {e}")
+            await asyncio.sleep(delay)
+            attempt += 1
+        except BaseException:
+            # Cancelled or failed outside HTTP: no verdict on the host, but let the next request probe it
+            health.release_probe()
+            raise
+        else:
+            health.record_success(time.monotonic() - started)
+            return data
+
+
+async def close_clients() -> None:
+    """Close all pooled clients. Called on application shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    _host_semaphores.clear()
+    for client in clients:
+        await client.aclose()
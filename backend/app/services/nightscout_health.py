@@ -0,0 +1,189 @@
+"""
+Per-host health tracking for Nightscout sites.
+
+Each Nightscout host gets a HostHealth record with a rolling latency window
+(used for adaptive read timeouts) and a circuit breaker that fails fast once
+the host keeps failing. Retries across all hosts draw from one shared
+RetryBudget so a dead site cannot multiply its load through retries.
+"""
+
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..core.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class NightscoutUnavailableError(httpx.TransportError):
+    """Raised without contacting the host while its circuit breaker is open."""
+
+
+class HostHealth:
+    """Rolling latency statistics and circuit breaker state for one host."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.latencies = deque(maxlen=settings.NIGHTSCOUT_LATENCY_WINDOW)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.total_requests = 0
+        self.total_failures = 0
+        self.rejected_requests = 0
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Return the given latency percentile in seconds (nearest rank), or None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def read_timeout(self) -> float:
+        """
+        Read timeout adapted to the host's observed latency.
+
+        Once enough samples exist this is a multiple of the p99 latency, clamped
+        between NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN and NIGHTSCOUT_READ_TIMEOUT.
+        """
+        if len(self.latencies) < settings.NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return settings.NIGHTSCOUT_READ_TIMEOUT
+        adaptive = self.percentile(99) * settings.NIGHTSCOUT_ADAPTIVE_TIMEOUT_MULTIPLIER
+        return min(settings.NIGHTSCOUT_READ_TIMEOUT, max(settings.NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN, adaptive))
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=settings.NIGHTSCOUT_CONNECT_TIMEOUT,
+            read=self.read_timeout(),
+            write=settings.NIGHTSCOUT_CONNECT_TIMEOUT,
+            pool=settings.NIGHTSCOUT_CONNECT_TIMEOUT,
+        )
+
+    def acquire(self) -> None:
+        """
+        Check the breaker before a request.
+
+        Raises:
+            NightscoutUnavailableError: If the breaker is open, or half-open
+                with its single probe request already in flight.
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < settings.NIGHTSCOUT_BREAKER_COOLDOWN:
+                self.rejected_requests += 1
+                raise NightscoutUnavailableError(f"Nightscout host {self.host} is unavailable (circuit open)")
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected_requests += 1
+                raise NightscoutUnavailableError(f"Nightscout host {self.host} is unavailable (probing)")
+            self.probe_in_flight = True
+        self.total_requests += 1
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self.state = CLOSED
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot of a request that ended without a verdict, e.g. was cancelled."""
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= settings.NIGHTSCOUT_BREAKER_FAILURE_THRESHOLD:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "state": self.state,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "read_timeout_ms": ms(self.read_timeout()),
+            "consecutive_failures": self.consecutive_failures,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "rejected_requests": self.rejected_requests,
+        }
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all hosts: every request deposits a fraction of a
+    token and every retry withdraws a whole one, so retries stay a bounded
+    share of overall traffic.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.retries = 0
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tokens": round(self.tokens, 2), "retries": self.retries, "exhausted": self.exhausted}
+
+
+_hosts: Dict[str, HostHealth] = {}
+retry_budget = RetryBudget(settings.NIGHTSCOUT_RETRY_BUDGET_RATIO, settings.NIGHTSCOUT_RETRY_BUDGET_MAX)
+
+
+def get_host_health(host: str) -> HostHealth:
+    """Get (or create) the health record for a "scheme://host" key."""
+    health = _hosts.get(host)
+    if health is None:
+        health = HostHealth(host)
+        _hosts[host] = health
+    return health
+
+
+def backoff_delay(attempt: int) -> float:
+    """Capped exponential backoff with full jitter for retry `attempt` (0-based)."""
+    cap = min(settings.NIGHTSCOUT_RETRY_BACKOFF_MAX, settings.NIGHTSCOUT_RETRY_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transport errors, 429 and 5xx responses are worth retrying; other 4xx are not."""
+    if isinstance(error, NightscoutUnavailableError):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def get_health_stats() -> Dict[str, Any]:
+    """Return health statistics of every known host plus the shared retry budget."""
+    return {
+        "hosts": {host: health.stats() for host, health in _hosts.items()},
+        "retry_budget": retry_budget.stats(),
+    }
@@ -1,18 +1,558 @@
-import requests
+import asyncio
 import logging
-from typing import Optional, List
-from pydantic import ValidationError
-from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, List, Set, Tuple, Type
+import httpx
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse, urlunparse
 
+from . import nightscout_client, nightscout_v3
+from .summary_store import invalidate_daily_summaries
 from ..models.entry import Entry
+from ..models.glucose_series import GlucoseSeries
 from ..models.treatment import Treatment
-from ..core.cache import get_cache, set_cache
+from ..core.cache import (
+    EXPIRED, STALE, aget_day_bucket_states, aget_day_buckets, aset_day_buckets, bucket_freshness, day_bounds,
+    days_in_range, is_day_closed, site_scope
+)
 from ..core.config import settings
+from ..core.singleflight import SingleFlight
 
+# Version of the validated record shape stored in day buckets. Bump it when
+# Entry or Treatment change so older buckets are re-validated on read.
+BUCKET_SCHEMA_VERSION = 1
 
+# Coalesce identical concurrent range lookups and delta syncs
+_range_flights = SingleFlight("nightscout_ranges")
+_delta_flights = SingleFlight("nightscout_delta_sync")
 
+# Background refreshes of stale open buckets (referenced until done)
+_background_refreshes: Set[asyncio.Task] = set()
 
-def get_nightscout_entries(
+# Bulk decoders for bucket items that were validated before they were cached
+_ENTRY_LIST = TypeAdapter(List[Entry])
+_TREATMENT_LIST = TypeAdapter(List[Treatment])
+
+
+def _to_utc(value: str) -> datetime:
+    """
+    Parse an ISO date string into an aware UTC datetime.
+
+    Naive strings are treated as local wall-clock time one hour ahead of UTC,
+    matching how ranges have always been passed to this service.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return (parsed - timedelta(hours=1)).replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _to_epoch_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _entry_epoch_ms(entry: dict) -> Optional[int]:
+    return entry.get("date")
+
+
+def _treatment_epoch_ms(treatment: dict) -> Optional[int]:
+    created_at = treatment.get("created_at")
+    if created_at:
+        try:
+            parsed = datetime.fromisoformat(created_at)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return _to_epoch_ms(parsed)
+        except ValueError:
+            pass
+    return treatment.get("date")
+
+
+def _entry_page_date(entry: dict) -> Optional[int]:
+    """Return an entry's date as int ms, or None if it has no usable date."""
+    try:
+        return int(entry["date"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _normalize_entries(entries_data: List[dict]) -> List[dict]:
+    """Stamp fresh entries with cached_at and convert float dates to int."""
+    cached_at = datetime.now().isoformat()
+    for entry in entries_data:
+        entry['cached_at'] = cached_at
+
+        # convert date floats to date int
+        if "date" in entry:
+            entry["date"] = int(entry["date"])
+    return entries_data
+
+
+def _normalize_treatments(treatments_data: List[dict]) -> List[dict]:
+    """Stamp fresh treatments with cached_at."""
+    cached_at = datetime.now().isoformat()
+    for treatment in treatments_data:
+        treatment['cached_at'] = cached_at
+    return treatments_data
+
+
+async def _iter_entry_pages(
+    nightscout_url: str,
+    api_token: str,
+    start: datetime,
+    end: datetime,
+    page_size: int = settings.NIGHTSCOUT_PAGE_SIZE
+) -> AsyncIterator[List[dict]]:
+    """
+    Page through the entries with start <= date < end, newest first.
+
+    Each request asks for at most `page_size` entries at or below the oldest
+    date of the previous page, so only one page of raw JSON is held at a time.
+    Entries sharing the boundary date are de-duplicated by _id. Sites that
+    speak API v3 are paged through the v3 search with a field projection.
+    """
+    start_ms = _to_epoch_ms(start)
+    upper_ms = _to_epoch_ms(end) - 1
+    if await nightscout_v3.resolve_api_version(nightscout_url, api_token) == nightscout_v3.V3:
+        pages = nightscout_v3.iter_search(
+            nightscout_url, api_token, "entries",
+            {"date$gte": start_ms, "date$lte": upper_ms}, nightscout_v3.ENTRY_FIELDS, page_size
+        )
+        async for page in pages:
+            yield _normalize_entries(page)
+        return
+
+    seen_at_upper = set()
+    request_url = f"{nightscout_url}/api/v1/entries.json"
+
+    while upper_ms >= start_ms:
+        params = {
+            "token": api_token,
+            "count": page_size,
+            "find[date][$gte]": start_ms,
+            "find[date][$lte]": upper_ms
+        }
+        page = await nightscout_client.get_json(request_url, params=params)
+        dated = []
+        for entry in page:
+            date_ms = _entry_page_date(entry)
+            if date_ms is None:
+                logging.warning(f"Skipping Nightscout record without a timestamp: {entry.get('_id')}")
+                continue
+            dated.append((date_ms, entry))
+        fresh = [
+            entry for date_ms, entry in dated
+            if not (date_ms == upper_ms and entry.get("_id") in seen_at_upper)
+        ]
+        if fresh:
+            yield _normalize_entries(fresh)
+        if len(page) < page_size or not dated:
+            return
+
+        oldest_ms = min(date_ms for date_ms, _ in dated)
+        if not fresh:
+            # A full page of already-seen entries sharing one date: step past it
+            upper_ms = oldest_ms - 1
+            seen_at_upper = set()
+            continue
+        if oldest_ms != upper_ms:
+            seen_at_upper = set()
+        upper_ms = oldest_ms
+        seen_at_upper.update(entry.get("_id") for date_ms, entry in dated if date_ms == oldest_ms)
+
+
+async def _fetch_entries_span(nightscout_url: str, api_token: str, start: datetime, end: datetime) -> List[dict]:
+    """Fetch all entries with start <= date < end from Nightscout, page by page."""
+    entries_data = []
+    async for page in _iter_entry_pages(nightscout_url, api_token, start, end):
+        entries_data.extend(page)
+    return entries_data
+
+
+async def _fetch_v3_since(nightscout_url: str, api_token: str, collection: str, watermark: dict) -> List[dict]:
+    """Fetch records after a watermark over API v3, using the history endpoint when srvModified is known."""
+    fields = nightscout_v3.ENTRY_FIELDS if collection == "entries" else nightscout_v3.TREATMENT_FIELDS
+    if watermark.get("srvModified") is not None:
+        return await nightscout_v3.history(nightscout_url, api_token, collection, watermark["srvModified"], fields)
+    return await nightscout_v3.search(nightscout_url, api_token, collection, {"date$gt": watermark["date"]}, fields)
+
+
+async def _fetch_entries_since(nightscout_url: str, api_token: str, watermark: dict) -> List[dict]:
+    """Fetch the entries added (or modified, where srvModified is available) after a watermark."""
+    if await nightscout_v3.resolve_api_version(nightscout_url, api_token) == nightscout_v3.V3:
+        return _normalize_entries(await _fetch_v3_since(nightscout_url, api_token, "entries", watermark))
+
+    params = {"token": api_token, "count": 0}
+    if watermark.get("srvModified") is not None:
+        params["find[srvModified][$gt]"] = watermark["srvModified"]
+    else:
+        params["find[date][$gt]"] = watermark["date"]
+    request_url = f"{nightscout_url}/api/v1/entries.json"
+    entries_data = await nightscout_client.get_json(request_url, params=params)
+    return _normalize_entries(entries_data)
+
+
+async def _fetch_treatments_span(nightscout_url: str, api_token: str, start: datetime, end: datetime) -> List[dict]:
+    """Fetch all treatments with start <= created_at < end from Nightscout in one request."""
+    if await nightscout_v3.resolve_api_version(nightscout_url, api_token) == nightscout_v3.V3:
+        treatments_data = await nightscout_v3.search(
+            nightscout_url, api_token, "treatments",
+            {"date$gte": _to_epoch_ms(start), "date$lt": _to_epoch_ms(end)}, nightscout_v3.TREATMENT_FIELDS
+        )
+        return _normalize_treatments(treatments_data)
+
+    params = {
+        "token": api_token,
+        "count": 0,
+        "find[created_at][$gte]": start.strftime("%Y-%m-%dT%H:%M:%S"),
+        "find[created_at][$lt]": end.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    request_url = f"{nightscout_url}/api/v1/treatments.json"
+    treatments_data = await nightscout_client.get_json(request_url, params=params)
+    return _normalize_treatments(treatments_data)
+
+
+async def _fetch_treatments_since(nightscout_url: str, api_token: str, watermark: dict) -> List[dict]:
+    """Fetch the treatments added (or modified, where srvModified is available) after a watermark."""
+    if await nightscout_v3.resolve_api_version(nightscout_url, api_token) == nightscout_v3.V3:
+        return _normalize_treatments(await _fetch_v3_since(nightscout_url, api_token, "treatments", watermark))
+
+    params = {"token": api_token, "count": 0}
+    if watermark.get("srvModified") is not None:
+        params["find[srvModified][$gt]"] = watermark["srvModified"]
+    else:
+        since = datetime.fromtimestamp(watermark["date"] / 1000, tz=timezone.utc)
+        params["find[created_at][$gt]"] = since.strftime("%Y-%m-%dT%H:%M:%S.") + f"{since.microsecond // 1000:03d}Z"
+    request_url = f"{nightscout_url}/api/v1/treatments.json"
+    treatments_data = await nightscout_client.get_json(request_url, params=params)
+    return _normalize_treatments(treatments_data)
+
+
+@dataclass
+class _RecordSource:
+    """How to timestamp and fetch the raw records of one data family."""
+    family: str
+    nightscout_url: str
+    model: Type[BaseModel]
+    epoch_ms: Callable[[dict], Optional[int]]
+    fetch_span: Callable[[datetime, datetime], Awaitable[List[dict]]]
+    fetch_since: Callable[[dict], Awaitable[List[dict]]]
+
+    @property
+    def site(self) -> str:
+        """Cache key tag of the Nightscout site, see site_scope."""
+        return site_scope(self.nightscout_url)
+
+
+def _flight_key(family: str, nightscout_url: str, user_id: Optional[str], *parts) -> str:
+    """Normalized single-flight key: the same user, site and range always map to the same key."""
+    return ":".join([family, user_id or "-", nightscout_url.rstrip("/").lower(), *map(str, parts)])
+
+
+def _entries_source(nightscout_url: str, api_token: str) -> _RecordSource:
+    return _RecordSource(
+        family="entries",
+        nightscout_url=nightscout_url,
+        model=Entry,
+        epoch_ms=_entry_epoch_ms,
+        fetch_span=lambda start, end: _fetch_entries_span(nightscout_url, api_token, start, end),
+        fetch_since=lambda watermark: _fetch_entries_since(nightscout_url, api_token, watermark)
+    )
+
+
+def _treatments_source(nightscout_url: str, api_token: str) -> _RecordSource:
+    return _RecordSource(
+        family="treatments",
+        nightscout_url=nightscout_url,
+        model=Treatment,
+        epoch_ms=_treatment_epoch_ms,
+        fetch_span=lambda start, end: _fetch_treatments_span(nightscout_url, api_token, start, end),
+        fetch_since=lambda watermark: _fetch_treatments_since(nightscout_url, api_token, watermark)
+    )
+
+
+def _validate_records(records: List[dict], model: Type[BaseModel]) -> List[dict]:
+    """
+    Fully validate fresh records, normalizing them in place to the validated
+    values so they can later be decoded from the cache without re-validation.
+
+    Raises:
+        ValidationError: If a record does not match the model.
+    """
+    exclude = set(model.model_computed_fields)
+    for record in records:
+        record.update(model.model_validate(record).model_dump(by_alias=True, exclude=exclude, exclude_unset=True))
+    return records
+
+
+def _split_by_day(items: List[dict], epoch_ms: Callable[[dict], Optional[int]]) -> Dict[date, List[dict]]:
+    """Group raw records into their UTC day buckets."""
+    by_day: Dict[date, List[dict]] = {}
+    for item in items:
+        ms = epoch_ms(item)
+        if ms is None:
+            logging.warning(f"Skipping Nightscout record without a timestamp: {item.get('_id')}")
+            continue
+        day = datetime.fromtimestamp(ms / 1000, tz=timezone.utc).date()
+        by_day.setdefault(day, []).append(item)
+    return by_day
+
+
+def _merge_records(existing: List[dict], updates: List[dict]) -> List[dict]:
+    """Merge new or modified records into a bucket, replacing records with the same _id."""
+    merged = {item.get("_id"): item for item in existing}
+    for item in updates:
+        merged[item.get("_id")] = item
+    return list(merged.values())
+
+
+def _bucket_watermark(items: List[dict], day: date, epoch_ms: Callable[[dict], Optional[int]]) -> dict:
+    """Return the sync watermark of an open bucket: the newest date and srvModified it has seen."""
+    floor_ms = _to_epoch_ms(day_bounds(day)[0]) - 1
+    srv_modified = [item["srvModified"] for item in items if item.get("srvModified") is not None]
+    return {
+        "date": max((epoch_ms(item) for item in items), default=floor_ms),
+        "srvModified": max(srv_modified) if srv_modified and len(srv_modified) == len(items) else None
+    }
+
+
+def _oldest_watermark(watermarks: List[dict]) -> dict:
+    """Combine watermarks so a single delta request covers all of them."""
+    srv_modified = [w.get("srvModified") for w in watermarks]
+    return {
+        "date": min(w["date"] for w in watermarks),
+        "srvModified": min(srv_modified) if None not in srv_modified else None
+    }
+
+
+async def _store_buckets(source: _RecordSource, items_by_day: Dict[date, List[dict]], user_id: Optional[str]):
+    """Write buckets back to the cache in one batch, each complete once its day has elapsed."""
+    buckets = {
+        day: (items, None if is_day_closed(day) else _bucket_watermark(items, day, source.epoch_ms))
+        for day, items in items_by_day.items()
+    }
+    if buckets:
+        await aset_day_buckets(
+            source.family, buckets, user_id=user_id, schema=BUCKET_SCHEMA_VERSION, site=source.site
+        )
+
+
+async def _delta_sync(source: _RecordSource, open_buckets: Dict[date, dict], user_id: Optional[str]) -> Dict[date, List[dict]]:
+    """
+    Bring open day buckets up to date with a single request for records newer
+    than their watermark, merging the results into the stored buckets.
+
+    Returns:
+        The synced items of every open bucket plus any later day that the delta
+        created. Open buckets without a watermark are left out and will be
+        refetched in full.
+    """
+    watermarks = [bucket["watermark"] for bucket in open_buckets.values() if bucket.get("watermark")]
+    if len(watermarks) != len(open_buckets):
+        return {}
+
+    watermark = _oldest_watermark(watermarks)
+    delta = _split_by_day(_validate_records(await source.fetch_since(watermark), source.model), source.epoch_ms)
+    watermark_day = datetime.fromtimestamp(watermark["date"] / 1000, tz=timezone.utc).date()
+
+    # Days after the watermark that are not open buckets yet are fully covered by the delta
+    new_days = [day for day in delta if day not in open_buckets and day > watermark_day]
+    cached_new_days = await aget_day_buckets(source.family, new_days, user_id=user_id, site=source.site)
+
+    synced: Dict[date, List[dict]] = {}
+    for day in sorted(set(open_buckets) | set(new_days)):
+        bucket = open_buckets.get(day) or cached_new_days.get(day)
+        if bucket is not None and bucket.get("complete", True):
+            # Complete buckets are immutable
+            continue
+        updates = delta.get(day, [])
+        synced[day] = _merge_records(bucket["items"] if bucket else [], updates)
+    # Stored even without updates, to record the sync time for freshness
+    await _store_buckets(source, synced, user_id)
+    return synced
+
+
+def _refresh_in_background(source: _RecordSource, stale_buckets: Dict[date, dict], user_id: Optional[str]):
+    """Delta-sync stale open buckets in a background task (stale-while-revalidate)."""
+    delta_key = _flight_key(source.family, source.nightscout_url, user_id, *sorted(stale_buckets))
+
+    async def refresh():
+        try:
+            await _delta_flights.do(delta_key, lambda: _delta_sync(source, stale_buckets, user_id))
+        except (httpx.HTTPError, ValidationError) as e:
+            logging.warning(f"Background refresh of {source.family} failed: {e}")
+
+    task = asyncio.create_task(refresh())
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+
+
+async def _get_bucketed_range(
+    source: _RecordSource,
+    start: datetime,
+    end: datetime,
+    user_id: Optional[str]
+) -> Tuple[List[dict], int]:
+    """
+    Assemble the raw records of [start, end] from day buckets.
+
+    Every returned record has been validated against the source model, either
+    when it was fetched or when its bucket was cached. Complete buckets are
+    reused as-is. Open buckets (the current day) are
+    brought up to date with a delta request from their watermark. All missing
+    days are fetched with a single Nightscout request spanning the first to
+    the last missing day and written back to the cache; stored daily
+    summaries of refetched closed days are dropped (see summary_store).
+
+    Returns:
+        The records inside the range (unsorted) and the number of days that
+        had to be fetched in full.
+
+    Raises:
+        httpx.HTTPError: If a Nightscout request fails.
+        ValidationError: If Nightscout returns an invalid record.
+    """
+    days = days_in_range(start, end)
+    buckets = await aget_day_buckets(source.family, days, user_id=user_id, site=source.site)
+
+    upgraded: Dict[date, List[dict]] = {}
+    for day, bucket in buckets.items():
+        if bucket is not None and bucket.get("schema") != BUCKET_SCHEMA_VERSION:
+            # Buckets written by an older schema are validated once and upgraded
+            _validate_records(bucket.get("items", []), source.model)
+            bucket["schema"] = BUCKET_SCHEMA_VERSION
+            if bucket.get("complete", True):
+                upgraded[day] = bucket.get("items", [])
+    await _store_buckets(source, upgraded, user_id)
+
+    items_by_day = {
+        day: bucket.get("items", [])
+        for day, bucket in buckets.items()
+        if bucket is not None and bucket.get("complete", True)
+    }
+    open_buckets = {
+        day: bucket
+        for day, bucket in buckets.items()
+        if bucket is not None and not bucket.get("complete", True)
+    }
+    freshness = {day: bucket_freshness(day, bucket) for day, bucket in open_buckets.items()}
+    # Fresh and stale open buckets are served as cached; stale ones are refreshed in the background
+    items_by_day.update({
+        day: bucket.get("items", []) for day, bucket in open_buckets.items() if freshness[day] != EXPIRED
+    })
+    stale = {day: bucket for day, bucket in open_buckets.items() if freshness[day] == STALE}
+    if stale:
+        _refresh_in_background(source, stale, user_id)
+
+    expired = {day: bucket for day, bucket in open_buckets.items() if freshness[day] == EXPIRED}
+    if expired:
+        delta_key = _flight_key(source.family, source.nightscout_url, user_id, *sorted(expired))
+        try:
+            synced = await _delta_flights.do(delta_key, lambda: _delta_sync(source, expired, user_id))
+        except httpx.HTTPError as e:
+            # Serve the stale open buckets rather than failing while the host is down
+            logging.warning(f"Delta sync for {source.family} failed, serving stale cache: {e}")
+            synced = {day: bucket.get("items", []) for day, bucket in expired.items()}
+        items_by_day.update({day: items for day, items in synced.items() if day in buckets})
+
+    missing = [day for day in days if day not in items_by_day]
+    if missing:
+        span_start = day_bounds(missing[0])[0]
+        span_end = day_bounds(missing[-1])[1]
+        fetched = _split_by_day(
+            _validate_records(await source.fetch_span(span_start, span_end), source.model), source.epoch_ms
+        )
+        for day in missing:
+            items_by_day[day] = fetched.get(day, [])
+        await _store_buckets(source, {day: items_by_day[day] for day in missing}, user_id)
+        # A closed day is only refetched when its bucket was lost, and Nightscout may
+        # have been backfilled since any summary of it was stored
+        await invalidate_daily_summaries(
+            [day for day in missing if is_day_closed(day)], user_id=user_id, site=source.site
+        )
+
+    start_ms = _to_epoch_ms(start)
+    end_ms = _to_epoch_ms(end)
+    records = [
+        item
+        for day in days
+        for item in items_by_day[day]
+        if start_ms <= source.epoch_ms(item) <= end_ms
+    ]
+    return records, len(missing)
+
+
+async def _get_entry_records(
+    nightscout_url: str,
+    api_token: str,
+    from_date: str,
+    to_date: str,
+    count: int,
+    user_id: Optional[str]
+) -> List[dict]:
+    """
+    Return the raw entry records of a date range, newest first.
+
+    Identical concurrent lookups share one in-flight cache read and fetch, so
+    the returned list must not be modified.
+
+    Raises:
+        httpx.HTTPError: If a Nightscout request fails.
+        ValidationError: If Nightscout returns an invalid record.
+    """
+    start = _to_utc(from_date)
+    end = _to_utc(to_date)
+    source = _entries_source(nightscout_url, api_token)
+
+    async def load() -> List[dict]:
+        entries_data, fetched_days = await _get_bucketed_range(source, start, end, user_id)
+        if fetched_days:
+            logging.debug(f"Fetched entries for {fetched_days} uncached day(s) in range {start.isoformat()} - {end.isoformat()}")
+
+        entries_data.sort(key=_entry_epoch_ms, reverse=True)
+        if count:
+            entries_data = entries_data[:count]
+        return entries_data
+
+    key = _flight_key("entries", nightscout_url, user_id, _to_epoch_ms(start), _to_epoch_ms(end), count)
+    return await _range_flights.do(key, load)
+
+
+async def _get_treatment_records(
+    nightscout_url: str,
+    api_token: str,
+    from_date: str,
+    to_date: str,
+    count: int,
+    user_id: Optional[str]
+) -> List[dict]:
+    """
+    Return the raw treatment records of a date range, newest first.
+
+    Identical concurrent lookups share one in-flight cache read and fetch, so
+    the returned list must not be modified.
+
+    Raises:
+        httpx.HTTPError: If a Nightscout request fails.
+        ValidationError: If Nightscout returns an invalid record.
+    """
+    start = _to_utc(from_date)
+    end = _to_utc(to_date)
+    source = _treatments_source(nightscout_url, api_token)
+
+    async def load() -> List[dict]:
+        treatments_data, _ = await _get_bucketed_range(source, start, end, user_id)
+        treatments_data.sort(key=_treatment_epoch_ms, reverse=True)
+        if count:
+            treatments_data = treatments_data[:count]
+        return treatments_data
+
+    key = _flight_key("treatments", nightscout_url, user_id, _to_epoch_ms(start), _to_epoch_ms(end), count)
+    return await _range_flights.do(key, load)
+
+
+async def get_nightscout_entries(
     nightscout_url: str = settings.NIGHTSCOUT_URL,
     api_token: str = settings.NIGHTSCOUT_API_TOKEN,
     from_date: str = "",
@@ -23,6 +563,10 @@ def get_nightscout_entries(
     """
     Fetches and validates entries from the Nightscout API for a specific date range.
 
+    The range is assembled from per-day cache buckets; only days missing from
+    the cache are fetched in full, and the current day is refreshed with a
+    delta request for records newer than its sync watermark.
+
     Args:
         nightscout_url: The URL of the Nightscout instance.
         api_token: The API token for authentication.
@@ -32,56 +576,50 @@ def get_nightscout_entries(
         user_id: Optional user ID for user-specific caching.
 
     Returns:
-        A list of validated Entry objects, or None if an error occurred.
+        A list of validated Entry objects (newest first), or None if an error occurred.
     """
-
-    from_date_dt = datetime.fromisoformat(from_date) - timedelta(hours=1)
-    to_date_dt = datetime.fromisoformat(to_date) - timedelta(hours=1)
-
-    from_date_str = from_date_dt.isoformat()
-    to_date_str = to_date_dt.isoformat()
-
-    cache_key = f"entries_{from_date_str}_{to_date_str}_{count}"
-    cached_entries = get_cache(cache_key, user_id=user_id)
-
-    if cached_entries:
-        print(f"cache hit for entries for date range {from_date_str} - {to_date_str}")
-        return [Entry.model_validate(entry_data) for entry_data in cached_entries]
-    else:
-        print(f"cache miss for entries for date range {from_date_str} - {to_date_str}")
     try:
-        params = {
-            "count": count,
-            "find[dateString][$gte]": from_date_str,
-            "find[dateString][$lte]": to_date_str
-        }
-        request_url = f"{nightscout_url}/api/v1/entries.json?token={api_token}"
-        response = requests.get(request_url, params=params)
-        response.raise_for_status()  # Raise an exception for bad status codes
+        entries_data = await _get_entry_records(nightscout_url, api_token, from_date, to_date, count, user_id)
+        return _ENTRY_LIST.validate_python(entries_data)
 
-        entries_data = response.json()
+    except httpx.HTTPError as e:
+        print(f"Error fetching data from Nightscout: {e}")
+        return None
+    except ValidationError as e:
+        print(f"Error validating Nightscout data: {e}")
+        return None
 
-        for entry in entries_data:
-            entry['cached_at'] = datetime.now().isoformat()
 
-            # convert date floats to date int
-            if "date" in entry:
-                entry["date"] = int(entry["date"])
-        
-        
-        set_cache(cache_key, entries_data, user_id=user_id)
+async def get_nightscout_entry_series(
+    nightscout_url: str = settings.NIGHTSCOUT_URL,
+    api_token: str = settings.NIGHTSCOUT_API_TOKEN,
+    from_date: str = "",
+    to_date: str = "",
+    count: int = 0,
+    user_id: str = None
+) -> Optional[GlucoseSeries]:
+    """
+    Like get_nightscout_entries, but returns the entries as a columnar GlucoseSeries.
 
-        validated_entries = [Entry.model_validate(entry_data) for entry_data in entries_data]
-        return validated_entries
+    Records were validated when they were fetched, so they are packed into the
+    series columns directly without creating Entry objects.
 
-    except requests.exceptions.RequestException as e:
+    Returns:
+        A GlucoseSeries (newest first), or None if an error occurred.
+    """
+    try:
+        entries_data = await _get_entry_records(nightscout_url, api_token, from_date, to_date, count, user_id)
+        return GlucoseSeries.from_records(entries_data)
+
+    except httpx.HTTPError as e:
         print(f"Error fetching data from Nightscout: {e}")
         return None
     except ValidationError as e:
         print(f"Error validating Nightscout data: {e}")
         return None
 
-def get_nightscout_treatments(
+
+async def get_nightscout_treatments(
     nightscout_url: str = settings.NIGHTSCOUT_URL,
     api_token: str = settings.NIGHTSCOUT_API_TOKEN,
     from_date: str = "",
@@ -92,6 +630,10 @@ def get_nightscout_treatments(
     """
     Fetches and validates treatments from the Nightscout API for a specific date range.
 
+    The range is assembled from per-day cache buckets; only days missing from
+    the cache are fetched in full, and the current day is refreshed with a
+    delta request for records newer than its sync watermark.
+
     Args:
         nightscout_url: The URL of the Nightscout instance.
         api_token: The API token for authentication.
@@ -101,44 +643,116 @@ def get_nightscout_treatments(
         user_id: Optional user ID for user-specific caching.
 
     Returns:
-        A list of validated Treatment objects, or None if an error occurred.
+        A list of validated Treatment objects (newest first), or None if an error occurred.
     """
-    from_date_dt = datetime.fromisoformat(from_date) - timedelta(hours=1)
-    to_date_dt = datetime.fromisoformat(to_date) - timedelta(hours=1)
-
-    from_date_str = from_date_dt.isoformat()
-    to_date_str = to_date_dt.isoformat()
-
-    cache_key = f"treatments_{from_date_str}_{to_date_str}_{count}"
-    cached_treatments = get_cache(cache_key, user_id=user_id)
-    if cached_treatments:
-        return [Treatment.model_validate(treatment_data) for treatment_data in cached_treatments]
-
     try:
-        params = {
-            "count": count,
-            "find[created_at][$gte]": from_date_str,
-            "find[created_at][$lte]": to_date_str
-        }
-        request_url = f"{nightscout_url}/api/v1/treatments.json?token={api_token}"
-        response = requests.get(request_url, params=params)
-        response.raise_for_status()  # Raise an exception for bad status codes
-
-        treatments_data = response.json()
-        set_cache(cache_key, treatments_data, user_id=user_id)
-        for treatment in treatments_data:
-            treatment['cached_at'] = datetime.now().isoformat()
-        validated_treatments = [Treatment.model_validate(treatment_data) for treatment_data in treatments_data]
-        return validated_treatments
-
-    except requests.exceptions.RequestException as e:
+        treatments_data = await _get_treatment_records(nightscout_url, api_token, from_date, to_date, count, user_id)
+        return _TREATMENT_LIST.validate_python(treatments_data)
+
+    except httpx.HTTPError as e:
         print(f"Error fetching data from Nightscout: {e}")
         return None
     except ValidationError as e:
         print(f"Error validating Nightscout data: {e}")
         return None
 
-def test_nightscout_connection(nightscout_url: str) -> dict:
+def nightscout_kwargs(
+    nightscout_url: Optional[str] = None,
+    api_token: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> Dict[str, str]:
+    """Keyword arguments for the get_nightscout_* functions, leaving out unset ones so the settings apply."""
+    kwargs = {}
+    if nightscout_url:
+        kwargs['nightscout_url'] = nightscout_url
+    if api_token:
+        kwargs['api_token'] = api_token
+    if user_id:
+        kwargs['user_id'] = user_id
+    return kwargs
+
+
+async def prefetch_nightscout_range(
+    nightscout_url: str = settings.NIGHTSCOUT_URL,
+    api_token: str = settings.NIGHTSCOUT_API_TOKEN,
+    from_date: str = "",
+    to_date: str = "",
+    user_id: str = None
+) -> bool:
+    """
+    Load the entry and treatment day buckets of a whole range at once.
+
+    Multi-day loaders call this before loading each day separately: the range
+    costs one batched cache read and one batched write per data family (plus
+    one Nightscout request for the missing days), after which the per-day
+    loads are served by the memory tier of the cache.
+
+    Returns:
+        True if both families were loaded, False if either failed (the
+        per-day loads will then retry on their own).
+    """
+    results = await asyncio.gather(
+        _get_entry_records(nightscout_url, api_token, from_date, to_date, 0, user_id),
+        _get_treatment_records(nightscout_url, api_token, from_date, to_date, 0, user_id),
+        return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors:
+        if not isinstance(error, (httpx.HTTPError, ValidationError)):
+            raise error
+        logging.warning(f"Prefetching Nightscout range failed: {error}")
+    return not errors
+
+
+async def get_synced_ranges(
+    ranges: List[Tuple[str, str]],
+    nightscout_url: str = settings.NIGHTSCOUT_URL,
+    user_id: str = None
+) -> List[bool]:
+    """
+    Tell which date ranges are fully synced: every entry and treatment day
+    bucket they overlap is cached and complete, so their data can no longer
+    change.
+
+    A range is not synced while one of its days is still open, or when its
+    open bucket was served stale because the final delta sync after the day
+    elapsed failed.
+
+    Args:
+        ranges: (from_date, to_date) pairs in ISO format, as for get_nightscout_entries.
+        nightscout_url: The URL of the Nightscout instance.
+        user_id: Optional user ID for user-specific caching.
+
+    Returns:
+        One flag per range, in order.
+    """
+    range_days = [days_in_range(_to_utc(from_date), _to_utc(to_date)) for from_date, to_date in ranges]
+    days = sorted({day for days in range_days for day in days})
+    site = site_scope(nightscout_url)
+    states = await asyncio.gather(
+        aget_day_bucket_states("entries", days, user_id=user_id, site=site),
+        aget_day_bucket_states("treatments", days, user_id=user_id, site=site)
+    )
+    return [all(state[day] for state in states for day in days) for days in range_days]
+
+
+def parse_nightscout_url(nightscout_url: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a saved Nightscout URL into its base URL and API token.
+
+    Args:
+        nightscout_url: The full Nightscout URL with token, e.g.
+                       "https://site.example.com?token=xxx"
+
+    Returns:
+        ("https://site.example.com", "xxx"); the token is None if the URL has none.
+    """
+    parsed = urlparse(nightscout_url)
+    token = parse_qs(parsed.query).get('token', [None])[0]
+    return urlunparse((parsed.scheme, parsed.netloc, '', '', '', '')), token
+
+
+async def test_nightscout_connection(nightscout_url: str) -> dict:
     """
     Test a Nightscout connection by fetching the latest glucose entry.
     
@@ -156,23 +770,13 @@ def test_nightscout_connection(nightscout_url: str) -> dict:
         - error: error message (if not success)
     """
     try:
-        # Parse the URL to extract base URL and token
-        from urllib.parse import urlparse, parse_qs, urlunparse
-        
-        parsed = urlparse(nightscout_url)
-        query_params = parse_qs(parsed.query)
-        
-        # Extract token from query params
-        token = query_params.get('token', [None])[0]
+        base_url, token = parse_nightscout_url(nightscout_url)
         if not token:
             return {
                 "success": False,
                 "error": "No token found in URL. Format: https://yoursite.example.com?token=xxx"
             }
         
-        # Build the base URL without query params
-        base_url = urlunparse((parsed.scheme, parsed.netloc, '', '', '', ''))
-        
         if not base_url:
             return {
                 "success": False,
@@ -180,8 +784,8 @@ def test_nightscout_connection(nightscout_url: str) -> dict:
             }
         
         # Fetch latest entry
-        request_url = f"{base_url}/api/v1/entries.json?token={token}&count=1"
-        response = requests.get(request_url, timeout=10)
+        request_url = f"{base_url}/api/v1/entries.json"
+        response = await nightscout_client.get(request_url, params={"token": token, "count": 1}, timeout=10)
         
         if response.status_code == 401:
             return {
@@ -233,17 +837,17 @@ def test_nightscout_connection(nightscout_url: str) -> dict:
             "time_ago": time_ago
         }
         
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return {
             "success": False,
             "error": "Connection timed out. Check your URL."
         }
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         return {
             "success": False,
             "error": "Could not connect to Nightscout. Check your URL."
         }
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logging.error(f"Request failed in test_nightscout_connection: {e}", exc_info=True)
         return {
             "success": False,
@@ -258,10 +862,10 @@ def test_nightscout_connection(nightscout_url: str) -> dict:
 
 
 if __name__ == "__main__":
-    result = get_nightscout_entries(
+    result = asyncio.run(get_nightscout_entries(
         from_date="2026-01-29T00:00:00",
         to_date="2026-01-30T00:00:00",
         count=10
-    )
+    ))
     print(result)
     print(f"Fetched {len(result) if result else 0} entries")
@@ -0,0 +1,226 @@
+"""
+Nightscout API v3 transport.
+
+API v3 lets us ask for just the fields that `Entry` and `Treatment` use
+(`fields=` projection) and offers `history/{lastModified}` endpoints that
+return everything modified since a srvModified timestamp. Requests are
+authenticated with a JWT obtained from the v2 authorization endpoint.
+
+Documents are returned in the same shape as the v1 API uses, i.e. with
+`identifier` mapped back to `_id`, so callers can treat both versions alike.
+"""
+
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+import httpx
+from pydantic import BaseModel
+
+from . import nightscout_client
+from ..core.config import settings
+from ..models.entry import Entry
+from ..models.treatment import Treatment
+
+V1 = "v1"
+V3 = "v3"
+
+# Seconds before a JWT's expiry at which it is renewed
+_JWT_RENEW_MARGIN = 60
+
+# Detected API version per host: host key -> (version, detected at)
+_api_versions: Dict[str, Tuple[str, float]] = {}
+# JWT per (host key, access token): -> (jwt or None if refused, valid until)
+_jwts: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+
+
+def _projection(model: Type[BaseModel]) -> str:
+    """Comma-separated v3 field list for the stored fields of a model, plus srvModified for syncing."""
+    fields = [field.alias or name for name, field in model.model_fields.items() if name != "cached_at"]
+    return ",".join(["identifier" if field == "_id" else field for field in fields] + ["srvModified"])
+
+
+ENTRY_FIELDS = _projection(Entry)
+TREATMENT_FIELDS = _projection(Treatment)
+
+
+def _from_v3(document: dict) -> dict:
+    """Map a v3 document back to the v1 shape."""
+    identifier = document.pop("identifier", None)
+    if identifier is not None:
+        document["_id"] = identifier
+    return document
+
+
+async def _detect_api_version(nightscout_url: str) -> Optional[str]:
+    """
+    Ask the (public) version endpoint whether the site speaks API v3.
+
+    Returns:
+        V3 or V1, or None if the site could not be asked (transport or
+        decode error), so the caller can fall back without caching it.
+    """
+    try:
+        version = await nightscout_client.get_json(f"{nightscout_url}/api/v3/version")
+    except httpx.HTTPStatusError:
+        return V1
+    except httpx.HTTPError as e:
+        logging.warning(f"Could not detect the Nightscout API version of {nightscout_url}: {e}")
+        return None
+    result = version.get("result", version) if isinstance(version, dict) else None
+    api_version = str(result.get("apiVersion", "")) if isinstance(result, dict) else ""
+    return V3 if api_version.startswith("3") else V1
+
+
+async def _get_jwt(nightscout_url: str, api_token: str) -> Optional[str]:
+    """
+    Get a (cached) JWT for an access token, or None if the site refuses the token.
+
+    Refusals (401/403) are cached like detection results, so a token that
+    only works with v1 does not cost an extra request every time; other
+    error responses fall back to v1 for this request only.
+    """
+    key = (nightscout_client.get_host_key(nightscout_url), api_token)
+    cached = _jwts.get(key)
+    if cached is not None and time.time() < cached[1]:
+        return cached[0]
+
+    try:
+        auth = await nightscout_client.get_json(f"{nightscout_url}/api/v2/authorization/request/{api_token}")
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (401, 403):
+            _jwts[key] = (None, time.time() + settings.NIGHTSCOUT_API_DETECT_TTL)
+        return None
+    expires_at = float(auth.get("exp", time.time() + 3600)) - _JWT_RENEW_MARGIN
+    _jwts[key] = (auth["token"], expires_at)
+    return auth["token"]
+
+
+async def resolve_api_version(nightscout_url: str, api_token: str) -> str:
+    """
+    Return the API version ("v1" or "v3") to use for a site and token.
+
+    NIGHTSCOUT_API_VERSION forces a version; with "auto" the site's version
+    is detected once per host (re-checked after NIGHTSCOUT_API_DETECT_TTL) and
+    v3 is only used when the token can be exchanged for a JWT. If detection
+    fails, v1 is used until the next request tries again.
+
+    Raises:
+        httpx.HTTPError: If the site cannot be reached while requesting a JWT.
+    """
+    if settings.NIGHTSCOUT_API_VERSION in (V1, V3):
+        return settings.NIGHTSCOUT_API_VERSION
+
+    host = nightscout_client.get_host_key(nightscout_url)
+    cached = _api_versions.get(host)
+    if cached is None or time.time() - cached[1] > settings.NIGHTSCOUT_API_DETECT_TTL:
+        version = await _detect_api_version(nightscout_url)
+        if version is None:
+            return V1
+        cached = (version, time.time())
+        _api_versions[host] = cached
+    if cached[0] == V3 and await _get_jwt(nightscout_url, api_token) is not None:
+        return V3
+    return V1
+
+
+async def _get_documents(nightscout_url: str, api_token: str, path: str, params: Dict[str, Any]) -> List[dict]:
+    """GET a v3 collection endpoint and return its documents in v1 shape."""
+    jwt = await _get_jwt(nightscout_url, api_token)
+    if jwt is None:
+        raise httpx.HTTPError(f"Nightscout at {nightscout_url} refused the access token for API v3")
+    try:
+        data = await nightscout_client.get_json(
+            f"{nightscout_url}/api/v3/{path}", params=params, headers={"Authorization": f"Bearer {jwt}"}
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 401:
+            # Force a fresh JWT on the next request
+            _jwts.pop((nightscout_client.get_host_key(nightscout_url), api_token), None)
+        raise
+    documents = data.get("result", []) if isinstance(data, dict) else data
+    return [_from_v3(document) for document in documents]
+
+
+async def iter_search(
+    nightscout_url: str,
+    api_token: str,
+    collection: str,
+    filters: Dict[str, Any],
+    fields: str,
+    page_size: int = settings.NIGHTSCOUT_PAGE_SIZE
+) -> AsyncIterator[List[dict]]:
+    """
+    Page through a v3 collection search (newest first by `date`).
+
+    Args:
+        collection: "entries" or "treatments".
+        filters: v3 filter parameters, e.g. {"date$gte": 0, "date$lt": 1}.
+        fields: The field projection, e.g. ENTRY_FIELDS.
+
+    Yields:
+        Pages of documents in v1 shape, de-duplicated by _id across pages.
+    """
+    seen = set()
+    skip = 0
+    while True:
+        params = {**filters, "fields": fields, "sort$desc": "date", "limit": page_size, "skip": skip}
+        page = await _get_documents(nightscout_url, api_token, collection, params)
+        fresh = [document for document in page if document.get("_id") not in seen]
+        seen.update(document.get("_id") for document in fresh)
+        if fresh:
+            yield fresh
+        if len(page) < page_size:
+            return
+        skip += len(page)
+
+
+async def search(nightscout_url: str, api_token: str, collection: str, filters: Dict[str, Any], fields: str) -> List[dict]:
+    """Collect all pages of iter_search into one list."""
+    documents = []
+    async for page in iter_search(nightscout_url, api_token, collection, filters, fields):
+        documents.extend(page)
+    return documents
+
+
+async def history(
+    nightscout_url: str,
+    api_token: str,
+    collection: str,
+    last_modified: int,
+    fields: str,
+    page_size: int = settings.NIGHTSCOUT_PAGE_SIZE
+) -> List[dict]:
+    """
+    Return the documents created or modified after `last_modified` (srvModified, epoch ms).
+
+    Deleted documents (isValid == false) are skipped: buckets are only ever
+    synced for the current day, whose records are rarely deleted.
+
+    The endpoint returns srvModified > last_modified, so each next page is
+    requested from just before the newest srvModified seen: documents that
+    share it with the end of a page are returned again and de-duplicated by
+    _id instead of being skipped. Only a run of more than `page_size`
+    documents with one srvModified cannot be paged through completely.
+    """
+    documents = []
+    seen = set()
+    since = last_modified
+    while True:
+        params = {"fields": fields + ",isValid", "limit": page_size}
+        page = await _get_documents(nightscout_url, api_token, f"{collection}/history/{since}", params)
+        fresh = [document for document in page if document.get("_id") not in seen]
+        seen.update(document.get("_id") for document in fresh)
+        documents.extend(document for document in fresh if document.pop("isValid", True) is not False)
+        if len(page) < page_size:
+            return documents
+        newest = max(document.get("srvModified") or since + 1 for document in page)
+        if newest - 1 > since:
+            since = newest - 1
+        else:
+            # A full page sharing one srvModified: page past it, more of them may exist
+            logging.warning(
+                f"{page_size} or more {collection} share srvModified {newest} at {nightscout_url}; "
+                "history sync may miss some of them"
+            )
+            since = newest
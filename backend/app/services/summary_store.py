@@ -0,0 +1,94 @@
+"""
+Persisted per-user daily summaries.
+
+The DailySummary of every elapsed day (see data_analysis_service) is
+stored through the cache layer, one document per user, Nightscout site
+(see site_scope) and calendar month under "summaries_month_{YYYY-MM}_{site}":
+
+    {"version": SUMMARY_VERSION, "days": {"2026-01-29": {...}, ...}}
+
+so a range query reads one document per month, in one batched read.
+Summaries are only stored for days that have elapsed, so their inputs can
+no longer change; documents written with another SUMMARY_VERSION are
+ignored and rebuilt.
+
+Writes are read-modify-write on the month document. Two concurrent writers
+can drop each other's days, which only means they are computed again.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from ..core.cache import aget_many, aset_many
+
+# Bump when the stored summary shape or the range thresholds change
+SUMMARY_VERSION = 1
+
+
+def summary_month_key(day: date, site: Optional[str] = None) -> str:
+    """Return the key of the month document holding a day, e.g. "summaries_month_2026-01_3f2a9c81d0"."""
+    key = f"summaries_month_{day.year:04d}-{day.month:02d}"
+    return f"{key}_{site}" if site else key
+
+
+def _month_keys(days: Iterable[date], site: Optional[str] = None) -> Dict[str, List[date]]:
+    keys: Dict[str, List[date]] = {}
+    for day in days:
+        keys.setdefault(summary_month_key(day, site), []).append(day)
+    return keys
+
+
+async def _load_months(keys: List[str], user_id: str = None) -> Dict[str, Dict[str, dict]]:
+    """Return the stored days of each month document, {} for missing or outdated ones."""
+    documents = await aget_many(keys, user_id=user_id)
+    return {
+        key: dict(document["days"]) if document and document.get("version") == SUMMARY_VERSION else {}
+        for key, document in documents.items()
+    }
+
+
+async def load_daily_summaries(days: Iterable[date], user_id: str = None, site: Optional[str] = None) -> Dict[date, dict]:
+    """
+    Load the stored summaries of the given days.
+
+    Returns:
+        Mapping of day to stored summary (DailySummary.to_dict()) for the days that have one.
+    """
+    by_month = _month_keys(days, site)
+    months = await _load_months(list(by_month), user_id)
+    summaries = {}
+    for key, month_days in by_month.items():
+        for day in month_days:
+            stored = months[key].get(day.isoformat())
+            if stored is not None:
+                summaries[day] = stored
+    return summaries
+
+
+async def store_daily_summaries(summaries: Dict[date, dict], user_id: str = None, site: Optional[str] = None):
+    """Add day summaries (DailySummary.to_dict()) to their month documents."""
+    if not summaries:
+        return
+    by_month = _month_keys(summaries, site)
+    months = await _load_months(list(by_month), user_id)
+    for key, month_days in by_month.items():
+        months[key].update({day.isoformat(): summaries[day] for day in month_days})
+    await aset_many(
+        {key: {"version": SUMMARY_VERSION, "days": days} for key, days in months.items()},
+        user_id=user_id
+    )
+
+
+async def invalidate_daily_summaries(days: Iterable[date], user_id: str = None, site: Optional[str] = None):
+    """Drop stored day summaries, e.g. after data of those days was changed in Nightscout."""
+    by_month = _month_keys(days, site)
+    months = await _load_months(list(by_month), user_id)
+    changed = {}
+    for key, month_days in by_month.items():
+        stored = months[key]
+        if any(day.isoformat() in stored for day in month_days):
+            for day in month_days:
+                stored.pop(day.isoformat(), None)
+            changed[key] = {"version": SUMMARY_VERSION, "days": stored}
+    if changed:
+        await aset_many(changed, user_id=user_id)
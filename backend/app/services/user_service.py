@@ -3,6 +3,7 @@ from datetime import datetime
 from typing import Optional, List
 from firebase_admin import firestore
 
+from ..core.cache import invalidate_user_cache
 from ..models.schemas import (
     UserCreate, UserUpdate, UserResponse, UserRole,
     UserSettings, UserSettingsUpdate
@@ -98,4 +99,10 @@ class UserService:
         # Save to Firestore
         doc_ref.update({"settings": merged_settings})
         
+        # Persisted day buckets, summaries and AGP sketches are keyed by site
+        # (see site_scope) and are simply not found for the new one; drop the
+        # old site's data from the memory tier
+        if merged_settings.get("nightscout_url") != current_settings.get("nightscout_url"):
+            invalidate_user_cache(uid)
+        
         return UserSettings(**merged_settings)
@@ -0,0 +1,129 @@
+"""Minimal in-memory stand-ins for the parts of google.cloud.firestore.Client and AsyncClient used by the cache."""
+
+import copy
+
+
+class FakeSnapshot:
+    def __init__(self, ref, data):
+        self.reference = ref
+        self.id = ref.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._db, self.path + (name,))
+
+    def get(self):
+        self._db.reads += 1
+        return FakeSnapshot(self, copy.deepcopy(self._db.docs.get(self.path)))
+
+    def set(self, data):
+        self._db.writes += 1
+        self._db.docs[self.path] = copy.deepcopy(data)
+
+    def delete(self):
+        self._db.writes += 1
+        self._db.docs.pop(self.path, None)
+
+
+class FakeCollection:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    def document(self, name):
+        return FakeDocument(self._db, self.path + (name,))
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def set(self, ref, data):
+        self._ops.append(lambda: FakeDocument.set(ref, data))
+
+    def delete(self, ref):
+        self._ops.append(lambda: FakeDocument.delete(ref))
+
+    def commit(self):
+        assert len(self._ops) <= 500, "Firestore batches are limited to 500 operations"
+        self._db.commits += 1
+        for op in self._ops:
+            op()
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self.get_all_calls = 0
+
+    def collection(self, name):
+        return FakeCollection(self, (name,))
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def get_all(self, refs, field_paths=None):
+        self.get_all_calls += 1
+        for ref in refs:
+            data = copy.deepcopy(self.docs.get(ref.path))
+            if data is not None and field_paths is not None:
+                data = {field: data[field] for field in field_paths if field in data}
+            yield FakeSnapshot(ref, data)
+
+
+class FakeAsyncDocument(FakeDocument):
+    def collection(self, name):
+        return FakeAsyncCollection(self._db, self.path + (name,))
+
+    async def get(self):
+        return super().get()
+
+    async def set(self, data):
+        super().set(data)
+
+    async def delete(self):
+        super().delete()
+
+
+class FakeAsyncCollection(FakeCollection):
+    def document(self, name):
+        return FakeAsyncDocument(self._db, self.path + (name,))
+
+
+class FakeAsyncBatch(FakeBatch):
+    async def commit(self):
+        super().commit()
+
+
+class FakeAsyncFirestore(FakeFirestore):
+    """Async client view; pass `docs` to share storage with a FakeFirestore."""
+
+    def __init__(self, docs=None):
+        super().__init__()
+        if docs is not None:
+            self.docs = docs
+
+    def collection(self, name):
+        return FakeAsyncCollection(self, (name,))
+
+    def batch(self):
+        return FakeAsyncBatch(self)
+
+    async def get_all(self, refs, field_paths=None):
+        for snapshot in super().get_all(refs, field_paths):
+            yield snapshot
@@ -0,0 +1,96 @@
+import asyncio
+import random
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.core import cache
+from app.core.config import settings
+from app.models.glucose_series import GlucoseSeries
+from app.services import agp
+from app.tests.test_glucose_series import make_record
+
+TZ = "Europe/Stockholm"
+
+
+def make_series(first_day: date, days: int, seed: int = 5) -> GlucoseSeries:
+    """Readings every 5 minutes over whole local days in TZ, with a gap without sgv."""
+    rng = random.Random(seed)
+    start_ms = int(datetime(first_day.year, first_day.month, first_day.day, tzinfo=ZoneInfo(TZ)).timestamp() * 1000)
+    base_ms = make_record(0)["date"]
+    records = []
+    for i in range(days * 288):
+        sgv = None if i % 97 == 0 else rng.randint(40, 350) + (i % 288) // 3
+        record = make_record(i, sgv=sgv)
+        record["date"] = start_ms + (record["date"] - base_ms)
+        record["dateString"] = record["sysTime"] = None
+        records.append(record)
+    return GlucoseSeries.from_records(records)
+
+
+def readings_by_slot(series: GlucoseSeries, days):
+    """Reference binning: the readings of the local days, per local time-of-day slot."""
+    first, last = min(days), max(days)
+    start = datetime(first.year, first.month, first.day, tzinfo=ZoneInfo(TZ))
+    end = datetime(last.year, last.month, last.day, tzinfo=ZoneInfo(TZ)) + timedelta(days=1)
+    slots = [[] for _ in range(agp.AGP_SLOTS)]
+    for entry in series:
+        moment = datetime.fromtimestamp(entry.date / 1000, timezone.utc)
+        if entry.sgv is None or not start <= moment < end:
+            continue
+        local = moment.astimezone(ZoneInfo(TZ))
+        slots[(local.hour * 60 + local.minute) // agp.AGP_SLOT_MINUTES].append(entry.sgv)
+    return slots
+
+
+@pytest.mark.parametrize("numpy_available", [True, False])
+def test_percentiles_match_numpy_across_a_dst_change(monkeypatch, numpy_available):
+    # Stockholm switches to summer time on 2026-03-29
+    days = [date(2026, 3, 23) + timedelta(days=i) for i in range(14)]
+    series = make_series(days[0], 14)
+    np = pytest.importorskip("numpy")
+    slots = readings_by_slot(series, days)
+    expected = {
+        percentile: [float(np.percentile(values, percentile)) if values else None for values in slots]
+        for percentile in agp.AGP_PERCENTILES
+    }
+    if not numpy_available:
+        monkeypatch.setattr(agp, "np", None)
+
+    profile = agp.agp_profile(agp.sketch_day(series, day, TZ) for day in days)
+
+    assert profile.days == 14 and profile.unit == "mg/dL"
+    assert profile.counts == [len(values) for values in slots]
+    for percentile in agp.AGP_PERCENTILES:
+        assert profile.percentiles[percentile] == pytest.approx(expected[percentile])
+
+
+def test_elapsed_days_are_sketched_once_and_cached(monkeypatch):
+    store = {}
+    fetches = []
+    days = [date(2026, 1, 10) + timedelta(days=i) for i in range(3)]
+    series = make_series(days[0], 3)
+
+    async def aget_many(keys, user_id=None):
+        return {key: store.get((user_id, key)) for key in keys}
+
+    async def aset_many(values, user_id=None, ttl=None):
+        store.update({(user_id, key): value for key, value in values.items()})
+
+    async def get_nightscout_entry_series(from_date, to_date, count=0, **kwargs):
+        fetches.append((from_date, to_date))
+        return series
+
+    monkeypatch.setattr(agp, "aget_many", aget_many)
+    monkeypatch.setattr(agp, "aset_many", aset_many)
+    monkeypatch.setattr(agp, "get_nightscout_entry_series", get_nightscout_entry_series)
+
+    first = asyncio.run(agp.get_agp(days[0], days[-1], tz=TZ, user_id="u1"))
+    second = asyncio.run(agp.get_agp(days[0], days[-1], tz=TZ, user_id="u1", use_mmol=True))
+
+    assert fetches == [("2026-01-09T23:00:00+00:00", "2026-01-12T23:00:00+00:00")]
+    assert ("u1", agp.agp_cache_key(days[0], TZ, cache.site_scope(settings.NIGHTSCOUT_URL))) in store
+    assert agp.agp_cache_key(days[0], TZ, "3f2a9c81d0") == "agp_day_2026-01-10_3f2a9c81d0_Europe-Stockholm"
+    assert second.unit == "mmol/L"
+    assert second.percentiles[50][40] == round(first.percentiles[50][40] / 18.0, 2)
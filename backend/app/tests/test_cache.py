@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from app.core import cache
+from app.core import cache_backends
+from app.core.cache_backends import FirestoreBackend, SQLiteBackend
+from app.core.config import settings
+from app.tests.fake_firestore import FakeAsyncFirestore, FakeFirestore
+
+
+@pytest.fixture
+def firestore_db(monkeypatch):
+    db = FakeFirestore()
+    monkeypatch.setattr(cache, "backend", FirestoreBackend(db))
+    monkeypatch.setattr(cache, "memory_cache", None)
+    monkeypatch.setattr(settings, "CACHE_CHUNK_SIZE", 1024)
+    return db
+
+
+def test_large_values_are_chunked_and_replaced_atomically(firestore_db):
+    value = [{"i": i, "note": f"treatment {i}" * 3, "blob": bytes([i % 256]) * 8} for i in range(2000)]
+    asyncio.run(cache.aset_cache("history", value, user_id="u1"))
+
+    manifest = firestore_db.docs[("ns_insight_cache", "u1", "cache", "history")]
+    assert manifest["chunked"] and manifest["chunks"] > 1
+    assert asyncio.run(cache.aget_cache("history", user_id="u1")) == value
+    # One batched read for the manifest, one for all of its chunks
+    assert firestore_db.get_all_calls == 2
+
+    replacement = value[::-1]
+    asyncio.run(cache.aset_cache("history", replacement, user_id="u1"))
+    assert asyncio.run(cache.aget_cache("history", user_id="u1")) == replacement
+    chunk_docs = [path for path in firestore_db.docs if "chunks" in path]
+    new_manifest = firestore_db.docs[("ns_insight_cache", "u1", "cache", "history")]
+    assert len(chunk_docs) == new_manifest["chunks"]
+    assert all(path[-1].startswith(new_manifest["generation"]) for path in chunk_docs)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_small_values_replacing_chunked_ones_delete_the_chunks(monkeypatch, use_async):
+    db = FakeFirestore()
+    async_db = FakeAsyncFirestore(db.docs)
+    # Without an async client the backend runs its sync API in a worker thread
+    async_client_factory = (lambda: async_db) if use_async else None
+    monkeypatch.setattr(cache, "backend", FirestoreBackend(db, async_client_factory=async_client_factory))
+    monkeypatch.setattr(cache, "memory_cache", None)
+    monkeypatch.setattr(settings, "CACHE_CHUNK_SIZE", 1024)
+    large = [{"i": i, "note": f"treatment {i}" * 3} for i in range(2000)]
+    asyncio.run(cache.aset_many({"today": large, "other": large}, user_id="u1"))
+    assert any("chunks" in path for path in db.docs)
+
+    asyncio.run(cache.aset_many({"today": {"a": 1}, "other": {"b": 2}}, user_id="u1"))
+
+    assert not any("chunks" in path for path in db.docs)
+    assert asyncio.run(cache.aget_many(["today", "other"], user_id="u1")) == {"today": {"a": 1}, "other": {"b": 2}}
+
+
+def test_compressible_values_larger_than_a_document_are_chunked(firestore_db):
+    value = ["glucose " * 1000]
+    asyncio.run(cache.aset_cache("notes", value, user_id="u1"))
+
+    manifest = firestore_db.docs[("ns_insight_cache", "u1", "cache", "notes")]
+    assert manifest["chunked"] and manifest["chunks"] == 1
+    assert "value" not in manifest
+    assert asyncio.run(cache.aget_cache("notes", user_id="u1")) == value
+
+
+def test_inline_batches_are_bounded_by_size(firestore_db, monkeypatch):
+    monkeypatch.setattr(cache_backends, "BATCH_BYTES_LIMIT", 2000)
+    values = {f"note_{i}": "x" * 600 for i in range(10)}
+    asyncio.run(cache.aset_many(values, user_id="u1"))
+    assert firestore_db.commits == 4
+    assert asyncio.run(cache.aget_many(list(values), user_id="u1")) == values
+
+
+def test_small_values_stay_in_one_document(firestore_db):
+    asyncio.run(cache.aset_cache("small", {"a": 1}))
+    assert firestore_db.docs[("ns_insight_cache", "small")]["value"] == {"a": 1}
+    assert asyncio.run(cache.aget_cache("small")) == {"a": 1}
+
+
+def test_many_keys_cost_one_read_and_one_write(firestore_db):
+    values = {f"entries_day_2026-01-{day:02d}": {"day": day} for day in range(1, 31)}
+    asyncio.run(cache.aset_many(values, user_id="u1"))
+    # One read checks for chunked values being replaced
+    assert firestore_db.commits == firestore_db.get_all_calls == 1
+
+    loaded = asyncio.run(cache.aget_many([*values, "missing"], user_id="u1"))
+    assert firestore_db.get_all_calls == 2
+    assert loaded == {**values, "missing": None}
+
+
+def test_async_api_uses_the_async_client(monkeypatch):
+    db = FakeFirestore()
+    async_db = FakeAsyncFirestore(db.docs)
+    monkeypatch.setattr(cache, "backend", FirestoreBackend(db, async_client_factory=lambda: async_db))
+    monkeypatch.setattr(cache, "memory_cache", None)
+    monkeypatch.setattr(settings, "CACHE_CHUNK_SIZE", 1024)
+    values = {"small": {"a": 1}, "large": [{"i": i, "note": f"treatment {i}" * 3} for i in range(2000)]}
+
+    async def scenario():
+        await cache.aset_many(values, user_id="u1")
+        await cache.aset_cache("global", [1, 2])
+        return await cache.aget_many([*values, "missing"], user_id="u1"), await cache.aget_cache("global")
+
+    loaded, global_value = asyncio.run(scenario())
+    assert loaded == {**values, "missing": None}
+    assert global_value == [1, 2]
+    # Everything went through the async client, and the sync client reads the same documents
+    assert db.reads == db.writes == db.get_all_calls == 0
+    # Chunk checks of the two writes, then the two reads plus the chunks of the large value
+    assert async_db.get_all_calls == 5
+    assert asyncio.run(cache.aget_many(list(values), user_id="u1")) == values
+
+
+def test_sqlite_backend_round_trips_values(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    backend.set_many({"a": {"payload": b"\x01\x02", "complete": True}, "b": [1, 2.5, None]}, user_id="u1")
+    backend.set("a", "global")
+    assert backend.get_many(["a", "b", "c"], user_id="u1") == {
+        "a": {"payload": b"\x01\x02", "complete": True}, "b": [1, 2.5, None], "c": None,
+    }
+    assert backend.get("a") == "global"
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.core import cache
+from app.core.cache_backends import FirestoreBackend, MemoryBackend
+from app.core.cache_metrics import CacheMetrics, key_family
+from app.core.config import settings
+from app.core.memory_cache import MemoryCache
+from app.tests.fake_firestore import FakeFirestore
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = CacheMetrics()
+    monkeypatch.setattr(cache, "cache_metrics", metrics)
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    monkeypatch.setattr(cache, "memory_cache", MemoryCache(max_bytes=1 << 20, default_ttl=60))
+    return metrics
+
+
+def test_keys_are_grouped_by_prefix():
+    assert key_family("entries_day_2026-01-29") == "entries"
+    assert key_family("insights") == "insights"
+
+
+def test_lookups_are_recorded_per_family_and_tier(metrics):
+    asyncio.run(cache.aset_cache("entries_day_2026-01-01", {"items": [1, 2, 3]}, user_id="u1"))
+    cache.memory_cache.set("entries_day_2026-01-02", {"items": []}, user_id="u1", ttl=-1)
+    cache.invalidate_cache("entries_day_2026-01-01", user_id="u1")
+
+    asyncio.run(cache.aget_many(
+        ["entries_day_2026-01-01", "entries_day_2026-01-02", "entries_day_2026-01-03"], user_id="u1"
+    ))
+    asyncio.run(cache.aget_cache("entries_day_2026-01-01", user_id="u1"))
+
+    entries = metrics.stats()["entries"]
+    assert entries["hits"] == 2
+    assert entries["misses"]["absent"] == 2
+    memory = entries["tiers"]["memory"]
+    assert memory["hits"] == 1
+    assert memory["misses"] == {"absent": 2, "expired": 1}
+    assert memory["writes"] == 2  # aset_cache, then the backend hit copied back in
+    backend = entries["tiers"]["backend"]
+    assert backend["hits"] == 1 and backend["misses"]["absent"] == 2
+    assert backend["writes"] == 1 and backend["bytes_written"] == backend["bytes_read"] > 0
+    assert backend["read_latency"]["count"] == 1
+
+
+def test_undecodable_buckets_count_as_decode_errors(metrics):
+    day = date(2026, 1, 1)
+    bucket = {"payload": b"\x63", "codec": 99, "complete": True}
+    asyncio.run(cache.aset_cache(cache.day_bucket_key("entries", day), bucket))
+
+    assert asyncio.run(cache.aget_day_buckets("entries", [day])) == {day: None}
+    entries = metrics.stats()["entries"]
+    assert entries["hits"] == 0
+    assert entries["misses"]["decode_error"] == 1
+
+
+def test_sizes_are_the_memory_tier_accounting(metrics):
+    asyncio.run(cache.aset_cache("insights_2026-01", {"mean": 120.5, "days": list(range(31))}))
+    memory = metrics.stats()["insights"]["tiers"]["memory"]
+    assert memory["estimated_size_written"] == cache.memory_cache.stats()["bytes"]
+    assert memory["bytes_written"] == 0
+
+
+def test_backend_bytes_are_the_stored_payload_lengths(metrics, monkeypatch):
+    # Also tracked without a memory tier
+    monkeypatch.setattr(cache, "memory_cache", None)
+    value = {"days": {"2026-01-01": {"mean": 120.5}}, "payload": b"\x01" * 100}
+    asyncio.run(cache.aset_cache("summaries_month_2026-01", value, user_id="u1"))
+    assert asyncio.run(cache.aget_cache("summaries_month_2026-01", user_id="u1")) == value
+
+    backend = metrics.stats()["summaries"]["tiers"]["backend"]
+    stored = cache.backend._values[("u1", "summaries_month_2026-01")]
+    assert backend["bytes_written"] == backend["bytes_read"] == len(stored)
+    assert backend["estimated_size_written"] == 0
+
+
+def test_firestore_bytes_are_document_sizes(monkeypatch):
+    metrics = CacheMetrics()
+    monkeypatch.setattr(cache, "cache_metrics", metrics)
+    monkeypatch.setattr(cache, "backend", FirestoreBackend(FakeFirestore()))
+    monkeypatch.setattr(cache, "memory_cache", None)
+    monkeypatch.setattr(settings, "CACHE_CHUNK_SIZE", 1024)
+    asyncio.run(cache.aset_many({"small": {"a": "xy", "b": 1}, "large": ["glucose " * 1000]}, user_id="u1"))
+    asyncio.run(cache.aget_many(["small", "large"], user_id="u1"))
+
+    small = metrics.stats()["small"]["tiers"]["backend"]
+    assert small["bytes_written"] == small["bytes_read"] == (2 + 3) + (2 + 8)
+    large = metrics.stats()["large"]["tiers"]["backend"]
+    assert 0 < large["bytes_written"] == large["bytes_read"] < 1024
@@ -0,0 +1,102 @@
+import asyncio
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+# Mock firebase_admin BEFORE importing the user and activity services
+sys.modules["firebase_admin"] = MagicMock()
+sys.modules["firebase_admin.firestore"] = MagicMock()
+
+import pytest  # noqa: E402
+
+from app.core import cache  # noqa: E402
+from app.core.cache_backends import MemoryBackend  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.models.schemas import UserResponse, UserRole, UserSettings  # noqa: E402
+from app.services import cache_warmer, nightscout_health  # noqa: E402
+
+NOW = datetime(2026, 3, 10, 4, 0, tzinfo=timezone.utc)
+
+
+def make_user(uid, url="https://a.example.com?token=t", role=UserRole.USER, last_login=NOW, tz="UTC"):
+    return UserResponse(
+        uid=uid, email=f"{uid}@example.com", role=role, last_login=last_login,
+        settings=UserSettings(nightscout_url=url, timezone=tz)
+    )
+
+
+@pytest.fixture
+def warmed(monkeypatch):
+    """Record the warmed (uid, first day, last day) and how many ran at once."""
+    calls = []
+    running = {"now": 0, "max": 0}
+
+    async def get_period_summary(start_date, end_date, nightscout_url=None, api_token=None, user_id=None):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0)
+        calls.append((user_id, start_date, end_date))
+        running["now"] -= 1
+        return None
+
+    monkeypatch.setattr(cache_warmer, "get_period_summary", get_period_summary)
+    monkeypatch.setattr(cache_warmer.activity_logging, "get_recently_active_uids", lambda since: {"session-only"})
+    monkeypatch.setattr(nightscout_health, "_hosts", {})
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    monkeypatch.setattr(settings, "CACHE_WARMER_HOST_DELAY", 0)
+    monkeypatch.setattr(settings, "CACHE_WARMER_CONCURRENCY", 2)
+    return calls, running
+
+
+def test_only_active_users_with_a_token_are_warmed(monkeypatch, warmed):
+    calls, _ = warmed
+    long_ago = NOW - timedelta(days=settings.CACHE_WARMER_ACTIVE_DAYS + 1)
+    users = [
+        make_user("active", tz="Pacific/Auckland"),
+        make_user("session-only", last_login=long_ago),
+        make_user("inactive", last_login=long_ago),
+        make_user("pending", role=UserRole.PENDING),
+        make_user("no-token", url="https://a.example.com"),
+    ]
+    monkeypatch.setattr(cache_warmer.UserService, "list_users", lambda: users)
+
+    stats = asyncio.run(cache_warmer.warm_caches(NOW))
+
+    assert stats == {"users": 2, "warmed": 2, "failed": 0, "skipped": 0, "leased": 0}
+    # Users on the same host are warmed one after the other, in local days
+    assert calls == [
+        ("active", date(2026, 3, 9), date(2026, 3, 10)),
+        ("session-only", date(2026, 3, 9), date(2026, 3, 10)),
+    ]
+
+
+def test_hosts_are_warmed_concurrently_and_open_breakers_skipped(monkeypatch, warmed):
+    calls, running = warmed
+    users = [make_user(f"u{i}", url=f"https://h{i % 3}.example.com?token=t") for i in range(6)]
+    monkeypatch.setattr(cache_warmer.UserService, "list_users", lambda: users)
+    nightscout_health.get_host_health("https://h2.example.com").state = nightscout_health.OPEN
+
+    stats = asyncio.run(cache_warmer.warm_caches(NOW))
+
+    assert stats == {"users": 6, "warmed": 4, "failed": 0, "skipped": 2, "leased": 0}
+    assert running["max"] == 2
+    assert {uid for uid, _, _ in calls} == {"u0", "u1", "u3", "u4"}
+
+
+def test_users_leased_by_another_instance_are_left_to_it(monkeypatch, warmed):
+    calls, _ = warmed
+    users = [make_user("mine"), make_user("theirs", url="https://b.example.com?token=t")]
+    monkeypatch.setattr(cache_warmer.UserService, "list_users", lambda: users)
+    cache.backend.set(cache_warmer.lease_key("theirs"), {"owner": "other-instance", "expires_at": time.time() + 60})
+
+    stats = asyncio.run(cache_warmer.warm_caches(NOW))
+
+    assert stats["warmed"] == 1 and stats["leased"] == 1
+    assert [uid for uid, _, _ in calls] == ["mine"]
+    assert cache.backend.get(cache_warmer.lease_key("mine"))["owner"] == cache_warmer.INSTANCE_ID
+
+    # A second run on this instance within the interval keeps its own leases
+    calls.clear()
+    asyncio.run(cache_warmer.warm_caches(NOW))
+    assert [uid for uid, _, _ in calls] == ["mine"]
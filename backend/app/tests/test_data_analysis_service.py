@@ -0,0 +1,148 @@
+import asyncio
+import math
+import random
+import statistics
+from contextlib import aclosing
+from datetime import date, datetime
+
+import pytest
+
+from app.models.glucose_series import GlucoseSeries
+from app.models.treatment import Treatment
+from app.services import data_analysis_service
+from app.services.data_analysis_service import DayData, merge_summaries
+from app.tests.test_glucose_series import make_record
+
+
+def make_day(sgv_values, day=1, treatments=()):
+    records = [make_record(i, sgv=sgv) for i, sgv in enumerate(sgv_values)]
+    return DayData(date=datetime(2026, 1, day), entries=GlucoseSeries.from_records(records), treatments=treatments)
+
+
+@pytest.mark.parametrize("use_mmol", [False, True])
+def test_numpy_and_python_engines_give_identical_insights(monkeypatch, use_mmol):
+    pytest.importorskip("numpy")
+    rng = random.Random(7)
+    for values in ([120], [100, 140], [rng.randint(39, 400) for _ in range(288 * 7)]):
+        day = make_day(values)
+        vectorized = day.calculate_entry_insights(use_mmol=use_mmol)
+        with monkeypatch.context() as patch:
+            patch.setattr(data_analysis_service, "np", None)
+            python = day.calculate_entry_insights(use_mmol=use_mmol)
+        assert vectorized == python
+        assert {name: type(value) for name, value in vars(vectorized).items()} == \
+            {name: type(value) for name, value in vars(python).items()}
+
+
+def test_statistics_match_the_statistics_module():
+    values = [random.Random(3).randint(39, 400) for _ in range(500)] + [69, 70, 140, 141, 180, 181]
+    insights = make_day(values).calculate_entry_insights()
+    assert insights.mean == round(statistics.mean(values), 1)
+    assert insights.median == round(statistics.median(values), 1)
+    assert insights.standard_deviation == round(statistics.stdev(values), 1)
+    assert insights.tir_minutes == 5 * sum(70 <= v <= 180 for v in values)
+    assert insights.titr_minutes == 5 * sum(70 <= v <= 140 for v in values)
+    assert insights.tbr_minutes == 5 * sum(v < 70 for v in values)
+    assert insights.tar_minutes == 5 * sum(v > 180 for v in values)
+
+
+def test_no_readings_give_no_insights():
+    assert make_day([None, None]).calculate_entry_insights() is None
+
+
+@pytest.mark.parametrize("numpy_available", [True, False])
+def test_merged_daily_summaries_match_analysing_the_whole_period(monkeypatch, numpy_available):
+    if numpy_available:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(data_analysis_service, "np", None)
+    rng = random.Random(11)
+    days = [[rng.randint(39, 400) for _ in range(rng.randint(200, 288))] for _ in range(14)]
+    days[3] = []  # a day without readings
+    treatments = [
+        Treatment(_id=f"t{day}", eventType="Meal Bolus", created_at=f"2026-01-{day:02d}T12:00:00Z", insulin=4.5, carbs=40)
+        for day in range(1, 15)
+    ] + [Treatment(_id="site", eventType="Site Change", created_at="2026-01-05T08:00:00Z")]
+
+    summaries = [
+        make_day(values, day=i + 1, treatments=[t for t in treatments if t.created_at.startswith(f"2026-01-{i + 1:02d}")])
+        .summarize()
+        for i, values in enumerate(days)
+    ]
+    period = merge_summaries(summaries)
+    whole = make_day([value for values in days for value in values], treatments=treatments)
+
+    assert (period.start.day, period.end.day, period.days) == (1, 14, 14)
+    assert period.entry_insights() == whole.calculate_entry_insights()
+    assert period.entry_insights(use_mmol=True) == whole.calculate_entry_insights(use_mmol=True)
+    assert period.treatment_insights() == whole.calculate_treatment_insights()
+    readings = sorted(whole.get_glucose_values())
+    assert period.quantile(0.05) == readings[math.ceil(0.05 * len(readings)) - 1]
+    assert summaries[0].merge(summaries[1]) == merge_summaries(summaries[:2])
+
+
+def test_empty_periods_have_no_entry_insights():
+    summary = make_day([]).summarize()
+    assert summary.entry_insights() is None
+    assert summary.quantile(0.5) is None
+    assert merge_summaries([]) is None
+
+
+@pytest.fixture
+def day_loads(monkeypatch):
+    """Replace the Nightscout loads of get_days_data with controllable fakes."""
+    state = {"running": 0, "max_running": 0, "failing": set(), "started": [], "cancelled": [], "delay": 0.01}
+
+    async def prefetch_nightscout_range(from_date, to_date, **kwargs):
+        pass
+
+    async def get_day_data(date, nightscout_url=None, api_token=None, user_id=None):
+        state["started"].append(date.day)
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        try:
+            await asyncio.sleep(state["delay"] * date.day)
+            if date.day in state["failing"]:
+                raise RuntimeError("broken day")
+            day_data = make_day([100 + date.day])
+            day_data.date = date
+            return day_data
+        except asyncio.CancelledError:
+            state["cancelled"].append(date.day)
+            raise
+        finally:
+            state["running"] -= 1
+
+    monkeypatch.setattr(data_analysis_service, "prefetch_nightscout_range", prefetch_nightscout_range)
+    monkeypatch.setattr(data_analysis_service, "get_day_data", get_day_data)
+    monkeypatch.setattr(data_analysis_service.settings, "NIGHTSCOUT_MAX_CONCURRENT_LOADS_PER_HOST", 2)
+    return state
+
+
+def test_days_are_loaded_concurrently_under_the_host_limit(day_loads):
+    loaded = asyncio.run(data_analysis_service.get_days_data(datetime(2026, 1, 1), datetime(2026, 1, 6)))
+    assert list(loaded) == [date(2026, 1, day) for day in range(1, 7)]
+    assert day_loads["max_running"] == 2
+
+
+def test_failing_days_are_left_out_of_the_result(day_loads):
+    day_loads["failing"] = {2, 4}
+    loaded = asyncio.run(data_analysis_service.get_days_data(datetime(2026, 1, 1), datetime(2026, 1, 5)))
+    assert list(loaded) == [date(2026, 1, 1), date(2026, 1, 3), date(2026, 1, 5)]
+
+
+def test_pending_loads_are_cancelled_when_the_consumer_stops(day_loads):
+    async def first_day():
+        days = [date(2026, 1, day) for day in range(1, 6)]
+        async with aclosing(data_analysis_service._iter_days_data(days)) as days_data:
+            async for day, _ in days_data:
+                break
+        # Give loads left running the time to finish
+        await asyncio.sleep(0.1)
+        return day
+
+    assert asyncio.run(first_day()) == date(2026, 1, 1)
+    # Every other load that had started was cancelled, the rest never started
+    assert day_loads["cancelled"] == day_loads["started"][1:]
+    assert 5 not in day_loads["started"]
+    assert day_loads["running"] == 0
@@ -0,0 +1,58 @@
+from app.models import glucose_series
+from app.models.entry import Entry
+from app.models.glucose_series import OTHER_CODE, GlucoseSeries, canonical_date_string
+
+BASE_MS = 1767225600000  # 2026-01-01T00:00:00Z
+
+
+def make_record(i: int, **overrides) -> dict:
+    date_ms = BASE_MS + i * 5 * 60 * 1000
+    record = {
+        "_id": f"id{i}",
+        "type": "sgv",
+        "date": date_ms,
+        "dateString": canonical_date_string(date_ms),
+        "sysTime": canonical_date_string(date_ms),
+        "sgv": 100 + i,
+        "trend": 4,
+        "direction": "Flat",
+        "device": "xDrip-DexcomG6",
+        "utcOffset": 60,
+        "cached_at": "2026-01-02T00:00:00",
+    }
+    record.update(overrides)
+    return record
+
+
+def test_materialized_entries_match_validated_entries():
+    records = [
+        make_record(0),
+        make_record(1, sgv=None, trend=None, direction=None, type="mbg"),
+        make_record(2, dateString="2026-01-01T01:10:00+01:00", direction="SomethingNew"),
+    ]
+    series = GlucoseSeries.from_records(records)
+
+    assert len(series) == 3
+    assert [e.model_dump() for e in series] == [Entry.model_validate(r).model_dump() for r in records]
+    assert series[-1].dateString == "2026-01-01T01:10:00+01:00"
+    assert series.to_records() == records
+
+
+def test_sgv_values_skip_missing_readings():
+    series = GlucoseSeries.from_entries(
+        Entry.model_validate(make_record(i, sgv=None if i % 2 else 120)) for i in range(4)
+    )
+    assert series.sgv_values() == [120, 120]
+
+
+def test_values_beyond_the_code_tables_round_trip(monkeypatch):
+    monkeypatch.setattr(glucose_series, "DIRECTIONS", list(glucose_series.DIRECTIONS))
+    monkeypatch.setattr(glucose_series, "_DIRECTION_CODES", dict(glucose_series._DIRECTION_CODES))
+    records = [
+        make_record(i, direction=f"direction {i}", device=f"device {i}", type=f"type {i}") for i in range(300)
+    ]
+    series = GlucoseSeries.from_records(records)
+
+    assert series.to_records() == records
+    assert series.device_codes[-1] == series.type_codes[-1] == series.direction_codes[-1] == OTHER_CODE
+    assert series[-1].direction == "direction 299"
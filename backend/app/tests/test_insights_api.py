@@ -0,0 +1,96 @@
+import json
+import sys
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+# Mock firebase_admin BEFORE importing the app
+sys.modules["firebase_admin"] = MagicMock()
+sys.modules["firebase_admin.auth"] = MagicMock()
+sys.modules["firebase_admin.firestore"] = MagicMock()
+
+import pytest  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api import insights  # noqa: E402
+from app.core.auth import get_active_user  # noqa: E402
+from app.models.schemas import GlucoseUnit, UserResponse, UserRole, UserSettings  # noqa: E402
+from app.services.data_analysis_service import merge_summaries  # noqa: E402
+from app.tests.test_data_analysis_service import make_day  # noqa: E402
+
+FIRST = date(2026, 1, 10)
+
+app = FastAPI()
+app.include_router(insights.router, prefix="/insights")
+
+
+def make_summary(day: date, sgv_values):
+    summary = make_day(sgv_values).summarize()
+    summary.start = summary.end = day
+    return summary
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A client for a signed-in user whose days are served in reverse order."""
+    summaries = [make_summary(FIRST + timedelta(days=i), [90 + 10 * i, 200, 60]) for i in range(3)]
+    calls = []
+
+    async def iter_day_summaries(start_date, end_date, nightscout_url=None, api_token=None, user_id=None):
+        calls.append((start_date, end_date, nightscout_url, api_token, user_id))
+        for summary in reversed(summaries):
+            yield summary
+
+    user = UserResponse(uid="u1", email="u1@example.com", role=UserRole.USER)
+    monkeypatch.setattr(insights, "iter_day_summaries", iter_day_summaries)
+    monkeypatch.setattr(
+        insights.UserService, "get_user_settings",
+        lambda uid: UserSettings(nightscout_url="https://ns.example.com?token=t", glucose_unit=GlucoseUnit.MMOL)
+    )
+    app.dependency_overrides[get_active_user] = lambda: user
+    yield TestClient(app), summaries, calls
+    app.dependency_overrides.clear()
+
+
+def test_days_are_streamed_as_they_finish_then_summarized(client):
+    test_client, summaries, calls = client
+
+    response = test_client.get("/insights/range", params={"from_date": "2026-01-10", "to_date": "2026-01-12"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["type"] for record in records] == ["day", "day", "day", "summary"]
+    assert [record["date"] for record in records[:3]] == ["2026-01-12", "2026-01-11", "2026-01-10"]
+    assert calls == [(FIRST, date(2026, 1, 12), "https://ns.example.com", "t", "u1")]
+
+    summary = records[-1]
+    expected = merge_summaries(summaries).entry_insights(use_mmol=True)
+    assert summary["from_date"] == "2026-01-10" and summary["days"] == 3
+    assert summary["entries"]["mean"] == expected.mean
+    assert summary["treatments"]["total_carbs"] == 0
+
+
+def test_invalid_ranges_are_rejected(client):
+    test_client, _, calls = client
+
+    backwards = test_client.get("/insights/range", params={"from_date": "2026-01-12", "to_date": "2026-01-10"})
+    too_long = test_client.get("/insights/range", params={"from_date": "2025-01-01", "to_date": "2026-01-10"})
+
+    assert backwards.status_code == too_long.status_code == 400
+    assert calls == []
+
+
+def test_failures_end_the_stream_with_an_error_record(client, monkeypatch):
+    test_client, summaries, _ = client
+
+    async def iter_day_summaries(start_date, end_date, **kwargs):
+        yield summaries[0]
+        raise RuntimeError("Nightscout is down")
+
+    monkeypatch.setattr(insights, "iter_day_summaries", iter_day_summaries)
+
+    response = test_client.get("/insights/range", params={"from_date": "2026-01-10", "to_date": "2026-01-12"})
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["type"] for record in records] == ["day", "error"]
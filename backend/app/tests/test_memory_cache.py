@@ -0,0 +1,25 @@
+
+from app.core.memory_cache import MemoryCache, estimate_size
+
+
+def test_lru_eviction_is_bounded_by_bytes():
+    value = {"items": list(range(100))}
+    cache = MemoryCache(max_bytes=estimate_size(value) * 2, default_ttl=60)
+    cache.set("a", value, user_id="u1")
+    cache.set("b", value, user_id="u1")
+    assert cache.get("a", user_id="u1") is value  # "a" is now most recently used
+    cache.set("c", value, user_id="u2")
+    assert cache.get("b", user_id="u1") is None
+    assert cache.get("a", user_id="u1") is value
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_ttl_and_user_invalidation():
+    cache = MemoryCache(max_bytes=1 << 20, default_ttl=60)
+    cache.set("expired", 1, ttl=-1)
+    cache.set("a", 1, user_id="u1")
+    cache.set("a", 2, user_id="u2")
+    assert cache.get("expired") is None
+    cache.invalidate_user("u1")
+    assert cache.get("a", user_id="u1") is None
+    assert cache.get("a", user_id="u2") == 2
@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import nightscout_client, nightscout_health
+
+URL = "https://ns.example.com/api/v1/entries.json"
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Serve requests from a mock transport and record the client of each request."""
+    clients = []
+
+    class MockClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(self.handle), **kwargs)
+
+        def handle(self, request):
+            clients.append(self)
+            if request.url.path.endswith(".html"):
+                return httpx.Response(200, text="<html>Bad gateway</html>")
+            return httpx.Response(200, json=[{"host": request.url.host}])
+
+    monkeypatch.setattr(nightscout_client.httpx, "AsyncClient", MockClient)
+    monkeypatch.setattr(nightscout_client, "_clients", {})
+    monkeypatch.setattr(nightscout_client, "_host_semaphores", {})
+    monkeypatch.setattr(nightscout_client, "_clients_loop", None)
+    monkeypatch.setattr(nightscout_health, "_hosts", {})
+    return clients
+
+
+def test_requests_to_a_host_reuse_its_pooled_client(connections):
+    async def scenario():
+        await nightscout_client.get_json(URL)
+        await nightscout_client.get_json(URL + "?count=10")
+        await nightscout_client.get_json("HTTPS://NS.example.com/api/v1/treatments.json")
+        assert await nightscout_client.get_json("https://other.example.com/api/v1/entries.json") == [
+            {"host": "other.example.com"}
+        ]
+        return dict(nightscout_client._clients)
+
+    clients = asyncio.run(scenario())
+    assert set(clients) == {"https://ns.example.com", "https://other.example.com"}
+    first, second, third, other = connections
+    assert first is second is third is clients["https://ns.example.com"]
+    assert other is clients["https://other.example.com"]
+
+
+def test_closed_clients_are_replaced(connections):
+    async def scenario():
+        client = nightscout_client.get_client(URL)
+        await client.aclose()
+        assert nightscout_client.get_client(URL) is not client
+        await nightscout_client.get_json(URL)
+        assert not connections[0].is_closed
+
+    asyncio.run(scenario())
+
+
+def test_clients_and_semaphores_are_rebound_to_a_new_event_loop(connections):
+    async def scenario():
+        await nightscout_client.get_json(URL)
+        return nightscout_client.get_client(URL), nightscout_client.get_host_semaphore(URL)
+
+    client, semaphore = asyncio.run(scenario())
+    new_client, new_semaphore = asyncio.run(scenario())
+    assert new_client is not client and new_semaphore is not semaphore
+    assert connections == [client, new_client]
+
+
+
+def test_close_clients_closes_every_pooled_client(connections):
+    async def scenario():
+        clients = [nightscout_client.get_client(URL), nightscout_client.get_client("https://other.example.com")]
+        await nightscout_client.close_clients()
+        return clients
+
+    clients = asyncio.run(scenario())
+    assert all(client.is_closed for client in clients)
+    assert nightscout_client._clients == {} and nightscout_client._host_semaphores == {}
+
+
+def test_non_json_bodies_raise_a_decoding_error(connections):
+    with pytest.raises(httpx.DecodingError):
+        asyncio.run(nightscout_client.get_json("https://ns.example.com/error.html"))
+    assert len(connections) == 1
@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import nightscout_client, nightscout_health
+
+URL = "https://down.example.com/api/v1/entries.json"
+
+
+@pytest.fixture
+def failing_host(monkeypatch):
+    """Make every request to the host fail with a connect error."""
+    calls = []
+
+    async def get(url, params=None, timeout=None, headers=None):
+        calls.append(url)
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(nightscout_client, "get", get)
+    monkeypatch.setattr(nightscout_health, "_hosts", {})
+    monkeypatch.setattr(nightscout_health, "retry_budget", nightscout_health.RetryBudget(0.1, 20))
+    monkeypatch.setattr(nightscout_client, "retry_budget", nightscout_health.retry_budget)
+    monkeypatch.setattr(settings, "NIGHTSCOUT_RETRY_BACKOFF_BASE", 0)
+    return calls
+
+
+def test_failures_are_retried_then_open_the_breaker(failing_host):
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(nightscout_client.get_json(URL))
+    assert len(failing_host) == 1 + settings.NIGHTSCOUT_MAX_RETRIES
+
+    for _ in range(settings.NIGHTSCOUT_BREAKER_FAILURE_THRESHOLD):
+        with pytest.raises(httpx.TransportError):
+            asyncio.run(nightscout_client.get_json(URL))
+
+    health = nightscout_health.get_host_health("https://down.example.com")
+    assert health.state == nightscout_health.OPEN
+    attempts = len(failing_host)
+    with pytest.raises(nightscout_health.NightscoutUnavailableError):
+        asyncio.run(nightscout_client.get_json(URL))
+    assert len(failing_host) == attempts
+
+
+def test_adaptive_timeout_follows_latency():
+    health = nightscout_health.HostHealth("https://ns.example.com")
+    assert health.read_timeout() == settings.NIGHTSCOUT_READ_TIMEOUT
+    for _ in range(settings.NIGHTSCOUT_ADAPTIVE_TIMEOUT_MIN_SAMPLES):
+        health.record_success(1.0)
+    assert health.read_timeout() == min(settings.NIGHTSCOUT_READ_TIMEOUT, settings.NIGHTSCOUT_ADAPTIVE_TIMEOUT_MULTIPLIER)
+
+
+def test_a_cancelled_probe_lets_the_next_request_probe(monkeypatch):
+    monkeypatch.setattr(nightscout_health, "_hosts", {})
+    health = nightscout_health.get_host_health("https://down.example.com")
+    health.state = nightscout_health.OPEN
+    health.opened_at = -settings.NIGHTSCOUT_BREAKER_COOLDOWN
+
+    async def hanging_get(url, params=None, timeout=None, headers=None):
+        await asyncio.sleep(60)
+
+    async def cancel_probe():
+        probe = asyncio.create_task(nightscout_client.get_json(URL))
+        await asyncio.sleep(0)
+        assert health.state == nightscout_health.HALF_OPEN and health.probe_in_flight
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    monkeypatch.setattr(nightscout_client, "get", hanging_get)
+    asyncio.run(cancel_probe())
+    assert not health.probe_in_flight
+
+    async def get(url, params=None, timeout=None, headers=None):
+        return httpx.Response(200, json=[], request=httpx.Request("GET", url))
+
+    monkeypatch.setattr(nightscout_client, "get", get)
+    assert asyncio.run(nightscout_client.get_json(URL)) == []
+    assert health.state == nightscout_health.CLOSED
+
+
+def test_non_json_bodies_raise_a_decoding_error(monkeypatch):
+    monkeypatch.setattr(nightscout_health, "_hosts", {})
+
+    async def get(url, params=None, timeout=None, headers=None):
+        return httpx.Response(200, text="<html>Bad gateway</html>", request=httpx.Request("GET", url))
+
+    monkeypatch.setattr(nightscout_client, "get", get)
+    with pytest.raises(httpx.DecodingError):
+        asyncio.run(nightscout_client.get_json(URL))
+    assert nightscout_health.get_host_health("https://down.example.com").total_failures == 1
@@ -0,0 +1,333 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.core import cache
+from app.core.config import settings
+from app.services import nightscout_client, nightscout_service, nightscout_v3
+
+DAY_MS = 24 * 60 * 60 * 1000
+START_MS = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+SITE = cache.site_scope("https://ns.example.com")
+
+
+def make_entry(ms: int, sgv: int = 120) -> dict:
+    return {
+        "_id": f"id{ms}",
+        "type": "sgv",
+        "date": ms,
+        "dateString": datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat(),
+        "sgv": sgv,
+        "direction": "Flat",
+        "device": "test",
+        "utcOffset": 0,
+        "sysTime": datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat(),
+    }
+
+
+@pytest.fixture
+def fake_nightscout(monkeypatch):
+    """Serve 10 days of 5-minute entries and keep the cache in a dict."""
+    store = {}
+    calls = []
+    entries = [make_entry(START_MS + i * 5 * 60 * 1000) for i in range(10 * 288)]
+
+    async def get_json(url, params=None, timeout=None):
+        calls.append(params)
+        await asyncio.sleep(0)
+        if url.endswith("/treatments.json"):
+            return []
+        checks = {
+            "find[date][$gt]": lambda v, p: v > p,
+            "find[date][$gte]": lambda v, p: v >= p,
+            "find[date][$lt]": lambda v, p: v < p,
+            "find[date][$lte]": lambda v, p: v <= p,
+        }
+        result = [
+            dict(e) for e in sorted(entries, key=lambda e: e["date"], reverse=True)
+            if all(check(e["date"], params[key]) for key, check in checks.items() if key in params)
+        ]
+        return result[:params["count"]] if params["count"] else result
+
+    monkeypatch.setattr(nightscout_client, "get_json", get_json)
+    monkeypatch.setattr(settings, "NIGHTSCOUT_API_VERSION", "v1")
+    async def aget_many(keys, user_id=None):
+        return {key: store.get((user_id, key)) for key in keys}
+
+    async def aset_many(values, user_id=None):
+        store.update({(user_id, key): value for key, value in values.items()})
+
+    monkeypatch.setattr(cache, "aget_many", aget_many)
+    monkeypatch.setattr(cache, "aset_many", aset_many)
+    return calls, store, entries
+
+
+def fetch(from_date: str, to_date: str, count: int = 0):
+    return asyncio.run(nightscout_service.get_nightscout_entries(
+        nightscout_url="https://ns.example.com",
+        api_token="token",
+        from_date=from_date,
+        to_date=to_date,
+        count=count,
+        user_id="user-1",
+    ))
+
+
+def test_overlapping_ranges_only_fetch_missing_days(fake_nightscout):
+    calls, store, _ = fake_nightscout
+
+    first = fetch("2026-01-02T00:00:00+00:00", "2026-01-04T23:59:59+00:00")
+    assert len(first) == 3 * 288
+    assert len(calls) == 1
+    assert store[("user-1", f"entries_day_2026-01-03_{SITE}")]["schema"] == nightscout_service.BUCKET_SCHEMA_VERSION
+
+    # Sliding the window by one day only fetches the new day
+    second = fetch("2026-01-03T00:00:00+00:00", "2026-01-05T23:59:59+00:00")
+    assert len(second) == 3 * 288
+    assert len(calls) == 2
+    assert calls[-1]["find[date][$gte]"] == START_MS + 4 * DAY_MS
+    assert calls[-1]["find[date][$lte]"] == START_MS + 5 * DAY_MS - 1
+
+    # A range fully covered by buckets needs no remote request
+    third = fetch("2026-01-02T12:00:00+00:00", "2026-01-05T12:00:00+00:00")
+    assert len(calls) == 2
+    assert third[0].date == START_MS + 4 * DAY_MS + 12 * 60 * 60 * 1000
+    assert third[-1].date == START_MS + DAY_MS + 12 * 60 * 60 * 1000
+
+
+def test_count_limits_to_newest_entries(fake_nightscout):
+    entries = fetch("2026-01-02T00:00:00+00:00", "2026-01-02T23:59:59+00:00", count=3)
+    assert [e.date for e in entries] == sorted((e.date for e in entries), reverse=True)
+    assert len(entries) == 3
+    assert entries[0].date == START_MS + 2 * DAY_MS - 5 * 60 * 1000
+
+
+def test_today_is_refreshed_with_delta_request(fake_nightscout, monkeypatch):
+    calls, store, entries = fake_nightscout
+    monkeypatch.setattr(settings, "CACHE_OPEN_DAY_TTL", 0)
+    monkeypatch.setattr(settings, "CACHE_OPEN_DAY_MAX_STALE", 0)
+    now = datetime.now(timezone.utc)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    entries[:] = [make_entry(int((today_start + timedelta(minutes=m)).timestamp() * 1000)) for m in range(0, 10, 5)]
+
+    from_date = today_start.isoformat()
+    to_date = (today_start + timedelta(days=1)).isoformat()
+    assert len(fetch(from_date, to_date)) == 2
+    bucket = store[("user-1", f"entries_day_{today_start.date().isoformat()}_{SITE}")]
+    assert bucket["complete"] is False
+    assert bucket["watermark"]["date"] == entries[-1]["date"]
+
+    new_ms = entries[-1]["date"] + 5 * 60 * 1000
+    entries.append(make_entry(new_ms))
+    refreshed = fetch(from_date, to_date)
+    assert len(refreshed) == 3
+    assert refreshed[0].date == new_ms
+    assert calls[-1] == {"token": "token", "count": 0, "find[date][$gt]": entries[1]["date"]}
+
+
+def test_stale_today_is_served_and_refreshed_in_background(fake_nightscout, monkeypatch):
+    calls, store, entries = fake_nightscout
+    now = datetime.now(timezone.utc)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    entries[:] = [make_entry(int((today_start + timedelta(minutes=m)).timestamp() * 1000)) for m in range(0, 10, 5)]
+    from_date = today_start.isoformat()
+    to_date = (today_start + timedelta(days=1)).isoformat()
+    bucket_key = ("user-1", f"entries_day_{today_start.date().isoformat()}_{SITE}")
+
+    async def scenario():
+        async def fetch_async():
+            return await nightscout_service.get_nightscout_entries(
+                nightscout_url="https://ns.example.com", api_token="token",
+                from_date=from_date, to_date=to_date, user_id="user-1",
+            )
+
+        assert len(await fetch_async()) == 2
+        requests = len(calls)
+
+        # Fresh: served from the cache without a request
+        entries.append(make_entry(entries[-1]["date"] + 5 * 60 * 1000))
+        assert len(await fetch_async()) == 2
+        assert len(calls) == requests
+
+        # Stale: served from the cache at once, then refreshed in the background
+        monkeypatch.setattr(settings, "CACHE_OPEN_DAY_TTL", 0)
+        assert len(await fetch_async()) == 2
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert len(calls) == requests + 1
+        assert len(cache._decode_bucket(store[bucket_key])["items"]) == 3
+
+    asyncio.run(scenario())
+
+
+def test_pages_do_not_skip_entries_sharing_a_boundary_date(fake_nightscout, monkeypatch):
+    calls, _, entries = fake_nightscout
+    day_start = START_MS + DAY_MS
+    entries[:] = [make_entry(day_start + i * 60 * 1000) for i in range(10)]
+    duplicate = make_entry(day_start + 4 * 60 * 1000)
+    duplicate["_id"] = "duplicate"
+    entries.append(duplicate)
+
+    async def collect():
+        pages = nightscout_service._iter_entry_pages(
+            "https://ns.example.com", "token",
+            datetime.fromtimestamp(day_start / 1000, tz=timezone.utc),
+            datetime.fromtimestamp((day_start + DAY_MS) / 1000, tz=timezone.utc),
+            page_size=3,
+        )
+        return [entry async for page in pages for entry in page]
+
+    streamed = asyncio.run(collect())
+    assert sorted(e["_id"] for e in streamed) == sorted(e["_id"] for e in entries)
+    assert all(params["count"] == 3 for params in calls)
+
+
+def test_pages_skip_entries_without_a_date(monkeypatch):
+    day_start = START_MS + DAY_MS
+    undated = make_entry(day_start)
+    del undated["date"]
+    pages = [
+        [make_entry(day_start + 2 * 60 * 1000), {**make_entry(day_start), "_id": "null", "date": None}],
+        [undated, make_entry(day_start + 60 * 1000)],
+    ]
+
+    async def get_json(url, params=None, timeout=None):
+        return pages.pop(0) if pages else []
+
+    monkeypatch.setattr(nightscout_client, "get_json", get_json)
+    monkeypatch.setattr(settings, "NIGHTSCOUT_API_VERSION", "v1")
+
+    async def collect():
+        pages = nightscout_service._iter_entry_pages(
+            "https://ns.example.com", "token",
+            datetime.fromtimestamp(day_start / 1000, tz=timezone.utc),
+            datetime.fromtimestamp((day_start + DAY_MS) / 1000, tz=timezone.utc),
+            page_size=2,
+        )
+        return [entry["date"] async for page in pages for entry in page]
+
+    assert asyncio.run(collect()) == [day_start + 2 * 60 * 1000, day_start + 60 * 1000]
+
+
+def test_identical_concurrent_lookups_are_coalesced(fake_nightscout):
+    calls, _, _ = fake_nightscout
+
+    async def fetch_many():
+        return await asyncio.gather(*(
+            nightscout_service.get_nightscout_entries(
+                nightscout_url="https://ns.example.com",
+                api_token="token",
+                from_date="2026-01-02T00:00:00+00:00",
+                to_date="2026-01-02T23:59:59+00:00",
+                user_id="user-1",
+            )
+            for _ in range(3)
+        ))
+
+    results = asyncio.run(fetch_many())
+    assert len(calls) == 1
+    assert all(len(result) == 288 for result in results)
+    assert results[0] is not results[1]
+
+
+def test_v3_sites_are_detected_and_queried_with_projection(fake_nightscout, monkeypatch):
+    _, _, entries = fake_nightscout
+    requests = []
+
+    async def get_json(url, params=None, headers=None):
+        requests.append((url, params, headers))
+        if url.endswith("/api/v3/version"):
+            return {"status": 200, "result": {"apiVersion": "3.0.4"}}
+        if "/api/v2/authorization/request/" in url:
+            return {"token": "jwt", "exp": 4102444800}
+        documents = [
+            {**{k: v for k, v in e.items() if k != "_id"}, "identifier": e["_id"]}
+            for e in reversed(entries)
+            if params["date$gte"] <= e["date"] <= params["date$lte"]
+        ]
+        return {"status": 200, "result": documents[params["skip"]:params["skip"] + params["limit"]]}
+
+    monkeypatch.setattr(nightscout_client, "get_json", get_json)
+    monkeypatch.setattr(settings, "NIGHTSCOUT_API_VERSION", "auto")
+    monkeypatch.setattr(nightscout_v3, "_api_versions", {})
+    monkeypatch.setattr(nightscout_v3, "_jwts", {})
+
+    result = fetch("2026-01-02T00:00:00+00:00", "2026-01-02T23:59:59+00:00")
+    assert len(result) == 288
+    assert result[0].id == f"id{START_MS + 2 * DAY_MS - 5 * 60 * 1000}"
+    url, params, headers = requests[-1]
+    assert url == "https://ns.example.com/api/v3/entries"
+    assert headers == {"Authorization": "Bearer jwt"}
+    assert "identifier" in params["fields"].split(",")
+    assert "cached_at" not in params["fields"].split(",")
+
+
+def test_v3_history_does_not_skip_documents_sharing_a_page_boundary_timestamp(monkeypatch):
+    # srvModified 101, 102, 102, 102, 103: the first page ends inside the 102s, the second holds only 102s
+    documents = [{"identifier": f"d{i}", "srvModified": modified} for i, modified in enumerate([101, 102, 102, 102, 103])]
+    since_values = []
+
+    async def get_jwt(nightscout_url, api_token):
+        return "jwt"
+
+    async def get_json(url, params=None, headers=None):
+        since = int(url.rsplit("/", 1)[1])
+        since_values.append(since)
+        newer = [dict(document) for document in documents if document["srvModified"] > since]
+        return {"result": newer[:params["limit"]]}
+
+    monkeypatch.setattr(nightscout_v3, "_get_jwt", get_jwt)
+    monkeypatch.setattr(nightscout_client, "get_json", get_json)
+
+    result = asyncio.run(nightscout_v3.history("https://ns.example.com", "token", "entries", 100, "sgv", page_size=3))
+
+    assert [document["_id"] for document in result] == ["d0", "d1", "d2", "d3", "d4"]
+    assert since_values == [100, 101, 102]
+
+
+def test_v3_jwt_refusals_are_only_cached_for_auth_errors(monkeypatch):
+    statuses = [503, 401]
+    requests = []
+
+    async def get_json(url, params=None, headers=None):
+        requests.append(url)
+        request = httpx.Request("GET", url)
+        raise httpx.HTTPStatusError("error", request=request, response=httpx.Response(statuses.pop(0), request=request))
+
+    monkeypatch.setattr(nightscout_client, "get_json", get_json)
+    monkeypatch.setattr(nightscout_v3, "_jwts", {})
+
+    assert asyncio.run(nightscout_v3._get_jwt("https://ns.example.com", "token")) is None
+    assert nightscout_v3._jwts == {}
+    assert asyncio.run(nightscout_v3._get_jwt("https://ns.example.com", "token")) is None
+    assert asyncio.run(nightscout_v3._get_jwt("https://ns.example.com", "token")) is None
+    assert len(requests) == 2
+
+
+def test_v3_detection_errors_fall_back_to_v1_without_caching(monkeypatch):
+    async def get_json(url, params=None, headers=None):
+        raise httpx.DecodingError("not JSON", request=httpx.Request("GET", url))
+
+    monkeypatch.setattr(nightscout_client, "get_json", get_json)
+    monkeypatch.setattr(settings, "NIGHTSCOUT_API_VERSION", "auto")
+    monkeypatch.setattr(nightscout_v3, "_api_versions", {})
+
+    assert asyncio.run(nightscout_v3.resolve_api_version("https://ns.example.com", "token")) == nightscout_v3.V1
+    assert nightscout_v3._api_versions == {}
+
+
+def test_buckets_are_kept_per_nightscout_site(fake_nightscout):
+    calls, _, _ = fake_nightscout
+    fetch("2026-01-02T00:00:00+00:00", "2026-01-02T23:59:59+00:00")
+
+    # The same user on another site must not be served the first site's days
+    asyncio.run(nightscout_service.get_nightscout_entries(
+        nightscout_url="https://other.example.com",
+        api_token="token",
+        from_date="2026-01-02T00:00:00+00:00",
+        to_date="2026-01-02T23:59:59+00:00",
+        user_id="user-1",
+    ))
+    assert len(calls) == 2
@@ -0,0 +1,47 @@
+from app.core import cache
+from app.core.payload_codec import decode_records, encode_records
+from app.models.treatment import Treatment
+from app.services.nightscout_service import _validate_records
+from app.tests.test_glucose_series import make_record
+
+
+def test_records_round_trip_exactly():
+    records = [
+        make_record(0, srvModified=1767225601000),
+        make_record(1, sgv=None, trend=None, direction=None, type="mbg"),
+        make_record(2, dateString="2026-01-01T01:10:00+01:00", isValid=True),
+        {"_id": "t1", "eventType": "Meal Bolus", "created_at": "2026-01-01T12:00:00Z", "insulin": 4.5, "carbs": 40.0},
+    ]
+    del records[1]["utcOffset"]
+    assert decode_records(encode_records(records)) == records
+
+
+def test_entry_payloads_are_compact():
+    records = [make_record(i) for i in range(288)]
+    records[7] = make_record(7, sysTime="2026-01-01T00:35:00+01:00")
+    payload = encode_records(records)
+    assert decode_records(payload) == records
+    assert len(payload) < len(str(records)) // 10
+
+
+def test_legacy_buckets_are_read_as_is():
+    legacy = {"items": [make_record(0)], "complete": True}
+    assert cache._decode_bucket(legacy) is legacy
+    assert cache._decode_bucket({"payload": b"\x63", "codec": 99, "complete": True}) is None
+
+
+def test_derived_strings_before_date_round_trip():
+    records = _validate_records([{
+        "_id": "a", "eventType": "Meal Bolus", "created_at": "2026-01-29T10:00:00.000Z",
+        "date": 1769680800000, "insulin": 1.5
+    }], Treatment)
+    assert list(records[0]).index("created_at") < list(records[0]).index("date")
+    decoded = decode_records(encode_records(records))
+    assert decoded == records
+    assert list(decoded[0]) == list(records[0])
+
+
+def test_corrupt_buckets_are_discarded():
+    payload = encode_records([make_record(0)])
+    assert cache._decode_bucket({"payload": payload[:-4], "codec": 1, "complete": True}) is None
+    assert cache._decode_bucket({"payload": payload[:1] + b"garbage", "codec": 1, "complete": True}) is None
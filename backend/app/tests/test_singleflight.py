@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_call():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("k", fetch) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["value"] * 3
+    assert len(calls) == 1
+    assert flights.stats() == {"calls": 3, "coalesced": 2, "coalesced_ratio": 0.6667, "in_flight": 0}
+
+
+def test_cancelling_the_leader_does_not_fail_followers():
+    flights = SingleFlight("test")
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return "value"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.create_task(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "value"
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_errors_are_shared_and_not_cached():
+    flights = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(flights.do("k", fail), flights.do("k", fail), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [ValueError, ValueError]
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,211 @@
+import asyncio
+import functools
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.core import cache
+from app.core.config import settings
+from app.core.cache_backends import MemoryBackend
+from app.services import data_analysis_service, nightscout_client, nightscout_service, summary_store
+from app.services.data_analysis_service import DailySummary
+from app.tests.test_data_analysis_service import make_day
+from app.tests.test_nightscout_service import SITE, fake_nightscout, make_entry  # noqa: F401
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Use an in-memory cache and record the days loaded from entries."""
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    monkeypatch.setattr(cache, "memory_cache", None)
+    calls = []
+
+    async def prefetch_nightscout_range(from_date, to_date, **kwargs):
+        pass
+
+    async def get_day_data(date, nightscout_url=None, api_token=None, user_id=None):
+        calls.append(date.date())
+        day_data = make_day([100 + date.day, 200, 60])
+        day_data.date = date
+        return day_data
+
+    async def get_synced_ranges(ranges, **kwargs):
+        return [True] * len(ranges)
+
+    monkeypatch.setattr(data_analysis_service, "prefetch_nightscout_range", prefetch_nightscout_range)
+    monkeypatch.setattr(data_analysis_service, "get_day_data", get_day_data)
+    monkeypatch.setattr(data_analysis_service, "get_synced_ranges", get_synced_ranges)
+    return calls
+
+
+def test_summaries_round_trip():
+    summary = make_day([55, 120, 120, 250, 900]).summarize()
+    assert DailySummary.from_dict(summary.start, summary.to_dict()) == summary
+
+
+def test_closed_days_are_analysed_once_and_stored_per_month(loads):
+    today = date.today()
+    first = today - timedelta(days=40)
+
+    period = asyncio.run(data_analysis_service.get_period_summary(first, today, user_id="u1"))
+    assert period.days == 41
+    assert sorted(loads) == [first + timedelta(days=i) for i in range(41)]
+
+    stored_months = {key for _, key in cache.backend._values if key.startswith("summaries_month_")}
+    site = cache.site_scope(settings.NIGHTSCOUT_URL)
+    assert stored_months == {summary_store.summary_month_key(first + timedelta(days=i), site) for i in range(41)}
+    assert len(stored_months) <= 3
+
+    loads.clear()
+    again = asyncio.run(data_analysis_service.get_period_summary(first, today, user_id="u1"))
+    # Only the open day is loaded from entries again
+    assert loads == [today]
+    assert again == period
+    assert again.entry_insights() == period.entry_insights()
+
+
+def test_invalidated_days_are_reloaded(loads):
+    first = date.today() - timedelta(days=10)
+    last = first + timedelta(days=4)
+    asyncio.run(data_analysis_service.get_period_summary(first, last, user_id="u1"))
+    asyncio.run(summary_store.invalidate_daily_summaries(
+        [first + timedelta(days=2)], user_id="u1", site=cache.site_scope(settings.NIGHTSCOUT_URL)
+    ))
+
+    loads.clear()
+    asyncio.run(data_analysis_service.get_period_summary(first, last, user_id="u1"))
+    assert loads == [first + timedelta(days=2)]
+
+
+def test_summaries_are_kept_per_nightscout_site(loads):
+    first = date.today() - timedelta(days=5)
+    last = first + timedelta(days=2)
+    asyncio.run(data_analysis_service.get_period_summary(first, last, nightscout_url="https://a.example.com", user_id="u1"))
+
+    # After switching sites the old site's summaries are not served
+    loads.clear()
+    asyncio.run(data_analysis_service.get_period_summary(first, last, nightscout_url="https://b.example.com", user_id="u1"))
+    assert sorted(loads) == [first + timedelta(days=i) for i in range(3)]
+
+    loads.clear()
+    asyncio.run(data_analysis_service.get_period_summary(first, last, nightscout_url="https://a.example.com/", user_id="u1"))
+    assert loads == []
+
+
+def test_days_whose_entries_failed_are_not_stored(monkeypatch):
+    day = date.today() - timedelta(days=3)
+    entry_fetches = []
+
+    async def get_nightscout_entry_series(from_date, to_date, count=0, **kwargs):
+        entry_fetches.append(from_date)
+        return None
+
+    async def get_nightscout_treatments(from_date, to_date, count=0, **kwargs):
+        return []
+
+    async def prefetch_nightscout_range(from_date, to_date, **kwargs):
+        pass
+
+    # The real get_day_data, with a failing entries fetch
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    monkeypatch.setattr(cache, "memory_cache", None)
+    monkeypatch.setattr(data_analysis_service, "prefetch_nightscout_range", prefetch_nightscout_range)
+    monkeypatch.setattr(data_analysis_service, "get_nightscout_entry_series", get_nightscout_entry_series)
+    monkeypatch.setattr(data_analysis_service, "get_nightscout_treatments", get_nightscout_treatments)
+
+    asyncio.run(data_analysis_service.get_period_summary(day, day, user_id="u1"))
+    assert asyncio.run(summary_store.load_daily_summaries([day], user_id="u1")) == {}
+
+    asyncio.run(data_analysis_service.get_period_summary(day, day, user_id="u1"))
+    assert len(entry_fetches) == 2
+
+
+def test_days_served_stale_after_a_failed_sync_are_not_stored(fake_nightscout, monkeypatch):
+    calls, store, entries = fake_nightscout
+    # Summaries go to the real cache API, day buckets to the fake store
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    monkeypatch.setattr(cache, "memory_cache", None)
+    day = datetime.now(timezone.utc).date() - timedelta(days=1)
+    day_start_ms = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+    entries[:] = [make_entry(day_start_ms + i * 5 * 60 * 1000) for i in range(12)]
+    load = functools.partial(
+        data_analysis_service.get_period_summary, day, day,
+        nightscout_url="https://ns.example.com", api_token="token", user_id="user-1"
+    )
+
+    async def failing_get_json(url, params=None, timeout=None):
+        raise httpx.ConnectError("down")
+
+    def stored_months():
+        return [key for _, key in cache.backend._values if key.startswith("summaries_month_")]
+
+    async def scenario():
+        # The day before is complete, the day itself was last synced while it was still open
+        for family in ("entries", "treatments"):
+            await cache.aset_day_buckets(family, {day - timedelta(days=1): ([], None)}, user_id="user-1", site=SITE)
+            await cache.aset_day_buckets(
+                family, {day: ([], {"date": day_start_ms - 1, "srvModified": None})}, user_id="user-1", site=SITE
+            )
+        nightscout_client.get_json, get_json = failing_get_json, nightscout_client.get_json
+        stale = await load()
+        nightscout_client.get_json = get_json
+        assert stale.entry_insights() is None
+        assert not stored_months()
+
+        synced = await load()
+        assert synced.entry_insights().total_reading_count == 12
+        assert stored_months()
+
+    asyncio.run(scenario())
+
+
+def test_missing_runs_are_prefetched_under_the_host_limit(loads, monkeypatch):
+    running = {"now": 0, "max": 0}
+    prefetched = []
+
+    async def prefetch_nightscout_range(from_date, to_date, **kwargs):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0)
+        prefetched.append(from_date[:10])
+        running["now"] -= 1
+
+    monkeypatch.setattr(data_analysis_service, "prefetch_nightscout_range", prefetch_nightscout_range)
+    monkeypatch.setattr(data_analysis_service.settings, "NIGHTSCOUT_MAX_CONCURRENT_LOADS_PER_HOST", 2)
+    first = date.today() - timedelta(days=30)
+    # Store every other day, leaving 8 separate missing days
+    for i in range(0, 16, 2):
+        asyncio.run(data_analysis_service.get_period_summary(first + timedelta(days=i), first + timedelta(days=i), user_id="u1"))
+    prefetched.clear()
+
+    asyncio.run(data_analysis_service.get_period_summary(first, first + timedelta(days=15), user_id="u1"))
+
+    assert len(prefetched) == 8
+    assert running["max"] == 2
+
+
+def test_summaries_of_refetched_days_are_dropped(fake_nightscout, monkeypatch):
+    calls, store, _ = fake_nightscout
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    monkeypatch.setattr(cache, "memory_cache", None)
+    days = [date(2026, 1, 2), date(2026, 1, 3)]
+    summaries = {day: make_day([120]).summarize().to_dict() for day in days}
+    asyncio.run(summary_store.store_daily_summaries(summaries, user_id="user-1", site=SITE))
+
+    # Cached buckets are served without touching the summaries
+    for family in ("entries", "treatments"):
+        asyncio.run(cache.aset_day_buckets(family, {day: ([], None) for day in days}, user_id="user-1", site=SITE))
+    fetch = functools.partial(
+        nightscout_service.get_nightscout_entries,
+        nightscout_url="https://ns.example.com", api_token="token", user_id="user-1"
+    )
+    asyncio.run(fetch(from_date="2026-01-02T00:00:00+00:00", to_date="2026-01-03T23:59:59+00:00"))
+    assert not calls
+    assert asyncio.run(summary_store.load_daily_summaries(days, user_id="user-1", site=SITE)).keys() == set(days)
+
+    # A lost bucket is refetched, and the summary may predate a backfill
+    store.pop(("user-1", cache.day_bucket_key("entries", days[1], site=SITE)))
+    asyncio.run(fetch(from_date="2026-01-02T00:00:00+00:00", to_date="2026-01-03T23:59:59+00:00"))
+    assert calls
+    assert asyncio.run(summary_store.load_daily_summaries(days, user_id="user-1", site=SITE)).keys() == {days[0]}
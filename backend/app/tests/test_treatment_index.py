@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from app.models.treatment import Treatment
+from app.models.treatment_index import TreatmentIndex
+from app.services.data_analysis_service import DayData
+
+
+def make_treatment(i: int, event_type: str, hour: int, **values) -> Treatment:
+    return Treatment(_id=f"t{i}", eventType=event_type, created_at=f"2026-01-29T{hour:02d}:00:00Z", **values)
+
+
+TREATMENTS = [
+    make_treatment(1, "Meal Bolus", 12, insulin=4.5, carbs=40),
+    make_treatment(2, "Correction Bolus", 9, insulin=1.25),
+    make_treatment(3, "Carb Correction", 15, carbs=15.5),
+    make_treatment(4, "Site Change", 8),
+    make_treatment(5, "Correction Bolus", 22, insulin=0.5),
+    make_treatment(6, "Temp Basal", 3),
+]
+
+
+def test_treatment_insights_from_index():
+    insights = DayData(date=datetime(2026, 1, 29), treatments=TREATMENTS).calculate_treatment_insights()
+    assert insights.total_carbs == 55.5
+    assert insights.total_insulin == 6.25
+    assert insights.correction_bolus_count == 2
+    assert insights.carb_correction_count == 1
+    assert insights.site_change_count == 1
+    assert insights.temp_basal_count == 1
+    assert insights.total_treatment_count == 6
+
+
+def test_boluses_between_is_ordered_and_half_open():
+    index = TreatmentIndex(TREATMENTS[:3])
+    index.append(TREATMENTS[4])
+    boluses = index.boluses_between(datetime(2026, 1, 29, 9), datetime(2026, 1, 29, 22))
+    assert [t.id for t in boluses] == ["t2", "t1"]
+    assert [t.id for t in index] == ["t1", "t2", "t3", "t5"]